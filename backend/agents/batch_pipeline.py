@@ -0,0 +1,90 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    from .pipeline_context import PipelineContext
+except ImportError:
+    from pipeline_context import PipelineContext
+
+logger = logging.getLogger("agents.batch_pipeline")
+
+# Mensajes máximos por lote y llamadas simultáneas al LLM (improver)
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "256"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+
+async def iter_batch(messages: List[str], rag_agent, reasoner_agent, critic_agent, improver_agent=None,
+                     concurrency: int = BATCH_LLM_CONCURRENCY, top_k: int = 3) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Ejecuta el pipeline para un lote de mensajes:
+    un único encode + búsqueda FAISS, reasoner por mensaje, critic en lote y,
+    si hay improver, llamadas al LLM con concurrencia acotada.
+    Genera (índice, resultado) según se completa cada mensaje.
+    """
+    if len(messages) > BATCH_MAX_MESSAGES:
+        raise ValueError(f"Lote demasiado grande: {len(messages)} > {BATCH_MAX_MESSAGES}")
+    if not messages:
+        return
+
+    batch_id = str(uuid.uuid4())
+    request_ids = [str(uuid.uuid4()) for _ in messages]
+
+    # 1. RAG: una sola búsqueda para todo el lote (los embeddings se cuentan en el contexto del lote)
+    with PipelineContext(f"<batch {len(messages)}>", batch_id) as batch_ctx:
+        rag_contexts = await rag_agent.asearch_batch(messages, top_k)
+    logger.info(f"[{batch_id}] Lote de {len(messages)} mensajes, embeddings: {batch_ctx.embed_calls}")
+
+    # 2. Reasoner (local, sin nuevas búsquedas)
+    reasoner_outputs = [await reasoner_agent.reason(m, rag) for m, rag in zip(messages, rag_contexts)]
+    responses = [out["final_response"] for out in reasoner_outputs]
+
+    # 3. Critic en lote
+    reviews = await critic_agent.critique_batch(responses, messages, rag_contexts)
+
+    def result(i: int, final_response: str) -> Dict[str, Any]:
+        return {
+            "request_id": request_ids[i],
+            "final_response": final_response,
+            "rag_context": rag_contexts[i],
+            "critic_review": reviews[i],
+            "timestamp": datetime.now().isoformat()
+        }
+
+    if improver_agent is None:
+        for i, response in enumerate(responses):
+            yield i, result(i, response)
+        return
+
+    # 4. Improver: fan-out al LLM con un máximo de `concurrency` llamadas en vuelo
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def improve(i: int) -> Tuple[int, Dict[str, Any]]:
+        if not reasoner_outputs[i].get("should_respond", True):
+            return i, result(i, responses[i])
+        async with semaphore:
+            with PipelineContext(messages[i], request_ids[i]) as ctx:
+                ctx.rag_context = rag_contexts[i]
+                improved = await improver_agent.improve(responses[i], reviews[i], messages[i], rag_contexts[i])
+        return i, result(i, improved)
+
+    tasks = [asyncio.ensure_future(improve(i)) for i in range(len(messages))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Si el consumidor abandona (p. ej. el cliente se desconecta), cancelar lo pendiente
+        for task in tasks:
+            task.cancel()
+
+
+async def run_batch(messages: List[str], rag_agent, reasoner_agent, critic_agent, improver_agent=None,
+                    concurrency: int = BATCH_LLM_CONCURRENCY, top_k: int = 3) -> List[Dict[str, Any]]:
+    """Como iter_batch, pero devuelve la lista de resultados en el orden de entrada"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+    async for i, item in iter_batch(messages, rag_agent, reasoner_agent, critic_agent, improver_agent, concurrency, top_k):
+        results[i] = item
+    return results
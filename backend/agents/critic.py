@@ -1,10 +1,18 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 class CriticAgent:
     async def critique(self, reasoner_text: str, user_message: str, rag_context: Dict = None) -> Dict[str, Any]:
         """
         Revisa la respuesta del reasoner con análisis de relevancia mejorado
         """
+        return self._review(reasoner_text, user_message, rag_context)
+
+    async def critique_batch(self, reasoner_texts: List[str], user_messages: List[str], rag_contexts: Optional[List[Dict]] = None) -> List[Dict[str, Any]]:
+        """Revisa un lote de respuestas en una sola llamada (mismo orden que la entrada)"""
+        rag_contexts = rag_contexts or [None] * len(reasoner_texts)
+        return [self._review(text, message, rag) for text, message, rag in zip(reasoner_texts, user_messages, rag_contexts)]
+
+    def _review(self, reasoner_text: str, user_message: str, rag_context: Dict = None) -> Dict[str, Any]:
         issues = []
         score = 0.7  # Puntuación base más alta
         
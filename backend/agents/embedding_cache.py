@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+import unicodedata
+import threading
+import hashlib
+import logging
+import time
+import os
+
+logger = logging.getLogger("agents.embedding_cache")
+
+# Tamaño máximo en bytes (0 desactiva la caché) y TTL en segundos (0 = sin caducidad)
+RAG_EMBED_CACHE_BYTES = int(os.getenv("RAG_EMBED_CACHE_BYTES", str(32 * 1024 * 1024)))
+RAG_EMBED_CACHE_TTL = float(os.getenv("RAG_EMBED_CACHE_TTL", "3600"))
+# Directorio compartido entre réplicas (p. ej. un volumen común); vacío = solo caché local
+RAG_EMBED_CACHE_DIR = os.getenv("RAG_EMBED_CACHE_DIR", "")
+
+
+def cache_key(query: str) -> str:
+    """
+    Clave de caché: la consulta exacta, solo con normalización Unicode NFC (como la caché de
+    respuestas). Dos textos que el modelo codifica distinto nunca comparten vector.
+    """
+    return unicodedata.normalize("NFC", query)
+
+
+class FileEmbeddingBackend:
+    """Backend compartido: un .npy por consulta, para que las réplicas se calienten entre sí"""
+
+    def __init__(self, directory: Path, ttl: float = RAG_EMBED_CACHE_TTL):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, vector: np.ndarray):
+        path = self._path(key)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, vector)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir en la caché compartida: {e}")
+
+
+class EmbeddingCache:
+    """Caché LRU de embeddings de consultas, acotada en bytes y con TTL"""
+
+    def __init__(self, max_bytes: int = RAG_EMBED_CACHE_BYTES, ttl: float = RAG_EMBED_CACHE_TTL,
+                 backend: Optional[FileEmbeddingBackend] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "shared_hits": 0}
+
+    @staticmethod
+    def _entry_bytes(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key.encode("utf-8"))
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        key = cache_key(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, expires_at = entry
+                if expires_at and expires_at < now:
+                    self._remove(key)
+                    self._stats["expirations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return vector
+
+        if self.backend is not None:
+            vector = self.backend.get(key)
+            if vector is not None:
+                self._store(key, vector)
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["shared_hits"] += 1
+                return vector
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, query: str, vector: np.ndarray):
+        key = cache_key(query)
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._store(key, vector)
+        if self.backend is not None:
+            self.backend.set(key, vector)
+
+    def _store(self, key: str, vector: np.ndarray):
+        size = self._entry_bytes(key, vector)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (vector, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        vector, _ = self._entries.pop(key)
+        self._bytes -= self._entry_bytes(key, vector)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "shared_backend": str(self.backend.directory) if self.backend else None
+            }
+
+
+def create_embedding_cache(namespace: str = "") -> Optional[EmbeddingCache]:
+    """
+    Caché configurada por entorno; None si está desactivada.
+    namespace (huella del modelo) separa en el backend compartido vectores de modelos distintos.
+    """
+    if RAG_EMBED_CACHE_BYTES <= 0:
+        return None
+    backend = None
+    if RAG_EMBED_CACHE_DIR:
+        subdir = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:12]
+        backend = FileEmbeddingBackend(Path(RAG_EMBED_CACHE_DIR) / subdir)
+    return EmbeddingCache(RAG_EMBED_CACHE_BYTES, RAG_EMBED_CACHE_TTL, backend)
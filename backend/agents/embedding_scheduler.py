@@ -0,0 +1,121 @@
+from typing import List, Dict, Any, Optional, Set, Tuple
+import contextvars
+import asyncio
+import logging
+import os
+
+try:
+    from .pipeline_context import current_context
+except ImportError:
+    from pipeline_context import current_context
+
+logger = logging.getLogger("agents.embedding_scheduler")
+
+# Ventana de agrupación (ms) y tamaño máximo de lote; ventana 0 desactiva el batching
+RAG_BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", "2"))
+RAG_MAX_BATCH = int(os.getenv("RAG_MAX_BATCH", "32"))
+
+# Límites superiores de los buckets del histograma de tamaños de lote
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+class EmbeddingBatcher:
+    """
+    Agrupa consultas concurrentes durante una ventana corta (o hasta max_batch)
+    y las resuelve con un único encode y una única búsqueda FAISS.
+    """
+
+    def __init__(self, rag_agent, window_ms: float = RAG_BATCH_WINDOW_MS, max_batch: int = RAG_MAX_BATCH):
+        self.rag_agent = rag_agent
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        # (consulta, parámetros de búsqueda, future, contexto de la petición)
+        self._pending: List[Tuple[str, tuple, asyncio.Future, Any]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Referencia a los lotes en curso: el event loop solo guarda referencias débiles a las tareas
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._queries = 0
+        self._histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._overflow = 0
+
+    async def submit(self, query: str, top_k: int = 3, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, (top_k, nprobe, ef_search), future, current_context()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, tuple, asyncio.Future, Any]]):
+        self._record_batch_size(len(batch))
+
+        # Normalmente todas las consultas usan los mismos parámetros; agrupar por si acaso
+        by_params: Dict[tuple, List[Tuple[str, tuple, asyncio.Future, Any]]] = {}
+        for item in batch:
+            by_params.setdefault(item[1], []).append(item)
+
+        loop = asyncio.get_running_loop()
+        for params, items in by_params.items():
+            queries = [item[0] for item in items]
+            try:
+                # Contexto vacío: el encode compartido se atribuye abajo a cada petición
+                results, encoded = await loop.run_in_executor(
+                    self.rag_agent.executor,
+                    contextvars.Context().run,
+                    self.rag_agent.search_batch_detailed, queries, *params
+                )
+            except Exception as e:
+                logger.error(f"Error en lote de {len(items)} consultas: {e}")
+                for _, _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, _, future, ctx), result, was_encoded in zip(items, results, encoded):
+                # Las consultas servidas desde la caché de embeddings no cuentan como encode
+                if ctx is not None and was_encoded:
+                    ctx.embed_calls += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def _record_batch_size(self, size: int):
+        self._batches += 1
+        self._queries += size
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self._histogram[bucket] += 1
+                return
+        self._overflow += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "batches": self._batches,
+            "queries": self._queries,
+            "avg_batch_size": round(self._queries / self._batches, 2) if self._batches else 0,
+            "batch_size_histogram": {
+                **{f"<={bucket}": count for bucket, count in self._histogram.items()},
+                f">{BATCH_SIZE_BUCKETS[-1]}": self._overflow
+            },
+            "waiting": len(self._pending),
+            "running": len(self._tasks)
+        }
@@ -1,11 +1,16 @@
-from typing import Dict, Any
-from ..llm import call_openai_chat
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+
+try:
+    from ..llm import StreamInterruptedError, call_openai_chat, stream_openai_chat
+except (ImportError, ValueError):
+    # Importado como módulo de nivel superior (agents/ en sys.path, backend/ como cwd)
+    from llm import StreamInterruptedError, call_openai_chat, stream_openai_chat
 
 class ImproverAgent:
-    async def improve(self, reasoner_text: str, critic_report: Dict[str, Any], user_message: str) -> str:
+    def _build_messages(self, reasoner_text: str, critic_report: Dict[str, Any], user_message: str, rag_context: Optional[Dict[str, Any]] = None) -> Optional[Tuple[List[Dict[str, str]], str]]:
         """
-        Toma la respuesta inicial y el informe del critic y genera una respuesta final mejorada.
-        REALMENTE usa la crítica para mejorar.
+        Construye el prompt de mejora a partir del informe del critic.
+        Devuelve None si la respuesta inicial ya es suficientemente buena.
         """
         score = critic_report.get('score', 0.5)
         issues = critic_report.get('issues', [])
@@ -13,7 +18,7 @@ class ImproverAgent:
 
         # Si el score es alto (>0.8) y no hay issues, mantener respuesta similar
         if score >= 0.8 and not issues:
-            return reasoner_text
+            return None
 
         # Si hay issues específicos, mejorar basado en ellos
         improvement_instructions = []
@@ -47,10 +52,17 @@ class ImproverAgent:
         # Construir el prompt de mejora
         improvement_text = ". ".join(improvement_instructions)
 
+        # Contexto RAG de la petición (sin nueva búsqueda)
+        context_text = ""
+        if rag_context and rag_context.get("results"):
+            snippets = [r["content"] for r in rag_context["results"]]
+            context_text = "Contexto recuperado:\n" + "\n".join(f"- {s}" for s in snippets) + "\n\n"
+
         messages = [
             {"role": "system", "content": f"Eres Improver: mejora la respuesta incorporando este feedback: {improvement_text}"},
             {"role": "user", "content":
                 f"Pregunta original: {user_message}\n\n"
+                f"{context_text}"
                 f"Respuesta inicial: {reasoner_text}\n\n"
                 f"Puntuación recibida: {score}/1.0\n"
                 f"Problemas identificados: {issues}\n\n"
@@ -58,11 +70,69 @@ class ImproverAgent:
             }
         ]
 
+        return messages, improvement_text
+
+    def _fallback(self, reasoner_text: str, improvement_text: str) -> str:
+        # Fallback: añadir indicador de mejora a la respuesta original
+        if improvement_text:
+            return f"🔄 MEJORADO: {reasoner_text}\n\n💡 Mejoras aplicadas: {improvement_text}"
+        return reasoner_text
+
+    async def improve(self, reasoner_text: str, critic_report: Dict[str, Any], user_message: str, rag_context: Optional[Dict[str, Any]] = None,
+                      on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """
+        Toma la respuesta inicial y el informe del critic y genera una respuesta final mejorada.
+        REALMENTE usa la crítica para mejorar.
+        Si se pasa rag_context (ya calculado en la petición), se incluye en el prompt sin volver a buscar.
+        Con on_delta se usa el LLM en streaming y se le pasa cada fragmento según llega;
+        devuelve igualmente el texto completo (o la respuesta del reasoner si el stream se corta a mitad).
+        """
+        if on_delta is not None:
+            parts = []
+            stream = self.improve_stream(reasoner_text, critic_report, user_message, rag_context)
+            try:
+                async for delta in stream:
+                    parts.append(delta)
+                    await on_delta(delta)
+            except StreamInterruptedError:
+                # El texto parcial no es una respuesta válida
+                return reasoner_text
+            finally:
+                # Si on_delta falla o se cancela la tarea, cierra ya la conexión con el LLM
+                await stream.aclose()
+            return "".join(parts) or reasoner_text
+
+        prompt = self._build_messages(reasoner_text, critic_report, user_message, rag_context)
+        if prompt is None:
+            return reasoner_text
+        messages, improvement_text = prompt
+
         try:
-            final = await call_openai_chat(messages, temperature=0.15)
+            # La caché semántica compara solo la pregunta; contexto, borrador y problemas van en la clave exacta
+            final = await call_openai_chat(messages, temperature=0.15, cache_text=user_message)
             return final
         except Exception as e:
-            # Fallback: añadir indicador de mejora a la respuesta original
-            if improvement_instructions:
-                return f"🔄 MEJORADO: {reasoner_text}\n\n💡 Mejoras aplicadas: {improvement_text}"
-            return reasoner_text
+            return self._fallback(reasoner_text, improvement_text)
+
+    async def improve_stream(self, reasoner_text: str, critic_report: Dict[str, Any], user_message: str, rag_context: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Igual que improve() pero genera el texto mejorado por fragmentos según los emite el LLM"""
+        prompt = self._build_messages(reasoner_text, critic_report, user_message, rag_context)
+        if prompt is None:
+            yield reasoner_text
+            return
+        messages, improvement_text = prompt
+
+        emitted = False
+        stream = stream_openai_chat(messages, temperature=0.15)
+        try:
+            async for delta in stream:
+                emitted = True
+                yield delta
+        except Exception as e:
+            if emitted:
+                # Corte a mitad (StreamInterruptedError): el consumidor decide qué hacer con lo parcial
+                raise
+            yield self._fallback(reasoner_text, improvement_text)
+        finally:
+            # Propaga el cierre (cliente desconectado) hasta la petición HTTP al LLM
+            await stream.aclose()
@@ -0,0 +1,155 @@
+from typing import Optional, Tuple
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger("agents.index_factory")
+
+# faiss se importa dentro de cada función (como en index_snapshot) para que importar
+# el módulo no cargue la librería nativa
+
+# Tipo de índice: flat (exacto), ivf_flat, ivf_pq, hnsw
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+RAG_IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "1024"))
+RAG_PQ_M = int(os.getenv("RAG_PQ_M", "48"))
+RAG_PQ_NBITS = int(os.getenv("RAG_PQ_NBITS", "8"))
+RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+RAG_HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "80"))
+
+# Valores por defecto de los parámetros de búsqueda (ajustables por consulta)
+RAG_NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+RAG_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS recomienda al menos 39 puntos de entrenamiento por centroide
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _pq_subquantizers(dim: int, m: int) -> int:
+    """Mayor número de subcuantizadores <= m que divide la dimensión"""
+    for candidate in range(min(m, dim), 0, -1):
+        if dim % candidate == 0:
+            return candidate
+    return 1
+
+
+def index_spec(index_type: str, n: int, dim: int) -> str:
+    """
+    Cadena de faiss.index_factory para el tipo pedido y el tamaño del corpus.
+    Si el corpus es demasiado pequeño para entrenar, se degrada a Flat (exacto).
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice desconocido: {index_type} (opciones: {', '.join(INDEX_TYPES)})")
+
+    if index_type == "flat":
+        return "Flat"
+
+    if index_type == "hnsw":
+        return f"HNSW{RAG_HNSW_M}"
+
+    nlist = min(RAG_IVF_NLIST, n // MIN_POINTS_PER_CENTROID)
+    if nlist < 4:
+        logger.warning(f"Corpus de {n} vectores insuficiente para {index_type}; se usa Flat")
+        return "Flat"
+
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+
+    # ivf_pq: el entrenamiento de PQ necesita al menos 2^nbits puntos por subcuantizador
+    if n < (1 << RAG_PQ_NBITS) * MIN_POINTS_PER_CENTROID:
+        logger.warning(f"Corpus de {n} vectores insuficiente para entrenar PQ; se usa IVF{nlist},Flat")
+        return f"IVF{nlist},Flat"
+    m = _pq_subquantizers(dim, RAG_PQ_M)
+    return f"IVF{nlist},PQ{m}x{RAG_PQ_NBITS}"
+
+
+def build_index(spec: str, vectors: np.ndarray, ids: Optional[np.ndarray] = None) -> "faiss.Index":
+    """
+    Crea el índice, lo entrena si hace falta y añade los vectores con sus ids.
+    Flat y HNSW se envuelven en IDMap2 para admitir ids propios y altas/bajas incrementales.
+    """
+    import faiss
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    factory_spec = spec if spec.startswith("IVF") else f"IDMap2,{spec}"
+    index = faiss.index_factory(dim, factory_spec, faiss.METRIC_L2)
+
+    hnsw = _as_hnsw(index)
+    if hnsw is not None:
+        hnsw.hnsw.efConstruction = RAG_HNSW_EF_CONSTRUCTION
+
+    if not index.is_trained:
+        logger.info(f"Entrenando índice {spec} con {vectors.shape[0]} vectores")
+        index.train(vectors)
+    if ids is None:
+        ids = np.arange(vectors.shape[0])
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    apply_default_search_params(index)
+    return index
+
+
+def reconstruct_vectors(index: "faiss.Index", ids: np.ndarray) -> np.ndarray:
+    """
+    Vectores almacenados para los ids dados, para re-entrenar sin volver a embeber.
+    IDMap2 los recupera por id; IVF necesita un mapa directo id -> lista (se crea la primera vez).
+    Con PQ el vector recuperado es la aproximación cuantizada.
+    """
+    import faiss
+    ivf = _as_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+
+def apply_default_search_params(index: "faiss.Index"):
+    """Fija nprobe / efSearch por defecto en el índice"""
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = RAG_NPROBE
+    hnsw = _as_hnsw(index)
+    if hnsw is not None:
+        hnsw.hnsw.efSearch = RAG_EF_SEARCH
+
+
+def search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    Parámetros de búsqueda por consulta (thread-safe, no modifican el índice).
+    None si el índice no los admite o no se pidió nada.
+    """
+    import faiss
+    if nprobe is not None and _as_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search is not None and _as_hnsw(index) is not None:
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+def describe(index) -> Tuple[str, dict]:
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        return "ivf", {"nlist": ivf.nlist, "nprobe": ivf.nprobe}
+    hnsw = _as_hnsw(index)
+    if hnsw is not None:
+        return "hnsw", {"M": RAG_HNSW_M, "efSearch": hnsw.hnsw.efSearch}
+    return "flat", {}
+
+
+def _as_ivf(index):
+    import faiss
+    if not isinstance(index, faiss.Index):
+        return None
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def _as_hnsw(index):
+    import faiss
+    if not isinstance(index, faiss.Index):
+        return None
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index if isinstance(index, faiss.IndexHNSW) else None
@@ -0,0 +1,255 @@
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import hashlib
+import logging
+import json
+import os
+
+try:
+    from .mmap_index import MmapFlatL2Index, open_vectors_mmap
+except ImportError:
+    from mmap_index import MmapFlatL2Index, open_vectors_mmap
+
+logger = logging.getLogger("agents.index_snapshot")
+
+# Directorio del snapshot del índice; RAG_SNAPSHOT=0 desactiva el snapshot
+RAG_SNAPSHOT_DIR = Path(os.getenv("RAG_SNAPSHOT_DIR", str(Path(__file__).parent.parent / "data" / "rag_index")))
+RAG_SNAPSHOT_ENABLED = os.getenv("RAG_SNAPSHOT", "1") != "0"
+
+VECTORS_FILE = "vectors.npy"
+DOCS_FILE = "docs.json"
+META_FILE = "meta.json"
+INDEX_FILE = "index.faiss"
+INDEX_META_FILE = "index.json"
+
+
+def kb_content_hash(knowledge_base: List[Dict[str, Any]]) -> str:
+    """Hash estable del contenido de la base de conocimiento"""
+    payload = json.dumps(knowledge_base, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Hash de un documento (contenido + metadatos) para saltar documentos sin cambios al ingerir"""
+    payload = json.dumps({k: doc.get(k) for k in ("content", "category", "tags")}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_fingerprint(model_name: str, model) -> str:
+    """Identifica el modelo de embeddings: si cambia, los vectores guardados no valen"""
+    try:
+        import sentence_transformers
+        version = sentence_transformers.__version__
+    except Exception:
+        version = "unknown"
+    return f"{model_name}|dim={model.get_sentence_embedding_dimension()}|st={version}"
+
+
+def _tmp_path(path: Path) -> Path:
+    """Temporal propio del proceso: varios workers pueden escribir el mismo fichero a la vez"""
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _write_atomic(path: Path, write):
+    tmp = _tmp_path(path)
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_snapshot(directory: Path, embeddings: np.ndarray, id_map: Dict[int, Dict[str, Any]],
+                  fingerprint: str, kb_hash: str, build_seconds: float) -> None:
+    """Guarda vectores, id_map y metadatos. meta.json se escribe al final y marca el snapshot como válido"""
+    directory.mkdir(parents=True, exist_ok=True)
+    meta_path = directory / META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    _write_atomic(directory / VECTORS_FILE, lambda f: np.save(f, vectors))
+
+    docs = {"ids": [int(i) for i in id_map], "docs": list(id_map.values())}
+    _write_atomic(directory / DOCS_FILE, lambda f: f.write(json.dumps(docs, ensure_ascii=False).encode("utf-8")))
+
+    meta = {
+        "model_fingerprint": fingerprint,
+        "kb_hash": kb_hash,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "build_seconds": round(build_seconds, 4),
+        "created_at": datetime.utcnow().isoformat() + "Z"
+    }
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+    logger.info(f"💾 Snapshot del índice guardado en {directory} ({meta['count']} vectores)")
+
+
+def read_meta(directory: Path) -> Optional[Dict[str, Any]]:
+    meta_path = directory / META_FILE
+    if not meta_path.exists():
+        return None
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Snapshot con meta.json ilegible: {e}")
+        return None
+
+
+def load_snapshot(directory: Path, fingerprint: str, kb_hash: str, mmap: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Carga el snapshot si coincide con el modelo y el contenido actual; None si hay que re-embeder.
+    Con mmap=True los vectores se abren memory-mapped en solo lectura en lugar de copiarse.
+    """
+    meta = read_meta(directory)
+    if meta is None:
+        return None
+    if meta.get("model_fingerprint") != fingerprint:
+        logger.info("Snapshot descartado: el modelo de embeddings cambió")
+        return None
+    if meta.get("kb_hash") != kb_hash:
+        logger.info("Snapshot descartado: la base de conocimiento cambió")
+        return None
+
+    try:
+        embeddings = np.load(directory / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        docs = json.loads((directory / DOCS_FILE).read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Snapshot incompleto, se reconstruye: {e}")
+        return None
+
+    id_map = {int(i): doc for i, doc in zip(docs["ids"], docs["docs"])}
+    if embeddings.shape[0] != meta["count"] or len(id_map) != meta["count"]:
+        logger.warning("Snapshot inconsistente, se reconstruye")
+        return None
+
+    return {"embeddings": embeddings, "id_map": id_map, "meta": meta}
+
+
+def save_index(directory: Path, index, spec: str, kb_hash: str) -> None:
+    """Guarda un índice ANN ya entrenado para no volver a entrenarlo en el siguiente arranque"""
+    import faiss
+
+    directory.mkdir(parents=True, exist_ok=True)
+    meta_path = directory / INDEX_META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    tmp = _tmp_path(directory / INDEX_FILE)
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, directory / INDEX_FILE)
+
+    meta = {"spec": spec, "kb_hash": kb_hash, "ntotal": int(index.ntotal)}
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+
+
+def load_index(directory: Path, spec: str, kb_hash: str, mmap: bool = False):
+    """Carga el índice guardado si corresponde al mismo spec y contenido; con mmap=True se abre sin copiar"""
+    import faiss
+
+    meta_path = directory / INDEX_META_FILE
+    if not meta_path.exists() or not (directory / INDEX_FILE).exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("spec") != spec or meta.get("kb_hash") != kb_hash:
+        return None
+
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    try:
+        index = faiss.read_index(str(directory / INDEX_FILE), flags)
+    except RuntimeError as e:
+        logger.warning(f"No se pudo leer el índice guardado: {e}")
+        return None
+    if index.ntotal != meta["ntotal"]:
+        return None
+    return index
+
+
+# Estado vivo del índice tras ingestas incrementales (índice con ids, documentos y registro de hashes)
+LIVE_DIR = "live"
+REGISTRY_FILE = "registry.json"
+IDS_FILE = "ids.npy"
+
+
+def _flat_vectors(index) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectores e ids de un IDMap2,Flat, en el orden de las filas"""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    flat = faiss.downcast_index(index.index)
+    vectors = faiss.vector_to_array(flat.codes).view(np.float32).reshape(-1, flat.d)
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    return vectors, ids
+
+
+def save_live_state(directory: Path, index, id_map: Dict[int, Dict[str, Any]], registry: Dict[str, Dict[str, Any]],
+                    fingerprint: str, index_type: str, spec: str, next_id: int) -> None:
+    import faiss
+
+    live = directory / LIVE_DIR
+    live.mkdir(parents=True, exist_ok=True)
+    meta_path = live / META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    tmp = _tmp_path(live / INDEX_FILE)
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, live / INDEX_FILE)
+    if spec == "Flat":
+        # FAISS copia IndexFlat al leerlo incluso con IO_FLAG_MMAP: los vectores se guardan
+        # también en .npy para que los workers en modo mmap los compartan
+        vectors, ids = _flat_vectors(index)
+        _write_atomic(live / VECTORS_FILE, lambda f: np.save(f, vectors))
+        _write_atomic(live / IDS_FILE, lambda f: np.save(f, ids))
+
+    docs = {"ids": [int(i) for i in id_map], "docs": list(id_map.values())}
+    _write_atomic(live / DOCS_FILE, lambda f: f.write(json.dumps(docs, ensure_ascii=False).encode("utf-8")))
+    _write_atomic(live / REGISTRY_FILE, lambda f: f.write(json.dumps(registry, ensure_ascii=False).encode("utf-8")))
+
+    meta = {
+        "model_fingerprint": fingerprint,
+        "index_type": index_type,
+        "spec": spec,
+        "next_id": int(next_id),
+        "documents": len(registry),
+        "vectors": len(id_map),
+        "created_at": datetime.utcnow().isoformat() + "Z"
+    }
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+    logger.info(f"💾 Estado vivo del índice guardado ({meta['documents']} documentos, {meta['vectors']} vectores)")
+
+
+def load_live_state(directory: Path, fingerprint: str, index_type: str, mmap: bool = False) -> Optional[Dict[str, Any]]:
+    """Carga el estado vivo si existe y fue creado con el mismo modelo y tipo de índice"""
+    import faiss
+
+    live = directory / LIVE_DIR
+    meta = read_meta(live)
+    if meta is None:
+        return None
+    if meta.get("model_fingerprint") != fingerprint or meta.get("index_type") != index_type:
+        logger.info("Estado vivo del índice descartado: cambió el modelo o el tipo de índice")
+        return None
+
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    try:
+        if mmap and meta.get("spec") == "Flat" and (live / VECTORS_FILE).exists():
+            index = MmapFlatL2Index(open_vectors_mmap(live / VECTORS_FILE), ids=np.load(live / IDS_FILE))
+        else:
+            if mmap:
+                logger.warning(f"Estado vivo {meta.get('spec')} sin vectores .npy: cada worker carga su propia "
+                               f"copia del índice (memoria compartida desactivada)")
+            index = faiss.read_index(str(live / INDEX_FILE), flags)
+        docs = json.loads((live / DOCS_FILE).read_text())
+        registry = json.loads((live / REGISTRY_FILE).read_text())
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.warning(f"Estado vivo del índice ilegible: {e}")
+        return None
+
+    id_map = {int(i): doc for i, doc in zip(docs["ids"], docs["docs"])}
+    return {"index": index, "id_map": id_map, "registry": registry, "meta": meta}
@@ -0,0 +1,229 @@
+"""
+Ingesta incremental de documentos en el índice vivo del RAGAgent.
+
+Pipeline de generadores (memoria acotada por el tamaño de lote):
+    documentos (directorio / JSONL) -> chunks -> lotes -> embeddings -> índice
+
+Uso:
+    python agents/ingest.py docs/              # directorio con .md / .txt / .jsonl
+    python agents/ingest.py corpus.jsonl --prune
+"""
+from pathlib import Path
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+import argparse
+import logging
+import json
+import sys
+import os
+
+try:
+    from .index_snapshot import content_hash
+except ImportError:
+    from index_snapshot import content_hash
+
+logger = logging.getLogger("agents.ingest")
+
+RAG_INGEST_BATCH = int(os.getenv("RAG_INGEST_BATCH", "64"))
+RAG_CHUNK_CHARS = int(os.getenv("RAG_CHUNK_CHARS", "800"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+
+TEXT_SUFFIXES = {".txt", ".md", ".rst"}
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """Una línea por documento: {"id", "content", "category", "tags"} o {"id", "deleted": true}"""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"{path}:{line_no} línea JSON inválida: {e}")
+                continue
+            if "id" not in record or ("content" not in record and not record.get("deleted")):
+                logger.warning(f"{path}:{line_no} documento sin id o content, se ignora")
+                continue
+            yield record
+
+
+def iter_documents(source: Path) -> Iterator[Dict[str, Any]]:
+    """Recorre un fichero JSONL o un directorio (texto plano y JSONL) documento a documento"""
+    source = Path(source)
+    if source.is_file():
+        yield from _iter_jsonl(source)
+        return
+
+    for path in sorted(source.rglob("*")):
+        if not path.is_file():
+            continue
+        if path.suffix == ".jsonl":
+            yield from _iter_jsonl(path)
+        elif path.suffix in TEXT_SUFFIXES:
+            relative = path.relative_to(source)
+            yield {
+                "id": relative.as_posix(),
+                "content": path.read_text(encoding="utf-8"),
+                "category": relative.parts[0] if len(relative.parts) > 1 else "general",
+                "tags": []
+            }
+
+
+def iter_chunks(doc: Dict[str, Any], chunk_chars: int = RAG_CHUNK_CHARS,
+                overlap: int = RAG_CHUNK_OVERLAP) -> Iterator[Dict[str, Any]]:
+    """Divide un documento en fragmentos de ~chunk_chars, cortando en espacios y con solapamiento"""
+    text = " ".join(doc["content"].split())
+    start = 0
+    n = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            cut = text.rfind(" ", start + chunk_chars // 2, end)
+            if cut > start:
+                end = cut
+        yield {
+            "id": f"{doc['id']}#{n}",
+            "doc_id": doc["id"],
+            "content": text[start:end],
+            "category": doc.get("category", "general"),
+            "tags": doc.get("tags", [])
+        }
+        n += 1
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+
+class KnowledgeIngestor:
+    """Añade, actualiza y borra documentos del índice vivo sin reconstruirlo"""
+
+    def __init__(self, rag_agent, batch_size: int = RAG_INGEST_BATCH,
+                 chunk_chars: int = RAG_CHUNK_CHARS, overlap: int = RAG_CHUNK_OVERLAP):
+        self.rag_agent = rag_agent
+        self.batch_size = max(1, batch_size)
+        self.chunk_chars = chunk_chars
+        self.overlap = overlap
+
+    def ingest(self, documents: Iterable[Dict[str, Any]], prune_missing: bool = False) -> Dict[str, int]:
+        """
+        Ingiere documentos en streaming. Los documentos con el mismo hash se saltan.
+        Si un id se repite en la misma ingesta gana la última versión.
+        Con prune_missing=True se borran del índice los documentos que no aparecen en la fuente.
+        """
+        stats = {"added": 0, "updated": 0, "skipped": 0, "deleted": 0, "chunks": 0}
+        registry = self.rag_agent.doc_registry
+        seen = set() if prune_missing else None
+        pending: List[Dict[str, Any]] = []
+        # Documentos con todos sus chunks troceados, a la espera de que se añadan al índice
+        chunked: Dict[str, str] = {}
+        handled = set()
+
+        for doc in documents:
+            doc_id = doc["id"]
+            if seen is not None:
+                seen.add(doc_id)
+            if doc_id in handled:
+                logger.warning(f"Documento {doc_id} repetido en la ingesta; se usa la última versión")
+                if pending:
+                    # Sus chunks anteriores tienen que estar en el índice (y en el registro) para poder borrarlos
+                    stats["chunks"] += self._flush(pending)
+                    pending = []
+                    self._commit(chunked)
+            handled.add(doc_id)
+
+            if doc.get("deleted"):
+                if self.delete(doc_id):
+                    stats["deleted"] += 1
+                continue
+
+            doc_hash = content_hash(doc)
+            entry = registry.get(doc_id)
+            if entry and entry["hash"] == doc_hash:
+                stats["skipped"] += 1
+                continue
+
+            if entry:
+                self.rag_agent.remove_vectors(entry["ids"])
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            # Sin hash hasta que estén todos sus vectores: si la ingesta falla a medias, el
+            # documento se vuelve a ingerir la próxima vez (y se borran los vectores parciales)
+            registry[doc_id] = {"hash": None, "ids": []}
+
+            for chunk in iter_chunks(doc, self.chunk_chars, self.overlap):
+                pending.append(chunk)
+                if len(pending) >= self.batch_size:
+                    stats["chunks"] += self._flush(pending)
+                    pending = []
+                    self._commit(chunked)
+            chunked[doc_id] = doc_hash
+
+        if pending:
+            stats["chunks"] += self._flush(pending)
+        self._commit(chunked)
+
+        if seen is not None:
+            # La base integrada del RAGAgent no pertenece a ninguna fuente externa: nunca se poda
+            builtin = {d["id"] for d in self.rag_agent.knowledge_base}
+            for doc_id in [d for d in registry if d not in seen and d not in builtin]:
+                if self.delete(doc_id):
+                    stats["deleted"] += 1
+
+        # Con el corpus nuevo puede tocar entrenar el tipo de índice configurado (IVF/PQ)
+        self.rag_agent.rebuild_index_if_needed()
+
+        logger.info(f"📥 Ingesta: {stats}")
+        return stats
+
+    def ingest_path(self, source: Path, prune_missing: bool = False) -> Dict[str, int]:
+        return self.ingest(iter_documents(source), prune_missing)
+
+    def delete(self, doc_id: str) -> bool:
+        entry = self.rag_agent.doc_registry.pop(doc_id, None)
+        if entry is None:
+            return False
+        self.rag_agent.remove_vectors(entry["ids"])
+        return True
+
+    def _commit(self, chunked: Dict[str, str]):
+        """Registra el hash de los documentos cuyos chunks ya están todos en el índice"""
+        registry = self.rag_agent.doc_registry
+        for doc_id, doc_hash in chunked.items():
+            registry[doc_id]["hash"] = doc_hash
+        chunked.clear()
+
+    def _flush(self, chunks: List[Dict[str, Any]]) -> int:
+        vectors = self.rag_agent.embed_documents([c["content"] for c in chunks])
+        ids = self.rag_agent.add_vectors(vectors, chunks)
+        registry = self.rag_agent.doc_registry
+        for vector_id, chunk in zip(ids, chunks):
+            registry[chunk["doc_id"]]["ids"].append(vector_id)
+        return len(chunks)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingesta incremental de documentos en el índice RAG")
+    parser.add_argument("source", help="Directorio o fichero JSONL")
+    parser.add_argument("--prune", action="store_true", help="Borrar documentos que ya no están en la fuente")
+    parser.add_argument("--batch-size", type=int, default=RAG_INGEST_BATCH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    # Como script solo agents/ está en sys.path; rag_agent importa además módulos de backend/
+    # (metrics, single_flight), igual que los benchmarks
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    from rag_agent import rag_agent
+    agent = rag_agent.load()
+
+    if agent.read_only:
+        parser.error("La ingesta necesita RAG_INDEX_MMAP=0")
+    stats = KnowledgeIngestor(agent, batch_size=args.batch_size).ingest_path(Path(args.source), args.prune)
+    agent.save_state()
+    agent.shutdown()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
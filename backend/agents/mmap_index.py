@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+import os
+
+# RAG_INDEX_MMAP=1: todos los workers abren los vectores del snapshot con mmap (solo lectura, sin copia)
+RAG_INDEX_MMAP = os.getenv("RAG_INDEX_MMAP", "0") == "1"
+
+# Filas procesadas por bloque para acotar la memoria temporal de la búsqueda
+SEARCH_BLOCK_ROWS = 65536
+
+
+def open_vectors_mmap(path: Path) -> np.ndarray:
+    """Abre vectors.npy como memmap de solo lectura; las páginas se comparten entre procesos vía page cache"""
+    return np.load(path, mmap_mode="r")
+
+
+class MmapFlatL2Index:
+    """
+    Índice L2 exacto sobre un array memory-mapped.
+    Misma interfaz que faiss.IndexFlatL2 para búsqueda (distancias L2 al cuadrado),
+    pero sin copiar los vectores a memoria privada del proceso.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None):
+        if vectors.dtype != np.float32 or vectors.ndim != 2:
+            raise ValueError("Se esperan vectores float32 de dos dimensiones")
+        if ids is not None and len(ids) != vectors.shape[0]:
+            raise ValueError("Se espera un id por vector")
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+        # Id de cada fila (estado vivo tras ingestas); None = el id es la posición de la fila
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64)
+        # Normas por fila: n floats privados, frente a n*d de los vectores compartidos
+        self.norms = np.empty(self.ntotal, dtype=np.float32)
+        for start in range(0, self.ntotal, SEARCH_BLOCK_ROWS):
+            block = vectors[start:start + SEARCH_BLOCK_ROWS]
+            self.norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    def add(self, x: np.ndarray):
+        raise RuntimeError("El índice memory-mapped es de solo lectura")
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        nq = queries.shape[0]
+        q_norms = np.einsum("ij,ij->i", queries, queries)
+
+        best_d = np.full((nq, k), np.inf, dtype=np.float32)
+        best_i = np.full((nq, k), -1, dtype=np.int64)
+
+        for start in range(0, self.ntotal, SEARCH_BLOCK_ROWS):
+            block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+            dist = self.norms[start:start + len(block)][None, :] - 2 * queries @ block.T + q_norms[:, None]
+            np.maximum(dist, 0, out=dist)
+
+            kk = min(k, dist.shape[1])
+            part = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+            cand_d = np.concatenate([best_d, np.take_along_axis(dist, part, axis=1)], axis=1)
+            cand_i = np.concatenate([best_i, part.astype(np.int64) + start], axis=1)
+
+            order = np.argsort(cand_d, axis=1, kind="stable")[:, :k]
+            best_d = np.take_along_axis(cand_d, order, axis=1)
+            best_i = np.take_along_axis(cand_i, order, axis=1)
+
+        if self.ids is not None:
+            best_i = np.where(best_i >= 0, self.ids[np.maximum(best_i, 0)], -1)
+        return best_d, best_i
+
+
+def process_memory() -> Dict[str, int]:
+    """RSS del proceso (kB) separando memoria anónima y páginas de fichero compartidas"""
+    stats = {}
+    fields = {"VmRSS": "rss_kb", "RssAnon": "rss_anon_kb", "RssFile": "rss_file_kb", "RssShmem": "rss_shmem_kb"}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    stats[fields[key]] = int(value.split()[0])
+        # PSS reparte las páginas compartidas entre los procesos que las usan
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    stats["pss_kb"] = int(line.split()[1])
+                    break
+    except OSError:
+        pass
+    return stats
@@ -0,0 +1,58 @@
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+import logging
+import uuid
+
+logger = logging.getLogger("agents.pipeline_context")
+
+# Contexto de la petición en curso (None fuera de una petición)
+_current_context: ContextVar[Optional["PipelineContext"]] = ContextVar("pipeline_context", default=None)
+
+
+class PipelineContext:
+    """
+    Estado de una única petición al pipeline.
+    Ejecuta la búsqueda RAG una sola vez y la comparte con reasoner, critic e improver.
+    """
+
+    def __init__(self, user_message: str, request_id: Optional[str] = None):
+        self.request_id = request_id or str(uuid.uuid4())
+        self.user_message = user_message
+        self.rag_context: Optional[Dict[str, Any]] = None
+        self.embed_calls = 0
+        # Tiempos por etapa cuando la petición se ejecuta con PipelineDAG
+        self.stage_timings: Dict[str, Any] = {}
+        self._token = None
+
+    def __enter__(self) -> "PipelineContext":
+        self._token = _current_context.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_context.reset(self._token)
+        self._token = None
+        logger.info(f"[{self.request_id}] Embeddings calculados en la petición: {self.embed_calls}")
+        return False
+
+    def retrieve(self, rag_agent) -> Dict[str, Any]:
+        """Devuelve el contexto RAG, buscando solo la primera vez"""
+        if self.rag_context is None:
+            self.rag_context = rag_agent.search(self.user_message)
+        return self.rag_context
+
+    async def aretrieve(self, rag_agent) -> Dict[str, Any]:
+        """Como retrieve, pero sin bloquear el event loop"""
+        if self.rag_context is None:
+            self.rag_context = await rag_agent.asearch(self.user_message)
+        return self.rag_context
+
+
+def current_context() -> Optional[PipelineContext]:
+    return _current_context.get()
+
+
+def record_embedding_call(count: int = 1):
+    """Lo llama el RAGAgent cada vez que codifica consultas con el modelo"""
+    ctx = _current_context.get()
+    if ctx is not None:
+        ctx.embed_calls += count
@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from .pipeline_context import current_context
+    from ..metrics import metrics
+except ImportError:
+    from pipeline_context import current_context
+    from metrics import metrics
+
+logger = logging.getLogger("agents.pipeline_dag")
+
+# Timeout por defecto de cada etapa (segundos)
+PIPELINE_STAGE_TIMEOUT = float(os.getenv("PIPELINE_STAGE_TIMEOUT", "30"))
+
+
+class StageError(Exception):
+    """Fallo (o timeout) de una etapa obligatoria; el resto de etapas se cancela"""
+
+    def __init__(self, stage: str, cause: BaseException):
+        super().__init__(f"Etapa '{stage}' falló: {cause!r}")
+        self.stage = stage
+        self.cause = cause
+
+
+class Stage:
+    """
+    Etapa del pipeline: `fn(**inputs)` es una corrutina que devuelve el valor de su única
+    salida o, si declara varias, un dict con todas ellas.
+    Si es opcional y falla o vence su timeout, sus salidas toman `defaults` y el pipeline sigue.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Awaitable[Any]], inputs: Iterable[str] = (),
+                 outputs: Iterable[str] = (), timeout: Optional[float] = PIPELINE_STAGE_TIMEOUT,
+                 optional: bool = False, defaults: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.timeout = timeout
+        self.optional = optional
+        self.defaults = defaults or {}
+
+    def _unpack(self, value: Any) -> Dict[str, Any]:
+        if not self.outputs:
+            return {}
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: value}
+        missing = [o for o in self.outputs if o not in value]
+        if missing:
+            raise ValueError(f"La etapa '{self.name}' no devolvió {missing}")
+        return {o: value[o] for o in self.outputs}
+
+
+class PipelineDAG:
+    """
+    Ejecuta etapas en cuanto sus entradas están disponibles; las independientes corren
+    concurrentemente. Cada etapa tiene su timeout y se cancela si falla una obligatoria.
+    """
+
+    def __init__(self, stages: List[Stage], inputs: Iterable[str] = ()):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Nombres de etapa duplicados")
+        self.inputs = set(inputs)
+        self._producers: Dict[str, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self._producers or output in self.inputs:
+                    raise ValueError(f"La salida '{output}' se produce más de una vez")
+                self._producers[output] = stage.name
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self._producers and name not in self.inputs:
+                    raise ValueError(f"La entrada '{name}' de '{stage.name}' no la produce ninguna etapa")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo en el pipeline en la etapa '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].inputs:
+                if dep in self._producers:
+                    visit(self._producers[dep])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def _run_stage(self, stage: Stage, values: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {name: values[name] for name in stage.inputs}
+        if stage.timeout:
+            value = await asyncio.wait_for(stage.fn(**kwargs), stage.timeout)
+        else:
+            value = await stage.fn(**kwargs)
+        return stage._unpack(value)
+
+    async def run(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo con los valores iniciales dados. Devuelve todos los valores producidos;
+        los tiempos por etapa quedan en values["stage_timings"] y en el PipelineContext actual.
+        """
+        missing = self.inputs - set(values)
+        if missing:
+            raise ValueError(f"Faltan entradas del pipeline: {sorted(missing)}")
+
+        values = dict(values)
+        timings: Dict[str, Dict[str, Any]] = {}
+        pending = dict(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+        started: Dict[str, float] = {}
+        origin = time.perf_counter()
+
+        def launch_ready():
+            for name, stage in list(pending.items()):
+                if all(i in values for i in stage.inputs):
+                    del pending[name]
+                    started[name] = time.perf_counter()
+                    running[asyncio.ensure_future(self._run_stage(stage, values))] = stage
+
+        def record(stage: Stage, status: str):
+            end = time.perf_counter()
+            if status == "ok":
+                metrics.observe_stage(stage.name, end - started[stage.name])
+            timings[stage.name] = {
+                "start_ms": round((started[stage.name] - origin) * 1000, 2),
+                "duration_ms": round((end - started[stage.name]) * 1000, 2),
+                "status": status,
+            }
+
+        try:
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    try:
+                        values.update(task.result())
+                        record(stage, "ok")
+                    except Exception as e:
+                        status = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                        record(stage, status)
+                        if not stage.optional:
+                            raise StageError(stage.name, e) from e
+                        logger.warning(f"Etapa opcional '{stage.name}' {status}: {e!r}")
+                        values.update(stage.defaults)
+                launch_ready()
+        finally:
+            # Error, cancelación de la petición o salida anticipada: cancelar lo que siga en vuelo
+            for task, stage in running.items():
+                task.cancel()
+                record(stage, "cancelled")
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for name in pending:
+                timings[name] = {"start_ms": None, "duration_ms": 0, "status": "skipped"}
+            timings["total_ms"] = round((time.perf_counter() - origin) * 1000, 2)
+            ctx = current_context()
+            if ctx is not None:
+                ctx.stage_timings = timings
+            values["stage_timings"] = timings
+
+        return values
@@ -1,19 +1,94 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
-import faiss
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import contextvars
+import threading
+import asyncio
+import logging
 import json
+import time
+import os
+
+try:
+    from .pipeline_context import record_embedding_call
+    from .embedding_scheduler import EmbeddingBatcher, RAG_BATCH_WINDOW_MS, RAG_MAX_BATCH
+    from . import index_snapshot
+    from .mmap_index import MmapFlatL2Index, RAG_INDEX_MMAP, open_vectors_mmap
+    from . import index_factory
+    from .ingest import KnowledgeIngestor
+    from .embedding_cache import create_embedding_cache
+    from .rw_lock import ReadWriteLock
+    from ..metrics import metrics
+    from ..single_flight import SingleFlight
+except ImportError:
+    from pipeline_context import record_embedding_call
+    from embedding_scheduler import EmbeddingBatcher, RAG_BATCH_WINDOW_MS, RAG_MAX_BATCH
+    import index_snapshot
+    from mmap_index import MmapFlatL2Index, RAG_INDEX_MMAP, open_vectors_mmap
+    import index_factory
+    from ingest import KnowledgeIngestor
+    from embedding_cache import create_embedding_cache
+    from rw_lock import ReadWriteLock
+    from metrics import metrics
+    from single_flight import SingleFlight
+
+logger = logging.getLogger("agents.rag")
+
+RAG_MODEL_NAME = os.getenv("RAG_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# Hilos dedicados a encode + búsqueda FAISS (fuera del event loop)
+RAG_EXECUTOR_WORKERS = int(os.getenv("RAG_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
 
 class RAGAgent:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, executor_workers: int = RAG_EXECUTOR_WORKERS,
+                 batch_window_ms: float = RAG_BATCH_WINDOW_MS, max_batch: int = RAG_MAX_BATCH,
+                 use_mmap: bool = RAG_INDEX_MMAP, index_type: str = index_factory.RAG_INDEX_TYPE):
+        # Import diferido: torch + sentence-transformers tardan segundos en cargar
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(RAG_MODEL_NAME)
+        self.model_fingerprint = index_snapshot.model_fingerprint(RAG_MODEL_NAME, self.model)
         self.knowledge_base = self._load_knowledge_base()
-        self.embeddings = self._compute_embeddings()
+        self.index_type = index_type
+        self.use_mmap = use_mmap and index_snapshot.RAG_SNAPSHOT_ENABLED
+        if use_mmap and not self.use_mmap:
+            logger.warning("RAG_INDEX_MMAP requiere RAG_SNAPSHOT=1; se usa el índice en memoria")
+        # En modo mmap el índice es de solo lectura: la ingesta se hace en otro proceso
+        self.read_only = self.use_mmap
+        # Búsquedas en paralelo (FAISS libera el GIL); altas y bajas de la ingesta en exclusiva
+        self._index_lock = ReadWriteLock()
+        # Se incrementa con cada alta/baja de vectores; invalida cachés de respuestas
+        self.index_generation = 0
         
-        dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(self.embeddings)
-        self.id_map = {i: doc for i, doc in enumerate(self.knowledge_base)}
+        live_loaded = self._load_live_state()
+        if not live_loaded:
+            self._load_or_build_embeddings()
+            self.index_spec = index_factory.index_spec(index_type, self.embeddings.shape[0], self.embeddings.shape[1])
+            self.index = self._build_index()
+            self.doc_registry = {
+                doc["id"]: {"hash": index_snapshot.content_hash(doc), "ids": [int(i)]}
+                for i, doc in self.id_map.items()
+            }
+            self._next_id = max(self.id_map, default=-1) + 1
+        self.stats = {"embed_calls": 0, "embedded_queries": 0, "searches": 0}
+        self._stats_lock = threading.Lock()
+        
+        # Caché de embeddings de consultas repetidas (None si RAG_EMBED_CACHE_BYTES=0)
+        self.embedding_cache = create_embedding_cache(self.model_fingerprint)
+        
+        # Pool acotado para que encode/search no bloqueen el event loop
+        self.executor_workers = max(1, executor_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="rag-search")
+        self._pending = 0
+        
+        # Micro-batching de consultas concurrentes (ventana 0 = desactivado)
+        self.batcher = EmbeddingBatcher(self, batch_window_ms, max_batch) if batch_window_ms > 0 else None
+        
+        # Búsquedas idénticas concurrentes comparten un solo encode + FAISS
+        self.search_flight = SingleFlight("rag")
+        
+        if live_loaded and not self.read_only:
+            # Sincronizar la base integrada con el estado vivo (sin re-embeber lo que no cambió)
+            KnowledgeIngestor(self).ingest(self.knowledge_base)
     
     def _load_knowledge_base(self) -> List[Dict[str, Any]]:
         base = [
@@ -68,45 +143,298 @@ class RAGAgent:
         ]
         return base
     
+    def _load_live_state(self) -> bool:
+        """Carga el índice vivo (base integrada + documentos ingeridos) si existe y es compatible"""
+        if not index_snapshot.RAG_SNAPSHOT_ENABLED:
+            return False
+        start = time.perf_counter()
+        live = index_snapshot.load_live_state(index_snapshot.RAG_SNAPSHOT_DIR, self.model_fingerprint,
+                                              self.index_type, mmap=self.use_mmap)
+        if not live:
+            return False
+        
+        self.index = live["index"]
+        index_factory.apply_default_search_params(self.index)
+        self.index_spec = live["meta"]["spec"]
+        self.id_map = live["id_map"]
+        self.doc_registry = live["registry"]
+        self._next_id = live["meta"]["next_id"]
+        self.kb_hash = index_snapshot.kb_content_hash(self.knowledge_base)
+        load_seconds = time.perf_counter() - start
+        self.startup_stats = {
+            "source": "live",
+            "kb_hash": self.kb_hash,
+            "documents": len(self.doc_registry),
+            "load_seconds": round(load_seconds, 4),
+            # False en modo mmap = cada worker tiene su propia copia del índice
+            "shared_mmap": isinstance(self.index, MmapFlatL2Index)
+        }
+        logger.info(f"⚡ Índice vivo cargado: {len(self.doc_registry)} documentos, {len(self.id_map)} vectores en {load_seconds:.3f}s")
+        return True
+    
+    def _load_or_build_embeddings(self):
+        """Carga vectores e id_map del snapshot en disco; solo re-embebe si cambió el contenido o el modelo"""
+        kb_hash = index_snapshot.kb_content_hash(self.knowledge_base)
+        self.kb_hash = kb_hash
+        fingerprint = self.model_fingerprint
+        
+        start = time.perf_counter()
+        snapshot = None
+        if index_snapshot.RAG_SNAPSHOT_ENABLED:
+            snapshot = index_snapshot.load_snapshot(index_snapshot.RAG_SNAPSHOT_DIR, fingerprint, kb_hash,
+                                                    mmap=self.use_mmap)
+        
+        if snapshot:
+            self.embeddings = snapshot["embeddings"]
+            self.id_map = snapshot["id_map"]
+            load_seconds = time.perf_counter() - start
+            saved = max(0.0, snapshot["meta"]["build_seconds"] - load_seconds)
+            self.startup_stats = {
+                "source": "snapshot",
+                "kb_hash": kb_hash,
+                "load_seconds": round(load_seconds, 4),
+                "saved_seconds": round(saved, 4)
+            }
+            logger.info(f"⚡ Snapshot del índice cargado en {load_seconds:.3f}s (ahorro estimado {saved:.3f}s)")
+            return
+        
+        self.embeddings = self._compute_embeddings()
+        self.id_map = {i: doc for i, doc in enumerate(self.knowledge_base)}
+        build_seconds = time.perf_counter() - start
+        self.startup_stats = {
+            "source": "embedded",
+            "kb_hash": kb_hash,
+            "build_seconds": round(build_seconds, 4),
+            "saved_seconds": 0.0
+        }
+        logger.info(f"Embeddings de la base de conocimiento calculados en {build_seconds:.3f}s")
+        
+        if index_snapshot.RAG_SNAPSHOT_ENABLED:
+            try:
+                index_snapshot.save_snapshot(index_snapshot.RAG_SNAPSHOT_DIR, self.embeddings, self.id_map,
+                                             fingerprint, kb_hash, build_seconds)
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el snapshot del índice: {e}")
+    
+    def _build_index(self):
+        """Índice FAISS en memoria, o índice de solo lectura sobre los vectores memory-mapped del snapshot"""
+        if self.index_spec != "Flat":
+            return self._build_ann_index()
+        
+        if self.use_mmap:
+            if not isinstance(self.embeddings, np.memmap):
+                # Recién calculados: reabrir desde el snapshot para compartir páginas con otros workers
+                vectors_path = index_snapshot.RAG_SNAPSHOT_DIR / index_snapshot.VECTORS_FILE
+                if vectors_path.exists():
+                    self.embeddings = open_vectors_mmap(vectors_path)
+            if isinstance(self.embeddings, np.memmap):
+                logger.info(f"🗺️ Índice memory-mapped compartido ({self.embeddings.shape[0]} vectores)")
+                return MmapFlatL2Index(self.embeddings)
+            logger.warning("No hay snapshot para mapear; se usa el índice en memoria")
+        
+        return index_factory.build_index("Flat", self.embeddings, ids=list(self.id_map))
+    
+    def _build_ann_index(self):
+        """Índice aproximado (IVF/PQ/HNSW): se reutiliza el entrenado en el snapshot si sigue siendo válido"""
+        snapshot_dir = index_snapshot.RAG_SNAPSHOT_DIR
+        if index_snapshot.RAG_SNAPSHOT_ENABLED:
+            index = index_snapshot.load_index(snapshot_dir, self.index_spec, self.kb_hash, mmap=self.use_mmap)
+            if index is not None:
+                index_factory.apply_default_search_params(index)
+                logger.info(f"⚡ Índice {self.index_spec} cargado del snapshot")
+                return index
+        
+        start = time.perf_counter()
+        index = index_factory.build_index(self.index_spec, self.embeddings, ids=list(self.id_map))
+        logger.info(f"Índice {self.index_spec} entrenado en {time.perf_counter() - start:.2f}s")
+        if index_snapshot.RAG_SNAPSHOT_ENABLED:
+            try:
+                index_snapshot.save_index(snapshot_dir, index, self.index_spec, self.kb_hash)
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"No se pudo guardar el índice entrenado: {e}")
+        return index
+    
+    @property
+    def index_version(self) -> str:
+        """Identifica el contenido actual del índice (modelo, base y cambios incrementales)"""
+        return f"{self.model_fingerprint}|{self.index_spec}|{self.kb_hash[:12]}|{self._next_id}|{self.index_generation}"
+    
+    def index_stats(self) -> Dict[str, Any]:
+        kind, params = index_factory.describe(self.index)
+        return {
+            "spec": self.index_spec, "type": kind, "ntotal": int(self.index.ntotal), "version": self.index_version,
+            "documents": len(self.doc_registry), "vectors": len(self.id_map), **params
+        }
+    
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embeddings de documentos para la ingesta (no cuentan como embeddings de consulta)"""
+        return self.model.encode(texts, convert_to_numpy=True)
+    
+    def add_vectors(self, vectors: np.ndarray, docs: List[Dict[str, Any]]) -> List[int]:
+        """Añade vectores al índice vivo con ids nuevos y devuelve los ids asignados"""
+        if self.read_only:
+            raise RuntimeError("Índice memory-mapped de solo lectura: la ingesta debe hacerse en otro proceso")
+        with self._index_lock.write():
+            ids = np.arange(self._next_id, self._next_id + len(docs), dtype=np.int64)
+            self.index.add_with_ids(np.ascontiguousarray(vectors, dtype=np.float32), ids)
+            self._next_id += len(docs)
+            for vector_id, doc in zip(ids.tolist(), docs):
+                self.id_map[vector_id] = doc
+            self.index_generation += 1
+        return ids.tolist()
+    
+    def remove_vectors(self, ids: List[int]):
+        """Elimina vectores del índice vivo sin reconstruirlo"""
+        if self.read_only:
+            raise RuntimeError("Índice memory-mapped de solo lectura: la ingesta debe hacerse en otro proceso")
+        with self._index_lock.write():
+            for vector_id in ids:
+                self.id_map.pop(vector_id, None)
+            self.index_generation += 1
+            try:
+                self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            except RuntimeError:
+                # HNSW no admite borrados: el vector queda como lápida y se filtra al no estar en id_map
+                pass
+    
+    def rebuild_index_if_needed(self, save: bool = True) -> bool:
+        """
+        Tras una ingesta: si con el tamaño actual del corpus el tipo configurado da otro spec
+        (p. ej. Flat -> IVF al superar el mínimo de entrenamiento, o más listas IVF), reconstruye
+        y entrena el índice con los vectores que ya contiene. Devuelve True si lo reconstruyó.
+        """
+        if self.read_only:
+            return False
+        with self._index_lock.write():
+            ids = np.fromiter(self.id_map, dtype=np.int64, count=len(self.id_map))
+            spec = index_factory.index_spec(self.index_type, len(ids), self.index.d)
+            if spec == self.index_spec or not len(ids):
+                return False
+            start = time.perf_counter()
+            vectors = index_factory.reconstruct_vectors(self.index, ids)
+            self.index = index_factory.build_index(spec, vectors, ids=ids)
+            logger.info(f"Índice {self.index_spec} -> {spec} reconstruido con {len(ids)} vectores "
+                        f"en {time.perf_counter() - start:.2f}s")
+            self.index_spec = spec
+            self.index_generation += 1
+        if save and index_snapshot.RAG_SNAPSHOT_ENABLED:
+            self.save_state()
+        return True
+    
+    def save_state(self):
+        """Persiste el índice vivo para que el siguiente arranque no tenga que re-ingerir"""
+        with self._index_lock.read():
+            index_snapshot.save_live_state(index_snapshot.RAG_SNAPSHOT_DIR, self.index, self.id_map,
+                                           self.doc_registry, self.model_fingerprint, self.index_type,
+                                           self.index_spec, self._next_id)
+    
     def _compute_embeddings(self):
         texts = [item["content"] for item in self.knowledge_base]
         return self.model.encode(texts, convert_to_numpy=True)
     
-    def search(self, query: str, top_k: int = 3) -> Dict[str, Any]:
+    def _encode_queries(self, queries: List[str]) -> Tuple[np.ndarray, List[bool]]:
+        """
+        Embeddings de las consultas, usando la caché cuando es posible.
+        Devuelve también qué consultas se codificaron realmente con el modelo.
+        """
+        cached = [self.embedding_cache.get(q) for q in queries] if self.embedding_cache else [None] * len(queries)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if self.embedding_cache:
+            metrics.cache("embedding", True, len(queries) - len(missing))
+            metrics.cache("embedding", False, len(missing))
+        
+        if missing:
+            with self._stats_lock:
+                self.stats["embed_calls"] += 1
+                self.stats["embedded_queries"] += len(missing)
+            record_embedding_call()
+            with metrics.stage_timer("embed"):
+                encoded = self.model.encode([queries[i] for i in missing], convert_to_numpy=True)
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+                if self.embedding_cache:
+                    self.embedding_cache.put(queries[i], vector)
+        
+        missing_set = set(missing)
+        return np.vstack(cached).astype(np.float32), [i in missing_set for i in range(len(queries))]
+    
+    def embedding_cache_stats(self) -> Dict[str, Any]:
+        return self.embedding_cache.stats() if self.embedding_cache else {"enabled": False}
+    
+    async def asearch(self, query: str, top_k: int = 3, nprobe: Optional[int] = None,
+                      ef_search: Optional[int] = None) -> Dict[str, Any]:
+        """Versión asíncrona de search: ejecuta encode y FAISS en el pool de hilos"""
+        # La generación del índice en la clave: una búsqueda anterior a una ingesta no se comparte después
+        key = (query, top_k, nprobe, ef_search, self.index_generation)
+        return await self.search_flight.do(key, lambda: self._asearch(query, top_k, nprobe, ef_search))
+    
+    async def _asearch(self, query: str, top_k: int, nprobe: Optional[int],
+                       ef_search: Optional[int]) -> Dict[str, Any]:
+        self._pending += 1
         try:
-            query_embedding = self.model.encode([query], convert_to_numpy=True)
-            distances, indices = self.index.search(query_embedding, top_k)
-            
-            results = []
-            for i, idx in enumerate(indices[0]):
-                sim_score = 1 / (1 + distances[0][i])
-                
-                # Umbral más bajo para encontrar más resultados
-                if sim_score > 0.25:  # Reducido de 0.3 para más cobertura
-                    doc = self.id_map[idx]
-                    results.append({
-                        "content": doc["content"],
-                        "category": doc["category"],
-                        "similarity": float(sim_score),
-                        "tags": doc["tags"]
-                    })
-            
-            max_similarity = max([r["similarity"] for r in results]) if results else 0
-            
-            # Mejorar detección de relevancia
-            is_relevant = max_similarity > 0.45  # Umbral más bajo
-            
-            return {
-                "query": query,
-                "results": results,
-                "max_similarity": max_similarity,
-                "results_count": len(results),
-                "is_relevant": is_relevant,
-                "relevance_level": self._get_relevance_level(max_similarity)
-            }
+            if self.batcher:
+                return await self.batcher.submit(query, top_k, nprobe, ef_search)
+            loop = asyncio.get_running_loop()
+            # Copiar el contexto para conservar el PipelineContext de la petición en el hilo
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, ctx.run, self.search, query, top_k, nprobe, ef_search)
+        finally:
+            self._pending -= 1
+
+    async def asearch_batch(self, queries: List[str], top_k: int = 3, nprobe: Optional[int] = None,
+                            ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Versión asíncrona de search_batch: un encode y una búsqueda FAISS para todas las consultas"""
+        self._pending += len(queries)
+        try:
+            loop = asyncio.get_running_loop()
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, ctx.run, self.search_batch, queries, top_k, nprobe, ef_search)
+        finally:
+            self._pending -= len(queries)
+    
+    def executor_stats(self) -> Dict[str, int]:
+        """Tamaño del pool y profundidad de la cola de búsquedas pendientes"""
+        return {
+            "pool_size": self.executor_workers,
+            "in_flight": min(self._pending, self.executor_workers),
+            "queue_depth": max(0, self._pending - self.executor_workers)
+        }
+    
+    def batching_stats(self) -> Dict[str, Any]:
+        return self.batcher.stats() if self.batcher else {"enabled": False}
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+    
+    def search(self, query: str, top_k: int = 3, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None) -> Dict[str, Any]:
+        return self.search_batch([query], top_k, nprobe, ef_search)[0]
+    
+    def search_batch(self, queries: List[str], top_k: int = 3, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Codifica todas las consultas en un solo encode y hace una única búsqueda FAISS.
+        nprobe (IVF) y ef_search (HNSW) ajustan precisión/latencia solo para esta búsqueda.
+        """
+        return self.search_batch_detailed(queries, top_k, nprobe, ef_search)[0]
+    
+    def search_batch_detailed(self, queries: List[str], top_k: int = 3, nprobe: Optional[int] = None,
+                              ef_search: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        """Como search_batch, indicando además qué consultas necesitaron el modelo (no estaban en caché)"""
+        with self._stats_lock:
+            self.stats["searches"] += len(queries)
+        try:
+            query_embeddings, encoded = self._encode_queries(queries)
+            params = index_factory.search_params(self.index, nprobe, ef_search)
+            with self._index_lock.read(), metrics.stage_timer("faiss_search"):
+                if params is not None:
+                    distances, indices = self.index.search(query_embeddings, top_k, params=params)
+                else:
+                    distances, indices = self.index.search(query_embeddings, top_k)
+            return [self._build_result(q, distances[n], indices[n]) for n, q in enumerate(queries)], encoded
         
         except Exception as e:
-            return {
+            return [{
                 "query": query,
                 "results": [],
                 "max_similarity": 0,
@@ -114,7 +442,39 @@ class RAGAgent:
                 "is_relevant": False,
                 "relevance_level": "none",
                 "error": str(e)
-            }
+            } for query in queries], [False] * len(queries)
+    
+    def _build_result(self, query: str, distances: np.ndarray, indices: np.ndarray) -> Dict[str, Any]:
+        results = []
+        for i, idx in enumerate(indices):
+            # FAISS devuelve -1 cuando hay menos vectores que top_k
+            if idx < 0 or idx not in self.id_map:
+                continue
+            sim_score = 1 / (1 + distances[i])
+            
+            # Umbral más bajo para encontrar más resultados
+            if sim_score > 0.25:  # Reducido de 0.3 para más cobertura
+                doc = self.id_map[idx]
+                results.append({
+                    "content": doc["content"],
+                    "category": doc["category"],
+                    "similarity": float(sim_score),
+                    "tags": doc["tags"]
+                })
+        
+        max_similarity = max([r["similarity"] for r in results]) if results else 0
+        
+        # Mejorar detección de relevancia
+        is_relevant = max_similarity > 0.45  # Umbral más bajo
+        
+        return {
+            "query": query,
+            "results": results,
+            "max_similarity": max_similarity,
+            "results_count": len(results),
+            "is_relevant": is_relevant,
+            "relevance_level": self._get_relevance_level(max_similarity)
+        }
     
     def _get_relevance_level(self, similarity: float) -> str:
         """Determina el nivel de relevancia basado en similitud"""
@@ -127,5 +487,65 @@ class RAGAgent:
         else:
             return "none"
 
+class LazyRAGAgent:
+    """
+    Instancia global perezosa: importar el módulo no carga modelo ni índice.
+    El RAGAgent se construye con load() (arranque de la app) o en el primer acceso a un atributo.
+    """
+    def __init__(self, factory=RAGAgent):
+        self._factory = factory
+        self._agent: Optional[RAGAgent] = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+    
+    @property
+    def loaded(self) -> bool:
+        return self._agent is not None
+    
+    def load(self) -> RAGAgent:
+        """Construye el agente una sola vez (thread-safe); las llamadas concurrentes esperan"""
+        if self._agent is not None:
+            return self._agent
+        with self._lock:
+            if self._agent is None:
+                self._loading = True
+                start = time.perf_counter()
+                try:
+                    self._agent = self._factory()
+                    self.load_error = None
+                except Exception as e:
+                    self.load_error = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    self._loading = False
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                logger.info(f"RAG agent cargado en {self.load_seconds}s")
+        return self._agent
+    
+    async def aload(self) -> RAGAgent:
+        """load() fuera del event loop"""
+        if self._agent is not None:
+            return self._agent
+        return await asyncio.to_thread(self.load)
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded, "loading": self._loading,
+            "load_seconds": self.load_seconds, "error": self.load_error
+        }
+    
+    def shutdown(self):
+        # No se carga el modelo solo para cerrarlo
+        if self._agent is not None:
+            self._agent.shutdown()
+    
+    def __getattr__(self, name: str):
+        # copy/pickle consultan dunders antes de __init__: no deben disparar la carga
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
 # Instancia global
-rag_agent = RAGAgent()
\ No newline at end of file
+rag_agent = LazyRAGAgent()
\ No newline at end of file
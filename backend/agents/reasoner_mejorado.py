@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 
 # Configurar logging
@@ -10,9 +10,10 @@ class ReasonerAgent:
         self.rag_agent = rag_agent
         logger.info("ReasonerAgent inicializado con RAG mejorado")
     
-    async def reason(self, user_message: str) -> Dict[str, Any]:
-        # Primero obtener contexto RAG
-        rag_results = self.rag_agent.search(user_message)
+    async def reason(self, user_message: str, rag_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Usar el contexto RAG ya calculado para la petición; buscar solo si no viene dado
+        if rag_results is None:
+            rag_results = self.rag_agent.search(user_message)
         logger.info(f"RAG encontró {rag_results['results_count']} resultados, similitud: {rag_results.get('max_similarity', 0):.2f}, relevante: {rag_results.get('is_relevant', False)}")
         
         # Determinar si debemos responder o no
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark recall vs latencia de los índices ANN contra el índice Flat (ground truth).
+
+Uso:
+    python benchmarks/ann_recall.py --docs 200000 --queries 500
+    python benchmarks/ann_recall.py --vectors data/rag_index/vectors.npy --output ann.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agents'))
+
+import index_factory
+
+NPROBE_SWEEP = [1, 4, 8, 16, 32, 64, 128]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries: np.ndarray, k: int, params=None):
+    start = time.perf_counter()
+    if params is not None:
+        _, found = index.search(queries, k, params=params)
+    else:
+        _, found = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    return found, elapsed * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k y latencia de IVF/PQ/HNSW frente a Flat")
+    parser.add_argument("--vectors", help="Fichero .npy con los vectores del corpus (por defecto, sintético)")
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="ivf_flat,ivf_pq,hnsw")
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.vectors:
+        corpus = np.load(args.vectors).astype(np.float32)
+    else:
+        corpus = rng.standard_normal((args.docs, args.dim), dtype=np.float32)
+    # Consultas: vectores del corpus con ruido, como consultas parecidas a documentos reales
+    picks = rng.choice(corpus.shape[0], size=args.queries, replace=False)
+    queries = corpus[picks] + 0.1 * rng.standard_normal((args.queries, corpus.shape[1]), dtype=np.float32)
+
+    n, dim = corpus.shape
+    print(f"📦 Corpus: {n} vectores x {dim} dims | {args.queries} consultas | k={args.k}")
+
+    flat = index_factory.build_index("Flat", corpus)
+    truth, flat_ms = timed_search(flat, queries, args.k)
+    report = {"docs": n, "dim": dim, "k": args.k, "results": [
+        {"type": "flat", "spec": "Flat", "recall": 1.0, "ms_per_query": round(flat_ms, 4), "build_seconds": 0}
+    ]}
+    print(f"   Flat: {flat_ms:.3f} ms/consulta (ground truth)")
+
+    for index_type in args.types.split(","):
+        spec = index_factory.index_spec(index_type, n, dim)
+        start = time.perf_counter()
+        index = index_factory.build_index(spec, corpus)
+        build_seconds = time.perf_counter() - start
+        print(f"\n🔧 {index_type} ({spec}) construido en {build_seconds:.1f}s")
+
+        if spec.startswith("IVF"):
+            sweep = [("nprobe", v, faiss.SearchParametersIVF(nprobe=v)) for v in NPROBE_SWEEP
+                     if v <= faiss.extract_index_ivf(index).nlist]
+        elif spec.startswith("HNSW"):
+            sweep = [("efSearch", v, faiss.SearchParametersHNSW(efSearch=v)) for v in EF_SEARCH_SWEEP]
+        else:
+            sweep = [("default", None, None)]
+
+        for name, value, params in sweep:
+            found, ms = timed_search(index, queries, args.k, params)
+            recall = recall_at_k(found, truth)
+            report["results"].append({
+                "type": index_type, "spec": spec, name: value,
+                "recall": round(recall, 4), "ms_per_query": round(ms, 4),
+                "speedup_vs_flat": round(flat_ms / ms, 2) if ms else None,
+                "build_seconds": round(build_seconds, 2)
+            })
+            print(f"   {name}={value}: recall@{args.k}={recall:.3f} | {ms:.3f} ms/consulta | x{flat_ms / ms:.1f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Utilidades compartidas por los benchmarks: percentiles, resumen de latencias y
+salida JSON con metadatos (commit, fecha, máquina) para comparar entre commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Consultas de referencia (las del antiguo test_final.py), agrupadas por categoría
+DEFAULT_QUERIES = {
+    "fuera_de_contexto": [
+        "Cómo cocinar una pizza",
+        "Qué películas de Marvel recomiendas",
+        "Dime sobre la historia de Roma antigua",
+    ],
+    "palabras_clave": [
+        "Python de serpientes",
+        "Docker en un barco",
+    ],
+    "tecnicas": [
+        "Cómo crear un contenedor Docker",
+        "Qué es Kubernetes",
+        "Cómo hacer una API con FastAPI",
+        "Fundamentos de Python",
+    ],
+    "generales": [
+        "hola",
+        "ayuda",
+        "qué puedes hacer",
+    ],
+}
+
+
+def all_queries() -> List[str]:
+    return [q for queries in DEFAULT_QUERIES.values() for q in queries]
+
+
+def load_queries(path: Optional[str]) -> List[str]:
+    """Una consulta por línea (o JSONL con campo "message"); sin fichero, las de referencia"""
+    if not path:
+        return all_queries()
+    queries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            queries.append(json.loads(line)["message"])
+        else:
+            queries.append(line)
+    return queries
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil con interpolación lineal sobre valores ya ordenados"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def summarize(latencies_s: List[float]) -> Dict[str, float]:
+    """Resumen en milisegundos: media, p50/p95/p99 y máximo"""
+    values = sorted(v * 1000 for v in latencies_s)
+    if not values:
+        return {"count": 0, "mean_ms": 0, "p50_ms": 0, "p95_ms": 0, "p99_ms": 0, "max_ms": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata() -> Dict[str, Any]:
+    return {
+        "commit": git_revision(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def emit(name: str, results: Dict[str, Any], output: Optional[str]):
+    """Imprime los resultados y, si se indica, los guarda como JSON con metadatos"""
+    payload = {"benchmark": name, "meta": metadata(), "results": results}
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text, encoding="utf-8")
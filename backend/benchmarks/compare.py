@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compara dos resultados JSON de benchmarks (p. ej. de dos commits) y muestra las métricas
+numéricas que cambian más de un umbral.
+
+Uso:
+    python benchmarks/compare.py results/base.json results/head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Métricas en las que un valor mayor es una mejora
+HIGHER_IS_BETTER = ("throughput_rps", "concurrent_writes_per_s", "recall", "hit_ratio")
+# Parámetros de la ejecución, no resultados
+IGNORED = ("count", "size", "requests", "rate", "concurrency", "duration_s", "wall_s", "distinct_queries")
+
+
+def flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from flatten(item, f"{prefix}[{i}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    base_values = dict(flatten(base.get("results", {})))
+    head_values = dict(flatten(head.get("results", {})))
+    changes = []
+    for key in sorted(base_values.keys() & head_values.keys()):
+        name = key.rsplit(".", 1)[-1]
+        old, new = base_values[key], head_values[key]
+        if old == 0 or name.endswith(IGNORED):
+            continue
+        delta = (new - old) / abs(old) * 100
+        if abs(delta) < threshold:
+            continue
+        better = delta > 0 if name.startswith(HIGHER_IS_BETTER) else delta < 0
+        changes.append({"metric": key, "base": old, "head": new, "delta_pct": round(delta, 1),
+                        "verdict": "mejora" if better else "regresión"})
+    return {
+        "base": base.get("meta", {}).get("commit"),
+        "head": head.get("meta", {}).get("commit"),
+        "threshold_pct": threshold,
+        "changes": changes,
+        "regressions": sum(1 for c in changes if c["verdict"] == "regresión"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diferencias entre dos resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Cambio mínimo en %% para mostrarlo")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Código de salida 1 si hay regresiones")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    report = compare(base, head, args.threshold)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.fail_on_regression and report["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Simulación del ProviderRouter con proveedores locales de latencia inyectada (sin red):
+compara la latencia de cola con y sin hedge y el coste en llamadas extra.
+
+El primario tiene una latencia base con una fracción de llamadas lentas (--tail-ratio veces
+--tail-factor); el secundario responde con latencia fija y, opcionalmente, falla. Los dos son
+proveedores normales: los de fallback no entran en el hedge.
+
+Uso:
+    python benchmarks/hedging.py --requests 500 --concurrency 20
+    python benchmarks/hedging.py --primary-ms 800 --tail-ratio 0.1 --secondary-fail 0.2 --output results/hedge.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(BACKEND_DIR)
+
+from common import emit, summarize
+from provider_router import Provider, ProviderError, ProviderRouter
+
+
+def stub(name: str, base_ms: float, rng: random.Random, tail_ratio: float = 0.0,
+         tail_factor: float = 1.0, fail_ratio: float = 0.0):
+    async def call(messages, temperature):
+        delay = base_ms * rng.uniform(0.8, 1.2)
+        if rng.random() < tail_ratio:
+            delay *= tail_factor
+        await asyncio.sleep(delay / 1000)
+        if rng.random() < fail_ratio:
+            raise ProviderError(f"{name}: fallo inyectado")
+        return name
+    return call
+
+
+async def run(args, hedge: bool) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    router = ProviderRouter([
+        Provider("primary", stub("primary", args.primary_ms, rng, args.tail_ratio, args.tail_factor)),
+        Provider("secondary", stub("secondary", args.secondary_ms, rng, fail_ratio=args.secondary_fail)),
+    ], hedge_enabled=hedge, hedge_percentile=args.percentile)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await router.call([{"role": "user", "content": "hola"}], 0.2)
+            except ProviderError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    stats = router.stats()
+    calls = sum(p["calls"] for p in stats["providers"].values())
+    return {
+        "latency": summarize(latencies),
+        "errors": errors,
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+        # Llamadas a proveedores por petición (1.0 = sin coste extra)
+        "calls_per_request": round(calls / args.requests, 3),
+        "providers": stats["providers"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de cola del router de proveedores con y sin hedge")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--primary-ms", type=float, default=400)
+    parser.add_argument("--tail-ratio", type=float, default=0.05, help="Fracción de llamadas lentas del primario")
+    parser.add_argument("--tail-factor", type=float, default=10, help="Multiplicador de latencia de las lentas")
+    parser.add_argument("--secondary-ms", type=float, default=600)
+    parser.add_argument("--secondary-fail", type=float, default=0.0, help="Fracción de fallos del secundario")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "no_hedge": asyncio.run(run(args, hedge=False)),
+        "hedge": asyncio.run(run(args, hedge=True)),
+    }
+    emit("hedging", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
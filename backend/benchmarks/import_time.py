@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tiempo de import de los módulos de la app (main, orchestrator_final) en un proceso limpio.
+Importar no debe cargar torch, sentence-transformers ni faiss: el modelo se carga al
+arrancar FastAPI o en la primera petición.
+
+Uso:
+    python benchmarks/import_time.py --repeat 5 --output results/import.json
+    python benchmarks/import_time.py --max-ms 1500   # código de salida 1 si se supera
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(__file__))
+
+from common import emit, summarize
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Dependencias pesadas que solo deben cargarse con el modelo
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "faiss")
+
+# Se ejecuta en un intérprete nuevo para no heredar módulos ya importados
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> Dict[str, Any]:
+    code = PROBE.format(backend=BACKEND_DIR, module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> List[Dict[str, Any]]:
+    """Módulos con mayor tiempo acumulado según python -X importtime"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"; la sangría indica anidamiento
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]
+        # Solo módulos de primer nivel para no contar dos veces los submódulos
+        if name.startswith(" "):
+            continue
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de import de la app sin cargar modelos")
+    parser.add_argument("--modules", default="main,orchestrator_final")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Imports más lentos a listar")
+    parser.add_argument("--max-ms", type=float, help="Presupuesto de p50 en ms; falla si se supera")
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {}
+    failed = False
+    for module in args.modules.split(","):
+        runs = [measure(module) for _ in range(args.repeat)]
+        summary = summarize([r["elapsed"] for r in runs])
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        results[module] = {
+            "import": summary,
+            "heavy_modules_loaded": heavy,
+            "slowest": slowest_imports(module, args.top),
+        }
+        if heavy or (args.max_ms is not None and summary["p50_ms"] > args.max_ms):
+            failed = True
+    emit("import_time", results, args.output)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Generador de carga asíncrono contra /chat: throughput, latencias p50/p95/p99 y tasa de error.
+
+Modos:
+  - lazo cerrado (--concurrency N): N clientes que envían la siguiente petición al recibir la anterior
+  - lazo abierto (--rate R): llegadas de Poisson a R peticiones/s, independientes de la latencia
+
+Uso:
+    python benchmarks/load_test.py --concurrency 16 --requests 500
+    python benchmarks/load_test.py --rate 50 --duration 30 --output results/load.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.append(os.path.dirname(__file__))
+
+from common import emit, load_queries, summarize
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status = Counter()
+        self.cache = Counter()
+
+    def record(self, elapsed: float, response: Optional[httpx.Response], error: Optional[str] = None):
+        self.latencies.append(elapsed)
+        if response is None:
+            self.errors += 1
+            self.status[error or "error"] += 1
+            return
+        self.status[str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors += 1
+        if "X-Cache" in response.headers:
+            self.cache[response.headers["X-Cache"]] += 1
+
+
+async def _send(client: httpx.AsyncClient, url: str, message: str, result: LoadResult):
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json={"message": message})
+        result.record(time.perf_counter() - start, response)
+    except httpx.HTTPError as e:
+        result.record(time.perf_counter() - start, None, type(e).__name__)
+
+
+async def closed_loop(client, url: str, queries: List[str], concurrency: int, total: int, result: LoadResult):
+    counter = iter(range(total))
+
+    async def worker():
+        for n in counter:
+            await _send(client, url, queries[n % len(queries)], result)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, url: str, queries: List[str], rate: float, duration: float,
+                    result: LoadResult, rng: random.Random):
+    """Lanza peticiones según un proceso de Poisson sin esperar a las respuestas"""
+    loop = asyncio.get_running_loop()
+    tasks = []
+    end = loop.time() + duration
+    next_arrival = loop.time()
+    n = 0
+    while next_arrival < end:
+        delay = next_arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_send(client, url, queries[n % len(queries)], result)))
+        n += 1
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+
+async def run(args) -> Dict[str, Any]:
+    queries = load_queries(args.queries)
+    rng = random.Random(args.seed)
+    if args.shuffle:
+        rng.shuffle(queries)
+
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        # Calentamiento (no se mide): carga perezosa de modelos, conexiones, etc.
+        for message in queries[:args.warmup]:
+            await _send(client, args.url, message, LoadResult())
+
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, args.url, queries, args.rate, args.duration, result, rng)
+        else:
+            await closed_loop(client, args.url, queries, args.concurrency, args.requests, result)
+        wall = time.perf_counter() - start
+
+    total = len(result.latencies)
+    return {
+        "config": {
+            "url": args.url,
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "duration_s": args.duration if args.rate else None,
+            "concurrency": None if args.rate else args.concurrency,
+            "distinct_queries": len(queries),
+        },
+        "requests": total,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else 0,
+        "errors": result.errors,
+        "error_rate": round(result.errors / total, 4) if total else 0,
+        "latency": summarize(result.latencies),
+        "status_codes": dict(result.status),
+        "cache": dict(result.cache),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de /chat (lazo abierto o cerrado)")
+    parser.add_argument("--url", default="http://localhost:8002/chat")
+    parser.add_argument("--queries", help="Fichero con una consulta por línea o JSONL con 'message'")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes en lazo cerrado")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones totales en lazo cerrado")
+    parser.add_argument("--rate", type=float, help="Peticiones/s en lazo abierto (activa el modo abierto)")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga en lazo abierto")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    emit("load_test", asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de los componentes del pipeline:
+  - RAGAgent.search para distintos tamaños de corpus (vectores sintéticos añadidos al índice vivo)
+  - CriticAgent.critique
+  - MemoryStore.add_interaction para distintos tamaños de historial (backends log y sqlite)
+
+Uso:
+    python benchmarks/micro.py --only critic,memory --output results/micro.json
+    python benchmarks/micro.py --corpus-sizes 1000,100000 --index-type hnsw
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, 'agents'))
+sys.path.append(BACKEND_DIR)
+
+from common import all_queries, emit, summarize
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def bench_rag(corpus_sizes: List[int], iterations: int, index_type: str) -> List[Dict[str, Any]]:
+    import numpy as np
+    from rag_agent import RAGAgent
+
+    # Sin micro-batching ni caché de embeddings: se mide encode + búsqueda de cada consulta
+    agent = RAGAgent(batch_window_ms=0, index_type=index_type)
+    agent.embedding_cache = None
+    queries = all_queries()
+    rng = np.random.default_rng(0)
+    base = agent.model.encode([doc["content"] for doc in agent.knowledge_base], convert_to_numpy=True)
+
+    results = []
+    for size in sorted(corpus_sizes):
+        missing = size - len(agent.id_map)
+        if missing > 0:
+            # Vectores cercanos a los documentos reales para que las distancias sean realistas
+            picks = base[rng.integers(0, len(base), size=missing)]
+            vectors = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32)
+            start = len(agent.id_map)
+            docs = [{"id": f"synthetic-{start + i}", "content": "", "category": "synthetic", "tags": []}
+                    for i in range(missing)]
+            agent.add_vectors(vectors, docs)
+            # Como tras una ingesta: con corpus suficiente se entrena el IVF/PQ pedido
+            agent.rebuild_index_if_needed(save=False)
+
+        agent.search(queries[0])  # calentamiento
+        latencies = []
+        for n in range(iterations):
+            t = time.perf_counter()
+            agent.search(queries[n % len(queries)])
+            latencies.append(time.perf_counter() - t)
+        results.append({"corpus_size": len(agent.id_map), "index": agent.index_stats(), **summarize(latencies)})
+    agent.shutdown()
+    return results
+
+
+def bench_critic(iterations: int) -> Dict[str, Any]:
+    from critic import CriticAgent
+
+    critic = CriticAgent()
+    queries = all_queries()
+    rag_context = {"is_relevant": True, "max_similarity": 0.7, "results_count": 3}
+    answer = "**Docker** permite crear contenedores • docker build -t app . • docker run -p 8000:8000 app 💡"
+
+    async def run():
+        latencies = []
+        for n in range(iterations):
+            t = time.perf_counter()
+            await critic.critique(answer, queries[n % len(queries)], rag_context)
+            latencies.append(time.perf_counter() - t)
+        return latencies
+
+    return summarize(asyncio.run(run()))
+
+
+def _history_record(n: int) -> Dict[str, Any]:
+    return {
+        "type": "interaction",
+        "timestamp": f"2025-01-01T00:00:{n % 60:02d}Z",
+        "request_id": f"history-{n}",
+        "user_message": "Qué es Kubernetes",
+        "reasoner": "Kubernetes gestiona contenedores " * 8,
+        "critic": {"score": 0.8, "issues": []},
+        "improver": "",
+        "rag_context": "",
+    }
+
+
+def bench_memory(history_sizes: List[int], writes: int, backends: List[str]) -> List[Dict[str, Any]]:
+    from memory.store import MemoryStore
+    from memory.sqlite_store import SQLiteMemoryStore
+
+    async def measure(store, history: int) -> Dict[str, Any]:
+        for start in range(0, history, 5000):
+            await store.append_records([_history_record(n) for n in range(start, min(history, start + 5000))])
+
+        latencies = []
+        for n in range(writes):
+            t = time.perf_counter()
+            await store.add_interaction(f"bench-{n}", "Qué es Docker", "respuesta", {"score": 0.7}, "", "")
+            latencies.append(time.perf_counter() - t)
+
+        # Escrituras concurrentes: aprovecha el agrupado del backend
+        t = time.perf_counter()
+        await asyncio.gather(*(store.add_interaction(f"bench-c-{n}", "Qué es Docker", "respuesta", {"score": 0.7}, "", "")
+                               for n in range(writes)))
+        concurrent = time.perf_counter() - t
+        await store.close()
+        return {"sequential": summarize(latencies),
+                "concurrent_writes_per_s": round(writes / concurrent, 1) if concurrent else 0}
+
+    results = []
+    for backend in backends:
+        for history in history_sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                if backend == "sqlite":
+                    store = SQLiteMemoryStore(Path(tmp) / "memory.db")
+                else:
+                    store = MemoryStore(path=Path(tmp) / "store.json", log_dir=Path(tmp) / "log")
+                results.append({"backend": backend, "history_size": history, **asyncio.run(measure(store, history))})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de RAG, critic y memoria")
+    parser.add_argument("--only", default="rag,critic,memory", help="Subconjunto: rag,critic,memory")
+    parser.add_argument("--corpus-sizes", default="100,10000,100000")
+    parser.add_argument("--index-type", default=os.getenv("RAG_INDEX_TYPE", "flat"))
+    parser.add_argument("--history-sizes", default="0,10000,100000")
+    parser.add_argument("--memory-backends", default="log,sqlite")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    only = set(args.only.split(","))
+    results: Dict[str, Any] = {}
+    if "rag" in only:
+        results["rag_search"] = bench_rag(_sizes(args.corpus_sizes), args.iterations, args.index_type)
+    if "critic" in only:
+        results["critic_critique"] = bench_critic(args.iterations)
+    if "memory" in only:
+        results["memory_add_interaction"] = bench_memory(
+            _sizes(args.history_sizes), args.writes, args.memory_backends.split(","))
+    emit("micro", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
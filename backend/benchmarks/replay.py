@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Reproduce tráfico real a partir del historial guardado (memory/store.json, el log de
+memoria y logs/events.json) contra el pipeline, en proceso o por HTTP.
+
+Conserva los tiempos entre llegadas originales (o los comprime con --speed) y compara
+las respuestas nuevas con las registradas: latencias, similitud y cambio de puntuación del critic.
+
+Uso:
+    python benchmarks/replay.py --speed 10 --output results/replay.json
+    python benchmarks/replay.py --http http://localhost:8002/chat --speed 0 --concurrency 16
+"""
+import argparse
+import asyncio
+import difflib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, 'agents'))
+sys.path.append(BACKEND_DIR)
+
+from common import emit, percentile, summarize
+
+DEFAULT_STORE = os.path.join(BACKEND_DIR, "memory", "store.json")
+DEFAULT_LOG_DIR = os.path.join(BACKEND_DIR, "memory", "log")
+DEFAULT_EVENTS = os.path.join(BACKEND_DIR, "logs", "events.json")
+
+
+def _parse_ts(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).timestamp()
+    except ValueError:
+        return None
+
+
+def load_events(path: str) -> Dict[str, Dict[str, Any]]:
+    """Eventos por request_id: puntuación del critic y salidas registradas de cada agente"""
+    by_request: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return by_request
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)
+    for event in events:
+        info = by_request.setdefault(event.get("request_id"), {})
+        agent = event.get("agent")
+        if agent == "critic" or "critic_score" in event:
+            info["critic_score"] = event.get("score", event.get("critic_score"))
+        elif agent == "reasoner":
+            info["reasoner"] = event.get("text_snapshot")
+        elif agent == "improver":
+            info["improver"] = event.get("final_snapshot")
+    return by_request
+
+
+def iter_interactions(store_path: Optional[str], log_dir: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """Interacciones de store.json y del log segmentado (sin duplicados por request_id)"""
+    seen = set()
+    if store_path and os.path.exists(store_path):
+        with open(store_path, encoding="utf-8") as f:
+            interactions = json.load(f).get("interactions", [])
+        for record in sorted(interactions, key=lambda r: r.get("timestamp") or ""):
+            seen.add(record.get("request_id"))
+            yield record
+    if log_dir and os.path.isdir(log_dir):
+        from memory.segment_log import SegmentedLog
+        log = SegmentedLog(Path(log_dir))
+        try:
+            # El log se recorre en streaming, en orden de escritura
+            for record in log.iter_records():
+                if record.get("type") == "interaction" and record.get("request_id") not in seen:
+                    seen.add(record.get("request_id"))
+                    yield record
+        finally:
+            log.close()
+
+
+class InProcessTarget:
+    def __init__(self):
+        import orchestrator_final
+        self._run = orchestrator_final.run_pipeline
+
+    async def send(self, message: str) -> Dict[str, Any]:
+        result = await self._run(message)
+        # run_pipeline no lanza: devuelve una respuesta "Error: ..." sin embed_calls
+        if "embed_calls" not in result:
+            raise RuntimeError(result["final_response"])
+        return result
+
+    async def close(self):
+        pass
+
+
+class HttpTarget:
+    def __init__(self, url: str, timeout: float):
+        import httpx
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, message: str) -> Dict[str, Any]:
+        response = await self.client.post(self.url, json={"message": message})
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def _text(value: Any) -> str:
+    # Registros antiguos guardan la salida del reasoner como {"text": ..., "rag_context": ...}
+    if isinstance(value, dict):
+        return value.get("text") or value.get("final_response") or ""
+    return value if isinstance(value, str) else ""
+
+
+def _diff(expected: str, actual: str, max_lines: int = 12) -> List[str]:
+    lines = list(difflib.unified_diff(expected.splitlines(), actual.splitlines(), "registrada", "replay", lineterm=""))
+    return lines[:max_lines]
+
+
+async def replay(args) -> Dict[str, Any]:
+    events = load_events(args.events) if args.events else {}
+    target = HttpTarget(args.http, args.timeout) if args.http else InProcessTarget()
+    semaphore = asyncio.Semaphore(args.concurrency) if args.concurrency else None
+    loop = asyncio.get_running_loop()
+
+    latencies: List[float] = []
+    comparisons: List[Dict[str, Any]] = []
+    errors: Dict[str, int] = {}
+    skipped = 0
+    tasks = []
+
+    async def drive(record: Dict[str, Any]):
+        message = record["user_message"]
+        if semaphore:
+            await semaphore.acquire()
+        start = time.perf_counter()
+        try:
+            result = await target.send(message)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        finally:
+            latencies.append(time.perf_counter() - start)
+            if semaphore:
+                semaphore.release()
+
+        info = events.get(record.get("request_id"), {})
+        expected = _text(record.get(args.compare_field)) or _text(info.get(args.compare_field))
+        actual = result.get("final_response", "")
+        recorded_score = (record.get("critic") or {}).get("score", info.get("critic_score"))
+        new_score = (result.get("critic_review") or {}).get("score")
+        comparisons.append({
+            "request_id": record.get("request_id"),
+            "message": message,
+            "similarity": round(difflib.SequenceMatcher(None, expected, actual).ratio(), 4) if expected else None,
+            "exact": expected == actual,
+            "score_delta": round(new_score - recorded_score, 3)
+            if isinstance(new_score, (int, float)) and isinstance(recorded_score, (int, float)) else None,
+            "diff": _diff(expected, actual) if expected and expected != actual else [],
+        })
+
+    first_ts: Optional[float] = None
+    previous_ts: Optional[float] = None
+    offset = 0.0
+    origin = loop.time()
+    try:
+        for n, record in enumerate(iter_interactions(args.store, args.log_dir)):
+            if args.limit and n >= args.limit:
+                break
+            if not record.get("user_message"):
+                skipped += 1
+                continue
+            ts = _parse_ts(record.get("timestamp"))
+            if args.speed > 0 and ts is not None:
+                if first_ts is None:
+                    first_ts = previous_ts = ts
+                # Huecos largos (p. ej. noches sin tráfico) se recortan a --max-gap
+                gap = min(max(0.0, ts - previous_ts), args.max_gap)
+                offset += gap / args.speed
+                previous_ts = ts
+                delay = origin + offset - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            # Lazo abierto: no se espera a la respuesta para lanzar la siguiente
+            tasks.append(asyncio.ensure_future(drive(record)))
+        await asyncio.gather(*tasks)
+    finally:
+        await target.close()
+    wall = loop.time() - origin
+
+    similarities = sorted(c["similarity"] for c in comparisons if c["similarity"] is not None)
+    deltas = [c["score_delta"] for c in comparisons if c["score_delta"] is not None]
+    divergent = sorted((c for c in comparisons if c["similarity"] is not None and not c["exact"]),
+                       key=lambda c: c["similarity"])[:args.top]
+    total = len(latencies)
+    error_count = sum(errors.values())
+    return {
+        "config": {
+            "target": args.http or "in-process",
+            "speed": args.speed,
+            "max_gap_s": args.max_gap,
+            "concurrency": args.concurrency or None,
+            "compare_field": args.compare_field,
+        },
+        "requests": total,
+        "skipped": skipped,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else 0,
+        "errors": errors,
+        "error_rate": round(error_count / total, 4) if total else 0,
+        "latency": summarize(latencies),
+        "outputs": {
+            "compared": len(similarities),
+            "exact_matches": sum(1 for c in comparisons if c["exact"]),
+            "similarity_mean": round(sum(similarities) / len(similarities), 4) if similarities else None,
+            "similarity_p10": round(percentile(similarities, 10), 4) if similarities else None,
+            "similarity_p50": round(percentile(similarities, 50), 4) if similarities else None,
+            "critic_score_delta_mean": round(sum(deltas) / len(deltas), 4) if deltas else None,
+            "critic_score_delta_min": min(deltas) if deltas else None,
+            "critic_score_delta_max": max(deltas) if deltas else None,
+            "most_divergent": divergent,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay del historial de interacciones contra el pipeline")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="store.json legado ('' para omitirlo)")
+    parser.add_argument("--log-dir", default=DEFAULT_LOG_DIR, help="Log de memoria segmentado ('' para omitirlo)")
+    parser.add_argument("--events", default=DEFAULT_EVENTS, help="logs/events.json para puntuaciones y salidas")
+    parser.add_argument("--http", help="URL de /chat; sin ella se ejecuta run_pipeline en proceso")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Factor de compresión del tiempo (1 = tiempo real, 0 = sin esperas)")
+    parser.add_argument("--max-gap", type=float, default=60.0, help="Hueco máximo entre peticiones (s, tiempo original)")
+    parser.add_argument("--concurrency", type=int, default=0, help="Peticiones en vuelo máximas (0 = sin límite)")
+    parser.add_argument("--compare-field", default="reasoner", choices=["reasoner", "improver"])
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--top", type=int, default=5, help="Respuestas más divergentes a incluir")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    emit("replay", asyncio.run(replay(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Mide la memoria por worker con el índice en memoria (copia privada por proceso)
+frente al índice memory-mapped compartido.
+
+Uso:
+    python benchmarks/rss_workers.py --workers 4 --docs 200000 --dim 384
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'agents'))
+
+from mmap_index import MmapFlatL2Index, open_vectors_mmap, process_memory
+
+
+def _worker(mode: str, vectors_path: str, queries: np.ndarray, ready, results):
+    if mode == "mmap":
+        index = MmapFlatL2Index(open_vectors_mmap(Path(vectors_path)))
+    else:
+        import faiss
+        vectors = np.load(vectors_path)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        del vectors  # FAISS guarda su propia copia
+
+    # Tocar todas las páginas como haría el tráfico real
+    index.search(queries, 3)
+    results.put({"pid": os.getpid(), **process_memory()})
+    ready.wait()
+
+
+def measure(mode: str, workers: int, vectors_path: str, queries: np.ndarray) -> dict:
+    ctx = mp.get_context("spawn")
+    ready = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(mode, vectors_path, queries, ready, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    ready.set()
+    for p in procs:
+        p.join()
+
+    def avg(key):
+        values = [s.get(key, 0) for s in samples]
+        return round(sum(values) / len(values) / 1024, 1)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "rss_mb_per_worker": avg("rss_kb"),
+        "rss_anon_mb_per_worker": avg("rss_anon_kb"),
+        "rss_file_mb_per_worker": avg("rss_file_kb"),
+        "pss_mb_per_worker": avg("pss_kb"),
+        "pss_mb_total": round(sum(s.get("pss_kb", 0) for s in samples) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS por worker: índice en memoria vs mmap compartido")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors_path = os.path.join(tmp, "vectors.npy")
+        np.save(vectors_path, rng.standard_normal((args.docs, args.dim), dtype=np.float32))
+        queries = rng.standard_normal((8, args.dim), dtype=np.float32)
+        corpus_mb = round(args.docs * args.dim * 4 / 1024 / 1024, 1)
+
+        print(f"📦 Corpus sintético: {args.docs} vectores x {args.dim} dims ({corpus_mb} MB)")
+        report = {"corpus_mb": corpus_mb, "timestamp": time.time(), "results": []}
+        for mode in ("memory", "mmap"):
+            result = measure(mode, args.workers, vectors_path, queries)
+            report["results"].append(result)
+            print(f"   {mode:>6}: RSS {result['rss_mb_per_worker']} MB/worker "
+                  f"(anon {result['rss_anon_mb_per_worker']}, file {result['rss_file_mb_per_worker']}) | "
+                  f"PSS total {result['pss_mb_total']} MB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
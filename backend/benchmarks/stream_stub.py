@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Servidor stub compatible con /v1/chat/completions de OpenAI (SSE con "stream": true) con
+latencia por token inyectada, y escenarios contra stream_openai_chat / ImproverAgent:
+  - full:       se consume el stream completo (tiempo al primer token y total)
+  - aclose:     el consumidor cierra el generador tras --cancel-after fragmentos
+  - cancel:     se cancela la tarea consumidora (como hace Starlette al desconectarse el cliente)
+  - improver:   ImproverAgent.improve(on_delta=...) pasa los fragmentos según llegan
+En los escenarios de cancelación el servidor registra cuántos tokens llegó a generar antes
+de ver cerrada la conexión (tokens_saved = los que ya no se generaron).
+
+Uso:
+    python benchmarks/stream_stub.py --tokens 200 --token-ms 20 --cancel-after 10
+    python benchmarks/stream_stub.py --serve --port 8999   # solo el servidor (OPENAI_CHAT_URL=http://127.0.0.1:8999/v1/chat/completions)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, 'agents'))
+sys.path.append(BACKEND_DIR)
+
+from common import emit
+
+
+class StubLLMServer:
+    """Servidor HTTP/1.1 mínimo: un token cada token_ms; deja de generar al detectar EOF del cliente"""
+
+    def __init__(self, tokens: int, token_ms: float, ttft_ms: float):
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.ttft_ms = ttft_ms
+        self.requests: List[Dict[str, Any]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await reader.readexactly(length)) if length else {}
+        record = {"stream": bool(payload.get("stream")), "sent": 0, "completed": False, "disconnected": False}
+        self.requests.append(record)
+
+        # EOF del cliente = conexión cerrada (aclose/cancelación en el otro lado)
+        eof = asyncio.ensure_future(reader.read())
+        try:
+            await asyncio.sleep(self.ttft_ms / 1000)
+            if not record["stream"]:
+                text = " ".join(f"tok{i}" for i in range(self.tokens))
+                await asyncio.sleep(self.tokens * self.token_ms / 1000)
+                body = json.dumps({"choices": [{"message": {"content": text}}]}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+                record["sent"] = self.tokens
+                record["completed"] = True
+                await writer.drain()
+                return
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            for i in range(self.tokens):
+                if eof.done():
+                    record["disconnected"] = True
+                    break
+                chunk = {"choices": [{"delta": {"content": f"tok{i} "}}]}
+                writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await writer.drain()
+                record["sent"] += 1
+                await asyncio.sleep(self.token_ms / 1000)
+            else:
+                writer.write(b"data: [DONE]\n\n")
+                await writer.drain()
+                record["completed"] = True
+        except ConnectionError:
+            record["disconnected"] = True
+        finally:
+            eof.cancel()
+            writer.close()
+
+
+def _messages() -> List[Dict[str, str]]:
+    return [{"role": "user", "content": "Explica Docker"}]
+
+
+async def scenario_full(llm) -> Dict[str, Any]:
+    start = time.perf_counter()
+    first = None
+    deltas = 0
+    async for _ in llm.stream_openai_chat(_messages()):
+        first = first or time.perf_counter()
+        deltas += 1
+    return {"deltas": deltas, "ttft_ms": round((first - start) * 1000, 3) if first else None,
+            "total_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+async def scenario_aclose(llm, cancel_after: int) -> Dict[str, Any]:
+    stream = llm.stream_openai_chat(_messages())
+    deltas = 0
+    async for _ in stream:
+        deltas += 1
+        if deltas >= cancel_after:
+            break
+    await stream.aclose()
+    return {"deltas": deltas}
+
+
+async def scenario_cancel(llm, cancel_after: int) -> Dict[str, Any]:
+    received = asyncio.Event()
+    deltas = 0
+
+    async def consume():
+        nonlocal deltas
+        async for _ in llm.stream_openai_chat(_messages()):
+            deltas += 1
+            if deltas >= cancel_after:
+                received.set()
+
+    task = asyncio.ensure_future(consume())
+    await received.wait()
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return {"deltas": deltas}
+
+
+async def scenario_improver() -> Dict[str, Any]:
+    from improver import ImproverAgent
+
+    seen: List[str] = []
+
+    async def on_delta(delta: str):
+        seen.append(delta)
+
+    start = time.perf_counter()
+    final = await ImproverAgent().improve("Docker crea contenedores", {"score": 0.4, "issues": ["Respuesta corta"]},
+                                          "Explica Docker", on_delta=on_delta)
+    return {"deltas": len(seen), "final_matches_deltas": final == "".join(seen),
+            "total_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+async def run(args) -> Dict[str, Any]:
+    server = StubLLMServer(args.tokens, args.token_ms, args.ttft_ms)
+    await server.start()
+    # llm.py lee la configuración al importarse: apuntarlo al stub antes
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_CHAT_URL"] = f"http://127.0.0.1:{server.port}/v1/chat/completions"
+    import llm
+
+    results: Dict[str, Any] = {"config": {"tokens": args.tokens, "token_ms": args.token_ms,
+                                          "ttft_ms": args.ttft_ms, "cancel_after": args.cancel_after}}
+    try:
+        for name, coro in (
+            ("full", lambda: scenario_full(llm)),
+            ("aclose", lambda: scenario_aclose(llm, args.cancel_after)),
+            ("cancel", lambda: scenario_cancel(llm, args.cancel_after)),
+            ("improver", scenario_improver),
+        ):
+            before = len(server.requests)
+            client = await coro()
+            # Margen para que el servidor observe el cierre de la conexión
+            await asyncio.sleep(max(0.05, 3 * args.token_ms / 1000))
+            served = server.requests[before:]
+            results[name] = {
+                **client,
+                "server": served,
+                # Tokens que el proveedor no llegó a generar gracias a la cancelación
+                "tokens_saved": sum(args.tokens - r["sent"] for r in served),
+            }
+        results["stream_stats"] = dict(llm.stream_stats)
+    finally:
+        await llm.http_pool.aclose()
+        await server.close()
+    return results
+
+
+async def serve(args):
+    server = StubLLMServer(args.tokens, args.token_ms, args.ttft_ms)
+    await server.start(port=args.port)
+    print(f"Stub LLM en http://127.0.0.1:{server.port}/v1/chat/completions")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor stub de streaming y escenarios de cancelación")
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=100)
+    parser.add_argument("--cancel-after", type=int, default=5, help="Fragmentos leídos antes de cancelar")
+    parser.add_argument("--serve", action="store_true", help="Solo levantar el servidor stub")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args))
+        return
+    emit("stream_stub", asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# backend/circuit_breaker.py
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Dict
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger("circuit_breaker")
+
+# Apertura por tasa de error (o de llamadas lentas) sobre las últimas N llamadas
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_FAILURE_RATIO = float(os.getenv("LLM_BREAKER_FAILURE_RATIO", "0.5"))
+LLM_BREAKER_SLOW_MS = float(os.getenv("LLM_BREAKER_SLOW_MS", "10000"))
+LLM_BREAKER_SLOW_RATIO = float(os.getenv("LLM_BREAKER_SLOW_RATIO", "0.8"))
+# Segundos en abierto antes de dejar pasar llamadas de prueba (semiabierto) y cuántas
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+LLM_BREAKER_HALF_OPEN_CALLS = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "3"))
+
+# Timeout adaptativo: percentil observado x multiplicador, acotado entre el mínimo y el timeout configurado
+LLM_TIMEOUT_PERCENTILE = float(os.getenv("LLM_TIMEOUT_PERCENTILE", "99"))
+LLM_TIMEOUT_MULTIPLIER = float(os.getenv("LLM_TIMEOUT_MULTIPLIER", "2"))
+LLM_TIMEOUT_MIN_S = float(os.getenv("LLM_TIMEOUT_MIN_S", "2"))
+LLM_TIMEOUT_MIN_SAMPLES = int(os.getenv("LLM_TIMEOUT_MIN_SAMPLES", "20"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Cortocircuito por proveedor (cerrado -> abierto -> semiabierto).
+    Cerrado: se abre si en la ventana la tasa de fallos o de llamadas lentas supera su umbral.
+    Abierto: try_acquire() devuelve False sin tocar la red hasta que pasa open_seconds.
+    Semiabierto: deja pasar half_open_calls llamadas de prueba; si todas van bien se cierra,
+    con un fallo vuelve a abrirse.
+    Se usa solo desde el event loop (sin locks).
+    """
+
+    def __init__(self, name: str, window: int = LLM_BREAKER_WINDOW, min_calls: int = LLM_BREAKER_MIN_CALLS,
+                 failure_ratio: float = LLM_BREAKER_FAILURE_RATIO, slow_ms: float = LLM_BREAKER_SLOW_MS,
+                 slow_ratio: float = LLM_BREAKER_SLOW_RATIO, open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+                 half_open_calls: int = LLM_BREAKER_HALF_OPEN_CALLS):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_s = slow_ms / 1000 if slow_ms else None
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        # (fallo, lenta) por llamada
+        self._window: deque = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._stats = {"rejected": 0, "opened": 0, "failures": 0, "successes": 0}
+        metrics.circuit_state(name, CLOSED)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuito {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._stats["opened"] += 1
+        if state != CLOSED:
+            self._probes = self._probe_successes = 0
+        else:
+            self._window.clear()
+        metrics.circuit_state(self.name, state)
+
+    def available(self) -> bool:
+        """Sin efectos: si una llamada podría pasar ahora (para ordenar proveedores)"""
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at >= self.open_seconds
+        if self.state == HALF_OPEN:
+            return self._probes < self.half_open_calls
+        return True
+
+    def try_acquire(self) -> bool:
+        """Reserva una llamada; False = circuito abierto (ir directo al fallback)"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self._stats["rejected"] += 1
+                metrics.circuit_rejected(self.name)
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self._stats["rejected"] += 1
+                metrics.circuit_rejected(self.name)
+                return False
+            self._probes += 1
+        return True
+
+    def release(self):
+        """Llamada reservada que no llegó a completarse (cancelada): no cuenta como resultado"""
+        if self.state == HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def record_success(self, seconds: float):
+        self._stats["successes"] += 1
+        slow = self.slow_s is not None and seconds > self.slow_s
+        if self.state == HALF_OPEN:
+            if slow:
+                self._transition(OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        self._window.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self):
+        self._stats["failures"] += 1
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._window.append((True, False))
+        self._evaluate()
+
+    def _evaluate(self):
+        if self.state != CLOSED or len(self._window) < self.min_calls:
+            return
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        if failures / calls >= self.failure_ratio or slow / calls >= self.slow_ratio:
+            self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._window)
+        return {
+            **self._stats,
+            "state": self.state,
+            "window_calls": calls,
+            "failure_ratio": round(sum(1 for f, _ in self._window if f) / calls, 3) if calls else 0,
+            "open_for_s": round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+            if self.state == OPEN else 0,
+        }
+
+
+class AdaptiveTimeout:
+    """
+    Timeout a partir de las latencias observadas: percentil x multiplicador, acotado entre
+    LLM_TIMEOUT_MIN_S y el timeout configurado del proveedor (que se usa mientras no hay muestras).
+    """
+
+    def __init__(self, max_s: float, window: int = 200, percentile: float = LLM_TIMEOUT_PERCENTILE,
+                 multiplier: float = LLM_TIMEOUT_MULTIPLIER, min_s: float = LLM_TIMEOUT_MIN_S):
+        self.max_s = max_s
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_s = min(min_s, max_s)
+        self._latencies: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def current(self) -> float:
+        if len(self._latencies) < LLM_TIMEOUT_MIN_SAMPLES:
+            return self.max_s
+        values = sorted(self._latencies)
+        p = values[min(len(values) - 1, int(len(values) * self.percentile / 100))]
+        return min(self.max_s, max(self.min_s, p * self.multiplier))
+
+
+# Un cortocircuito por proveedor, compartido por el router y free_llm
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breakers_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -1,13 +1,24 @@
 import os
-import httpx
-import json
+import time
+import asyncio
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
+try:
+    from .http_clients import http_pool, PROVIDER_TIMEOUTS
+    from .circuit_breaker import AdaptiveTimeout, get_breaker
+except ImportError:
+    from http_clients import http_pool, PROVIDER_TIMEOUTS
+    from circuit_breaker import AdaptiveTimeout, get_breaker
+
 load_dotenv()
 
 HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN", "")
 
+# Con la API de inferencia caída se responde con get_fallback_response sin esperar al timeout
+hf_breaker = get_breaker("huggingface")
+hf_timeout = AdaptiveTimeout(PROVIDER_TIMEOUTS["huggingface"])
+
 async def call_free_llm(messages: List[Dict[str, str]], provider: str = "huggingface") -> str:
     if provider == "huggingface":
         return await call_huggingface_llm(messages)
@@ -24,7 +35,13 @@ async def call_huggingface_llm(messages: List[Dict[str, str]]) -> str:
     if not user_message:
         return get_fallback_response("")
     
+    # Circuito abierto: directamente a la respuesta de respaldo
+    if not hf_breaker.try_acquire():
+        return get_fallback_response(user_message)
+
     # Modelo 1: DialoGPT
+    start = time.perf_counter()
+    recorded = False
     try:
         API_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
         headers = {"Authorization": f"Bearer {HF_TOKEN}"} if HF_TOKEN else {}
@@ -40,17 +57,33 @@ async def call_huggingface_llm(messages: List[Dict[str, str]]) -> str:
             }
         }
         
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(API_URL, headers=headers, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    generated_text = result[0].get("generated_text", "")
-                    if generated_text:
-                        return f"�� {generated_text}"
+        # Cliente compartido: reutiliza conexiones TCP/TLS entre llamadas
+        client = http_pool.get("huggingface")
+        response = await client.post(API_URL, headers=headers, json=payload, timeout=hf_timeout.current())
+        
+        elapsed = time.perf_counter() - start
+        recorded = True
+        if response.status_code == 200:
+            hf_breaker.record_success(elapsed)
+            hf_timeout.observe(elapsed)
+        else:
+            # 5xx / 503 "model loading" / 429: cuentan como fallo del proveedor
+            hf_breaker.record_failure()
+        
+        if response.status_code == 200:
+            result = response.json()
+            if isinstance(result, list) and len(result) > 0:
+                generated_text = result[0].get("generated_text", "")
+                if generated_text:
+                    return f"�� {generated_text}"
+    except asyncio.CancelledError:
+        if not recorded:
+            hf_breaker.release()
+        raise
     except Exception:
-        pass
+        # Timeout (adaptativo) o error de red
+        if not recorded:
+            hf_breaker.record_failure()
     
     return get_fallback_response(user_message)
 
@@ -0,0 +1,94 @@
+# backend/http_clients.py
+import os
+import logging
+import importlib.util
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger("http_clients")
+
+# Límites del pool de conexiones (por proveedor)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# Timeout total por proveedor (segundos)
+PROVIDER_TIMEOUTS = {
+    "openai": float(os.getenv("OPENAI_TIMEOUT", "30")),
+    "huggingface": float(os.getenv("HUGGINGFACE_TIMEOUT", "15")),
+    "secondary": float(os.getenv("LLM_SECONDARY_TIMEOUT", "30")),
+}
+DEFAULT_TIMEOUT = 30.0
+
+# HTTP/2 solo si está instalado el paquete h2 (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class ClientPool:
+    """
+    Un httpx.AsyncClient por proveedor, reutilizado durante toda la vida de la app
+    (keep-alive, HTTP/2 si está disponible) en lugar de un cliente nuevo por llamada.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _create(self, provider: str) -> httpx.AsyncClient:
+        total = PROVIDER_TIMEOUTS.get(provider, DEFAULT_TIMEOUT)
+        stats = self._stats.setdefault(provider, {"requests": 0, "new_connections": 0})
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                stats["new_connections"] += 1
+
+        async def on_request(request: httpx.Request):
+            stats["requests"] += 1
+            request.extensions["trace"] = trace
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(total, connect=min(HTTP_CONNECT_TIMEOUT, total)),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [on_request]},
+        )
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        """Cliente del proveedor; se crea la primera vez (también fuera de la app, p. ej. en scripts)"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create(provider)
+            self._clients[provider] = client
+        return client
+
+    async def startup(self):
+        for provider in PROVIDER_TIMEOUTS:
+            self.get(provider)
+        logger.info(f"✅ Pool HTTP listo (HTTP/2: {HTTP2_AVAILABLE}, keep-alive: {HTTP_MAX_KEEPALIVE})")
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        providers = {}
+        for provider, stats in self._stats.items():
+            reused = max(0, stats["requests"] - stats["new_connections"])
+            providers[provider] = {
+                **stats,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / stats["requests"], 3) if stats["requests"] else 0,
+                "timeout": PROVIDER_TIMEOUTS.get(provider, DEFAULT_TIMEOUT),
+            }
+        return {"http2": HTTP2_AVAILABLE, "providers": providers}
+
+
+# Instancia global
+http_pool = ClientPool()
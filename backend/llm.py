@@ -1,47 +1,213 @@
 # backend/llm.py
 import os
+import json
+import time
 import asyncio
 import httpx
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    from .free_llm import call_free_llm
+    from .http_clients import http_pool, PROVIDER_TIMEOUTS
+    from .metrics import metrics
+    from .semantic_cache import semantic_cache
+    from .single_flight import SingleFlight
+    from .response_cache import normalize_message
+    from .provider_router import Provider, ProviderError, ProviderRouter
+    from .circuit_breaker import get_breaker
+except ImportError:
+    from free_llm import call_free_llm
+    from http_clients import http_pool, PROVIDER_TIMEOUTS
+    from metrics import metrics
+    from semantic_cache import semantic_cache
+    from single_flight import SingleFlight
+    from response_cache import normalize_message
+    from provider_router import Provider, ProviderError, ProviderRouter
+    from circuit_breaker import get_breaker
+
 load_dotenv()
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Configurable para apuntar a un proxy o al servidor stub de benchmarks/stream_stub.py
+OPENAI_CHAT_URL = os.getenv("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+
+# Proveedor secundario opcional compatible con OpenAI (Azure, Groq, vLLM...): compite por ser primario
+LLM_SECONDARY_URL = os.getenv("LLM_SECONDARY_URL", "")
+LLM_SECONDARY_API_KEY = os.getenv("LLM_SECONDARY_API_KEY", "")
+LLM_SECONDARY_MODEL = os.getenv("LLM_SECONDARY_MODEL") or OPENAI_MODEL
+
+# Llamadas idénticas concurrentes (mismos mensajes y temperatura) comparten una sola petición
+llm_flight = SingleFlight("llm")
 
-async def call_openai_chat(messages: List[Dict[str, str]], temperature: float = 0.2) -> str:
+def _flight_key(messages: List[Dict[str, str]], temperature: float) -> str:
+    normalized = [[m.get("role"), normalize_message(m.get("content") or "")] for m in messages]
+    return f"{temperature:.2f}|" + json.dumps(normalized, ensure_ascii=False)
+
+async def call_openai_chat(messages: List[Dict[str, str]], temperature: float = 0.2,
+                           cache_text: Optional[str] = None) -> str:
     """
     Llamada simple a la API de OpenAI. Si no hay OPENAI_API_KEY, usa Hugging Face gratuito.
+    Prompts casi idénticos se resuelven con la caché semántica sin llamar al LLM.
+    cache_text: lo que la caché semántica compara por similitud (por defecto el último mensaje);
+    el resto del prompt tiene que coincidir exactamente.
     """
+    with metrics.stage_timer("llm"):
+        return await llm_flight.do(_flight_key(messages, temperature),
+                                   lambda: _cached_call(messages, temperature, cache_text))
+
+async def _cached_call(messages: List[Dict[str, str]], temperature: float, cache_text: Optional[str]) -> str:
+    if semantic_cache is not None:
+        return await semantic_cache.get_or_call(messages, temperature,
+                                                lambda: _call_openai_chat(messages, temperature), cache_text)
+    return (await _call_openai_chat(messages, temperature))[0]
+
+async def _call_openai_chat(messages: List[Dict[str, str]], temperature: float) -> Tuple[str, bool]:
+    """(contenido, cacheable): las respuestas de fallback no se cachean"""
     # Si no hay API key de OpenAI, usar Hugging Face inmediatamente
     if not OPENAI_KEY:
-        from .free_llm import call_free_llm
-        return await call_free_llm(messages, provider="huggingface")
-    
-    # Si hay API key, intentar con OpenAI primero
-    url = "https://api.openai.com/v1/chat/completions"
+        metrics.llm_fallback("no_api_key")
+        return await call_free_llm(messages, provider="huggingface"), False
+
+    try:
+        content, provider, outcome = await llm_router.call(messages, temperature)
+    except ProviderError:
+        # Sin proveedores disponibles (circuitos abiertos) se llega aquí sin esperar a ningún timeout
+        metrics.llm_fallback("error")
+        return await call_free_llm(messages, provider="huggingface"), False
+    if provider.fallback:
+        # Hugging Face respondió: fallaron los demás o sus circuitos estaban abiertos (nunca entra en el hedge)
+        metrics.llm_fallback({"failover": "error"}.get(outcome, outcome))
+    return content, not provider.fallback
+
+def _openai_compatible(name: str, url: str, api_key: str, model: str):
+    """Proveedor para cualquier API compatible con /v1/chat/completions"""
+    async def call(messages: List[Dict[str, str]], temperature: float) -> str:
+        headers = {"Authorization": f"Bearer {api_key}"}
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": 800
+        }
+        # Cliente compartido: reutiliza conexiones TCP/TLS entre llamadas
+        client = http_pool.get(name)
+        r = await client.post(url, headers=headers, json=payload)
+        r.raise_for_status()
+        choices = r.json().get("choices", [])
+        if not choices:
+            raise ProviderError(f"{name}: respuesta sin choices")
+        return choices[0].get("message", {}).get("content", "")
+    return call
+
+async def _huggingface(messages: List[Dict[str, str]], temperature: float) -> str:
+    return await call_free_llm(messages, provider="huggingface")
+
+def build_router() -> ProviderRouter:
+    providers = []
+    if OPENAI_KEY:
+        providers.append(Provider("openai", _openai_compatible("openai", OPENAI_CHAT_URL, OPENAI_KEY, OPENAI_MODEL),
+                                  breaker=get_breaker("openai"), timeout_s=PROVIDER_TIMEOUTS["openai"]))
+    if LLM_SECONDARY_URL:
+        providers.append(Provider("secondary", _openai_compatible(
+            "secondary", LLM_SECONDARY_URL, LLM_SECONDARY_API_KEY, LLM_SECONDARY_MODEL),
+            breaker=get_breaker("secondary"), timeout_s=PROVIDER_TIMEOUTS["secondary"]))
+    # Hugging Face tiene su propio cortocircuito y timeout dentro de free_llm
+    providers.append(Provider("huggingface", _huggingface, fallback=True))
+    return ProviderRouter(providers)
+
+llm_router = build_router()
+
+class StreamInterruptedError(ProviderError):
+    """El stream del proveedor se cortó después de emitir texto: lo recibido está incompleto"""
+
+# Resultado de los streams: completed, cancelled (cliente desconectado), error, fallback
+stream_stats = {"completed": 0, "cancelled": 0, "error": 0, "fallback": 0, "deltas": 0}
+
+def _stream_result(result: str):
+    stream_stats[result] += 1
+    metrics.llm_stream(result)
+
+async def stream_openai_chat(messages: List[Dict[str, str]], temperature: float = 0.2) -> AsyncIterator[str]:
+    """
+    Variante en streaming de call_openai_chat: genera los fragmentos de texto según llegan (SSE de OpenAI).
+    Si falla antes del primer token (o no hay API key), emite la respuesta de Hugging Face de una vez;
+    si falla después, lanza StreamInterruptedError (los fragmentos ya emitidos no son una respuesta completa).
+    Cerrar el generador (aclose) o cancelar la tarea que lo consume cierra la conexión con el
+    proveedor, que deja de generar (y cobrar) tokens.
+    """
+    if not OPENAI_KEY:
+        metrics.llm_fallback("no_api_key")
+        _stream_result("fallback")
+        yield await call_free_llm(messages, provider="huggingface")
+        return
+
+    breaker = get_breaker("openai")
+    if not breaker.try_acquire():
+        metrics.llm_fallback("circuit_open")
+        _stream_result("fallback")
+        yield await call_free_llm(messages, provider="huggingface")
+        return
+
     headers = {"Authorization": f"Bearer {OPENAI_KEY}"}
     payload = {
         "model": OPENAI_MODEL,
         "messages": messages,
         "temperature": temperature,
-        "max_tokens": 800
+        "max_tokens": 800,
+        "stream": True
     }
-    
+
+    emitted = False
+    finished = False
+    start = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(url, headers=headers, json=payload)
+        client = http_pool.get("openai")
+        async with client.stream("POST", OPENAI_CHAT_URL, headers=headers, json=payload) as r:
             r.raise_for_status()
-            data = r.json()
-            choices = data.get("choices", [])
-            if not choices:
-                # Si OpenAI falla, usar Hugging Face
-                from .free_llm import call_free_llm
-                return await call_free_llm(messages, provider="huggingface")
-            content = choices[0].get("message", {}).get("content", "")
-            return content
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    finished = True
+                    break
+                choices = json.loads(data).get("choices", [])
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    if not emitted:
+                        # En streaming la salud del proveedor se mide por el tiempo hasta el primer token
+                        breaker.record_success(time.perf_counter() - start)
+                    emitted = True
+                    stream_stats["deltas"] += 1
+                    yield delta
+        if emitted and not finished:
+            # Sin Content-Length el cierre de la conexión parece un fin normal del cuerpo
+            raise ProviderError("conexión cerrada antes de [DONE]")
     except Exception as e:
-        # Si hay error, usar Hugging Face
-        from .free_llm import call_free_llm
-        return await call_free_llm(messages, provider="huggingface")
+        if emitted:
+            # Ya se envió texto parcial: no mezclarlo con otra respuesta ni darlo por terminado
+            _stream_result("error")
+            raise StreamInterruptedError(f"Stream del LLM interrumpido: {e}") from e
+        breaker.record_failure()
+        metrics.llm_fallback("error")
+        _stream_result("fallback")
+        yield await call_free_llm(messages, provider="huggingface")
+        return
+    except BaseException:
+        # GeneratorExit (aclose) o CancelledError: el consumidor se fue. Al salir del
+        # "async with" se cierra la respuesta HTTP y el proveedor deja de generar.
+        # Antes del primer token no cuenta como resultado para el cortocircuito
+        if not emitted:
+            breaker.release()
+        _stream_result("cancelled")
+        raise
+
+    if not emitted:
+        breaker.record_failure()
+        metrics.llm_fallback("empty_choices")
+        _stream_result("fallback")
+        yield await call_free_llm(messages, provider="huggingface")
+    else:
+        _stream_result("completed")
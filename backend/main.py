@@ -1,7 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+from pathlib import Path
 import logging
+import hmac
+import threading
+import asyncio
+import json
+import time
+import uuid
 import sys
 import os
 
@@ -20,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "X-Embed-Calls", "X-Request-ID"],
 )
 
 class ChatRequest(BaseModel):
@@ -30,6 +40,42 @@ class ChatResponse(BaseModel):
     rag_context: dict
     critic_review: dict
 
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    improve: bool = False
+
+class IngestRequest(BaseModel):
+    # Relativa a RAG_INGEST_ROOT
+    path: str
+    prune: bool = False
+    save: bool = True
+
+from pipeline_context import PipelineContext
+from mmap_index import process_memory
+from ingest import KnowledgeIngestor
+from response_cache import response_cache
+from semantic_cache import semantic_cache
+from llm import llm_flight, llm_router, stream_stats
+from circuit_breaker import breakers_stats
+from http_clients import http_pool
+from metrics import metrics, CONTENT_TYPE_LATEST
+from batch_pipeline import iter_batch, run_batch, BATCH_MAX_MESSAGES
+
+# El streaming pasa la respuesta por el improver (tokens del LLM) salvo que se desactive
+STREAM_IMPROVER_ENABLED = os.getenv("STREAM_IMPROVER_ENABLED", "1") == "1"
+
+# Carga del modelo RAG en segundo plano al arrancar (0 = en la primera petición)
+RAG_PRELOAD = os.getenv("RAG_PRELOAD", "1") == "1"
+
+# /admin/ingest: deshabilitado sin ADMIN_TOKEN; solo acepta rutas dentro de RAG_INGEST_ROOT
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+RAG_INGEST_ROOT = Path(os.getenv("RAG_INGEST_ROOT", str(Path(__file__).parent / "data" / "ingest"))).resolve()
+# Una ingesta (+ save_state) a la vez: doc_registry e índice se modifican desde el hilo del executor
+_ingest_lock = threading.Lock()
+
+# Embeddings calculados por petición (debería ser 1 con una única búsqueda RAG)
+pipeline_stats = {"requests": 0, "embed_calls": 0}
+
 # Importar y inicializar agentes
 try:
     from rag_agent import rag_agent
@@ -59,55 +105,316 @@ except ImportError as e:
     logger.error(f"❌ Error cargando Critic: {e}")
     critic_agent = None
 
+try:
+    from improver import ImproverAgent
+    improver_agent = ImproverAgent()
+    logger.info("✅ Improver agent cargado")
+except ImportError as e:
+    logger.error(f"❌ Error cargando Improver: {e}")
+    improver_agent = None
+
+async def _preload_rag():
+    try:
+        await rag_agent.aload()
+    except Exception as e:
+        logger.error(f"❌ Error cargando el modelo RAG: {e}")
+
+async def _ensure_rag():
+    """Espera a que el RAG agent termine de cargar sin bloquear el event loop"""
+    if not rag_agent:
+        raise HTTPException(status_code=500, detail="RAG agent no disponible")
+    try:
+        await rag_agent.aload()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"RAG agent no disponible: {e}")
+
+@app.on_event("startup")
+async def startup():
+    await http_pool.startup()
+    if rag_agent and RAG_PRELOAD:
+        # Sin esperar: la app acepta conexiones y /health/ready da 503 hasta que termine
+        app.state.rag_preload = asyncio.create_task(_preload_rag())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await http_pool.aclose()
+    if rag_agent:
+        rag_agent.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Genesis AI API - Funcionando", "status": "active"}
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness: el proceso responde (no depende de que el modelo esté cargado)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness(response: Response):
+    """Readiness: 503 mientras el modelo RAG carga o si falló la carga"""
+    rag_status = rag_agent.status() if rag_agent else {"loaded": False, "error": "RAG agent no disponible"}
+    # Con carga perezosa el modelo se construye en la primera petición
+    rag_ready = rag_status["loaded"] or (not RAG_PRELOAD and not rag_status["error"])
+    ready = rag_ready and reasoner_agent is not None and critic_agent is not None
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "rag": rag_status}
+
 @app.get("/health")
 async def health_check():
+    # Solo estadísticas si ya está cargado: consultar /health no debe disparar la carga
+    rag = rag_agent if rag_agent and rag_agent.loaded else None
     return {
-        "rag_loaded": rag_agent is not None,
+        "rag_loaded": rag is not None,
+        "rag_status": rag_agent.status() if rag_agent else {},
         "reasoner_loaded": reasoner_agent is not None,
-        "critic_loaded": critic_agent is not None
+        "critic_loaded": critic_agent is not None,
+        "rag_stats": rag.stats if rag else {},
+        "rag_startup": rag.startup_stats if rag else {},
+        "rag_index_mmap": rag.use_mmap if rag else False,
+        "rag_index": rag.index_stats() if rag else {},
+        "process_memory": process_memory(),
+        "rag_executor": rag.executor_stats() if rag else {},
+        "rag_batching": rag.batching_stats() if rag else {},
+        "single_flight": {"rag": rag.search_flight.stats() if rag else {}, "llm": llm_flight.stats()},
+        "rag_embedding_cache": rag.embedding_cache_stats() if rag else {},
+        "response_cache": response_cache.stats() if response_cache else {"enabled": False},
+        "llm_semantic_cache": semantic_cache.stats() if semantic_cache else {"enabled": False},
+        "llm_router": llm_router.stats(),
+        "circuit_breakers": breakers_stats(),
+        "llm_streams": stream_stats,
+        "http_clients": http_pool.stats(),
+        "embed_calls_per_request": round(pipeline_stats["embed_calls"] / pipeline_stats["requests"], 2) if pipeline_stats["requests"] else 0
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Métricas en formato Prometheus (ServiceMonitor en k8s/monitoring)"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
+def _check_admin_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Ingesta por API deshabilitada (ADMIN_TOKEN sin configurar)")
+    if not token or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+def _resolve_ingest_path(path: str) -> Path:
+    """Resuelve la ruta (.., enlaces simbólicos, rutas absolutas) y exige que quede dentro de RAG_INGEST_ROOT"""
+    resolved = (RAG_INGEST_ROOT / path).resolve()
+    if not resolved.is_relative_to(RAG_INGEST_ROOT):
+        raise HTTPException(status_code=403, detail="Ruta fuera de RAG_INGEST_ROOT")
+    if not resolved.exists():
+        raise HTTPException(status_code=404, detail=f"No existe: {path}")
+    return resolved
+
+@app.post("/admin/ingest")
+async def ingest(request: IngestRequest, x_admin_token: Optional[str] = Header(None)):
+    """Ingesta incremental de un directorio o JSONL de RAG_INGEST_ROOT en el índice vivo (cabecera X-Admin-Token)"""
+    _check_admin_token(x_admin_token)
+    source = _resolve_ingest_path(request.path)
+    await _ensure_rag()
+    if rag_agent.read_only:
+        raise HTTPException(status_code=409, detail="Índice en modo mmap de solo lectura")
+    
+    if not _ingest_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Ya hay una ingesta en curso")
+    
+    def run():
+        try:
+            stats = KnowledgeIngestor(rag_agent).ingest_path(source, request.prune)
+            if request.save:
+                rag_agent.save_state()
+            return stats
+        finally:
+            _ingest_lock.release()
+    
+    loop = asyncio.get_running_loop()
+    try:
+        future = loop.run_in_executor(None, run)
+    except BaseException:
+        _ingest_lock.release()
+        raise
+    # El lock lo libera el hilo al terminar, aunque se cancele la petición mientras tanto
+    stats = await future
+    if response_cache:
+        response_cache.invalidate()
+    if semantic_cache:
+        # Los prompts del improver incluyen el contexto RAG, que acaba de cambiar
+        semantic_cache.clear()
+    return {"status": "ok", "stats": stats, "index": rag_agent.index_stats()}
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, response: Response):
     logger.info(f"Procesando: {request.message}")
+    start = time.perf_counter()
     
     # Verificar que todos los agentes estén cargados
-    if not rag_agent:
-        raise HTTPException(status_code=500, detail="RAG agent no disponible")
+    await _ensure_rag()
     if not reasoner_agent:
         raise HTTPException(status_code=500, detail="Reasoner agent no disponible")
     if not critic_agent:
         raise HTTPException(status_code=500, detail="Critic agent no disponible")
     
+    # Caché de respuestas: el pipeline es determinista para un mismo mensaje y versión del índice
+    index_version = rag_agent.index_version
+    if response_cache:
+        cached = response_cache.get(request.message, index_version)
+        metrics.cache("response", cached is not None)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            metrics.observe_request("chat", time.perf_counter() - start)
+            return ChatResponse(**cached)
+    
     try:
-        # 1. RAG
-        rag_context = rag_agent.search(request.message)
-        logger.info(f"RAG encontró {rag_context['results_count']} resultados")
+        with PipelineContext(request.message) as ctx:
+            # 1. RAG - una sola búsqueda por petición
+            rag_context = await ctx.aretrieve(rag_agent)
+            logger.info(f"RAG encontró {rag_context['results_count']} resultados")
+            metrics.record_relevance(rag_context)
+            
+            # 2. Reasoner - reutiliza el contexto RAG de la petición
+            with metrics.stage_timer("reasoner"):
+                reasoner_result = await reasoner_agent.reason(request.message, rag_context)
+            
+            # 3. Critic
+            with metrics.stage_timer("critic"):
+                critic_review = await critic_agent.critique(
+                    reasoner_result["final_response"], 
+                    request.message,
+                    rag_context  # Pasar rag_context al crítico para análisis de relevancia
+                )
         
-        # 2. Reasoner - SOLO pasar user_message, NO rag_context
-        reasoner_result = await reasoner_agent.reason(request.message)
+        pipeline_stats["requests"] += 1
+        pipeline_stats["embed_calls"] += ctx.embed_calls
+        response.headers["X-Request-ID"] = ctx.request_id
+        response.headers["X-Embed-Calls"] = str(ctx.embed_calls)
+        response.headers["X-Cache"] = "MISS"
         
-        # 3. Critic
-        critic_review = await critic_agent.critique(
-            reasoner_result["final_response"], 
-            request.message,
-            rag_context  # Pasar rag_context al crítico para análisis de relevancia
-        )
-        
-        return ChatResponse(
+        result = ChatResponse(
             final_response=reasoner_result["final_response"],
-            rag_context=reasoner_result["rag_context"],  # Usar el contexto del reasoner
+            rag_context=rag_context,
             critic_review=critic_review
         )
+        # No cachear errores de búsqueda ni respuestas calculadas con un índice que ya cambió
+        if response_cache and "error" not in rag_context and rag_agent.index_version == index_version:
+            response_cache.put(request.message, index_version, result.model_dump())
+        metrics.observe_request("chat", time.perf_counter() - start)
+        return result
         
     except Exception as e:
         logger.error(f"Error en pipeline: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request, format: str = "json"):
+    """
+    Pipeline en lote: un solo encode + búsqueda FAISS, critic en lote e improver opcional
+    con concurrencia acotada. format=json devuelve la lista ordenada; format=ndjson emite
+    cada resultado ({"index": i, ...}) según termina.
+    """
+    if not rag_agent or not reasoner_agent or not critic_agent:
+        raise HTTPException(status_code=500, detail="Agentes no disponibles")
+    await _ensure_rag()
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format debe ser 'json' o 'ndjson'")
+    if len(request.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"Máximo {BATCH_MAX_MESSAGES} mensajes por lote")
+    
+    improver = improver_agent if request.improve else None
+    if format == "json":
+        results = await run_batch(request.messages, rag_agent, reasoner_agent, critic_agent, improver)
+        return {"results": results, "count": len(results)}
+    
+    async def lines():
+        async for i, result in iter_batch(request.messages, rag_agent, reasoner_agent, critic_agent, improver):
+            if await http_request.is_disconnected():
+                return
+            yield json.dumps({"index": i, **result}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _stream_event(event: str, data: dict, fmt: str) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if fmt == "ndjson":
+        return f'{{"event": "{event}", "data": {payload}}}\n'
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request, format: str = "sse", improve: bool = STREAM_IMPROVER_ENABLED):
+    """
+    /chat en streaming (SSE o NDJSON). Eventos en orden:
+    rag -> reasoner -> token* (improver) -> critic -> done.
+    El critic se calcula sobre la respuesta del reasoner (es lo que guía al improver) y se envía al final.
+    Si el stream del LLM se corta después de algún token se envía error en lugar de done: los tokens
+    recibidos no forman una respuesta completa.
+    """
+    await _ensure_rag()
+    if not reasoner_agent:
+        raise HTTPException(status_code=500, detail="Reasoner agent no disponible")
+    if not critic_agent:
+        raise HTTPException(status_code=500, detail="Critic agent no disponible")
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format debe ser 'sse' o 'ndjson'")
+    
+    request_id = str(uuid.uuid4())
+    logger.info(f"[{request_id}] Streaming: {request.message}")
+    
+    async def events():
+        start = time.perf_counter()
+        try:
+            with PipelineContext(request.message, request_id) as ctx:
+                # 1. RAG: primer evento en cuanto termina la recuperación
+                rag_context = await ctx.aretrieve(rag_agent)
+                metrics.record_relevance(rag_context)
+                yield _stream_event("rag", {"rag_context": rag_context}, format)
+                
+                # 2. Reasoner
+                reasoner_result = await reasoner_agent.reason(request.message, rag_context)
+                final_response = reasoner_result["final_response"]
+                yield _stream_event("reasoner", {"text": final_response}, format)
+                
+                # 3. Critic (se envía al final) y tokens del improver según llegan
+                critic_review = await critic_agent.critique(final_response, request.message, rag_context)
+                if improve and improver_agent and reasoner_result.get("should_respond", True):
+                    parts = []
+                    improve_start = time.perf_counter()
+                    stream = improver_agent.improve_stream(final_response, critic_review, request.message, rag_context)
+                    try:
+                        async for delta in stream:
+                            if await http_request.is_disconnected():
+                                logger.info(f"[{request_id}] Cliente desconectado durante el streaming")
+                                return
+                            parts.append(delta)
+                            yield _stream_event("token", {"delta": delta}, format)
+                    finally:
+                        # Cierra ya la petición al LLM (no al recolectar el generador): deja de generar tokens
+                        await stream.aclose()
+                    final_response = "".join(parts) or final_response
+                    metrics.observe_stage("improver", time.perf_counter() - improve_start)
+                
+                # 4. Critic
+                yield _stream_event("critic", {"critic_review": critic_review}, format)
+            
+            pipeline_stats["requests"] += 1
+            pipeline_stats["embed_calls"] += ctx.embed_calls
+            metrics.observe_request("chat_stream", time.perf_counter() - start)
+            yield _stream_event("done", {"request_id": request_id, "final_response": final_response, "embed_calls": ctx.embed_calls}, format)
+        except asyncio.CancelledError:
+            # Starlette cancela la respuesta cuando el cliente se desconecta
+            logger.info(f"[{request_id}] Streaming cancelado por desconexión del cliente")
+            raise
+        except Exception as e:
+            logger.error(f"[{request_id}] Error en streaming: {e}")
+            yield _stream_event("error", {"detail": str(e)}, format)
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"X-Request-ID": request_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002, reload=False)
\ No newline at end of file
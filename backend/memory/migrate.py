@@ -0,0 +1,86 @@
+# backend/memory/migrate.py
+"""
+Importa store.json y logs/events.json a la base SQLite de memoria.
+
+    python -m memory.migrate --db memory/memory.db
+    python -m memory.migrate --store memory/store.json --events logs/events.json --force
+"""
+import sys
+import json
+import argparse
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List
+
+try:
+    from .sqlite_store import SQLITE_PATH, init_db, insert_records
+except ImportError:
+    from sqlite_store import SQLITE_PATH, init_db, insert_records
+
+logger = logging.getLogger("memory.migrate")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_STORE = BACKEND_DIR / "memory" / "store.json"
+DEFAULT_EVENTS = BACKEND_DIR / "logs" / "events.json"
+
+BATCH_SIZE = 1000
+
+
+def store_records(path: Path) -> List[Dict[str, Any]]:
+    data = json.loads(path.read_text())
+    records = [{"type": "learning", **item} for item in data.get("learned", [])]
+    records += [{"type": "interaction", **entry} for entry in data.get("interactions", [])]
+    return records
+
+
+def event_records(path: Path) -> List[Dict[str, Any]]:
+    # events.json es una lista de eventos por agente; el timestamp no siempre es una fecha
+    return [{"type": "event", **event} for event in json.loads(path.read_text())]
+
+
+def import_source(conn, source: Path, records: List[Dict[str, Any]], force: bool = False) -> int:
+    """Importa los registros de un fichero en una transacción; se salta si ya se importó"""
+    key = str(source.resolve())
+    if not force and conn.execute("SELECT 1 FROM imports WHERE source = ?", (key,)).fetchone():
+        logger.info(f"⏭️ {source} ya importado (usa --force para repetir)")
+        return 0
+    with conn:
+        for i in range(0, len(records), BATCH_SIZE):
+            insert_records(conn, records[i:i + BATCH_SIZE])
+        conn.execute(
+            "INSERT OR REPLACE INTO imports (source, imported_at, rows) VALUES (?, ?, ?)",
+            (key, datetime.utcnow().isoformat() + "Z", len(records))
+        )
+    logger.info(f"✅ {len(records)} registros importados de {source}")
+    return len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra store.json y logs/events.json a SQLite")
+    parser.add_argument("--db", type=Path, default=SQLITE_PATH)
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE)
+    parser.add_argument("--events", type=Path, default=DEFAULT_EVENTS)
+    parser.add_argument("--force", action="store_true", help="Reimportar aunque ya conste como importado")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    conn = init_db(args.db)
+    totals = {}
+    try:
+        if args.store.exists():
+            totals["store"] = import_source(conn, args.store, store_records(args.store), args.force)
+        else:
+            logger.warning(f"No existe {args.store}")
+        if args.events.exists():
+            totals["events"] = import_source(conn, args.events, event_records(args.events), args.force)
+        else:
+            logger.warning(f"No existe {args.events}")
+    finally:
+        conn.close()
+    print(json.dumps({"db": str(args.db), "imported": totals}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
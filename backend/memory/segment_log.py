@@ -0,0 +1,242 @@
+# backend/memory/segment_log.py
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger("memory.segment_log")
+
+# Rotación: tamaño máximo del segmento activo
+SEGMENT_MAX_BYTES = int(os.getenv("MEMORY_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+# fsync por lotes: cada N registros o cada T segundos, lo que ocurra antes
+FSYNC_EVERY = int(os.getenv("MEMORY_FSYNC_EVERY", "32"))
+FSYNC_INTERVAL = float(os.getenv("MEMORY_FSYNC_INTERVAL", "1.0"))
+# Compactación: a partir de N segmentos cerrados se fusionan hasta este tamaño
+COMPACT_MIN_SEGMENTS = int(os.getenv("MEMORY_COMPACT_SEGMENTS", "8"))
+COMPACT_TARGET_BYTES = int(os.getenv("MEMORY_COMPACT_TARGET_BYTES", str(64 * 1024 * 1024)))
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+COMPACT_SUFFIX = ".compact"
+
+
+class SegmentedLog:
+    """
+    Log append-only en segmentos JSON Lines.
+    Cada escritura añade una línea al segmento activo (coste constante); los segmentos
+    cerrados se fusionan en segundo plano conservando el orden. Un segmento fusionado se llama
+    segment-<primero>-<último>.jsonl: si el proceso muere antes de borrar los originales, al
+    abrir el log se borran los que ya cubre (sin registros duplicados).
+    """
+
+    def __init__(self, directory: Path, segment_max_bytes: int = SEGMENT_MAX_BYTES,
+                 fsync_every: int = FSYNC_EVERY, fsync_interval: float = FSYNC_INTERVAL,
+                 compact_min_segments: int = COMPACT_MIN_SEGMENTS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.compact_min_segments = compact_min_segments
+
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.stats = {"appends": 0, "fsyncs": 0, "rotations": 0, "compactions": 0}
+
+        segments = self._recover()
+        if not segments:
+            self._active_number = 1
+        else:
+            first, last = self._range(segments[-1])
+            # El activo nunca es un segmento fusionado
+            self._active_number = last if first == last else last + 1
+        active = self._segment_path(self._active_number)
+        if active.exists():
+            self._truncate_torn_tail(active)
+        self._file = open(active, "a", encoding="utf-8")
+        self._active_size = self._file.tell()
+
+    # --- segmentos ---
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+    def _merged_path(self, first: int, last: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{first:08d}-{last:08d}{SEGMENT_SUFFIX}"
+
+    @staticmethod
+    def _range(path: Path) -> Tuple[int, int]:
+        """(primer, último) número de segmento que contiene el fichero"""
+        numbers = path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].split("-")
+        return int(numbers[0]), int(numbers[-1])
+
+    @classmethod
+    def _number(cls, path: Path) -> int:
+        return cls._range(path)[0]
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"), key=self._range)
+
+    @staticmethod
+    def _truncate_torn_tail(path: Path):
+        """Quita una última línea sin "\n" (escritura interrumpida): lo siguiente se pegaría a ella"""
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(max(0, size - 1))
+            if f.read(1) == b"\n":
+                return
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                cut = f.read(end - start).rfind(b"\n")
+                if cut >= 0:
+                    end = start + cut + 1
+                    break
+                end = start
+            f.truncate(end)
+        logger.warning(f"Línea incompleta al final de {path.name} descartada ({size - end} bytes)")
+
+    def _recover(self) -> List[Path]:
+        """Termina una compactación interrumpida: borra temporales y segmentos ya cubiertos por uno fusionado"""
+        for tmp in self.directory.glob(f"{SEGMENT_PREFIX}*{COMPACT_SUFFIX}"):
+            tmp.unlink()
+        segments = self._segments()
+        merged = [self._range(p) for p in segments if len(set(self._range(p))) == 2]
+        kept = []
+        for path in segments:
+            first, last = self._range(path)
+            if any(m != (first, last) and m[0] <= first and last <= m[1] for m in merged):
+                logger.warning(f"Segmento {path.name} ya incluido en uno compactado: se borra")
+                path.unlink()
+            else:
+                kept.append(path)
+        return kept
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return all(p.stat().st_size == 0 for p in self._segments())
+
+    # --- escritura ---
+
+    def append(self, record: Dict[str, Any]):
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]):
+        """Añade registros al final del segmento activo; fsync por lotes"""
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            self._active_size += len(data.encode("utf-8"))
+            self._unsynced += len(records)
+            self.stats["appends"] += len(records)
+
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            if self._active_size >= self.segment_max_bytes:
+                self._rotate()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self.stats["fsyncs"] += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._file.flush()
+            self._sync()
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._active_number += 1
+        self._file = open(self._segment_path(self._active_number), "a", encoding="utf-8")
+        self._active_size = 0
+        self.stats["rotations"] += 1
+
+        closed = len(self._segments()) - 1
+        if closed >= self.compact_min_segments and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, name="memory-compaction", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    # --- lectura ---
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Recorre todos los registros en orden de escritura sin cargar el historial en memoria"""
+        with self._lock:
+            self._file.flush()
+            # Abrir todos los segmentos bajo el lock: si la compactación los sustituye después,
+            # los descriptores abiertos siguen apuntando a los ficheros originales
+            handles = [open(p, encoding="utf-8") for p in self._segments()]
+        for handle in handles:
+            with handle:
+                for line in handle:
+                    if not line.endswith("\n"):
+                        break  # escritura interrumpida: línea incompleta al final
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Registro corrupto ignorado en {handle.name}")
+
+    # --- compactación ---
+
+    def _compact(self):
+        """Fusiona segmentos cerrados consecutivos en el primero de cada grupo"""
+        try:
+            with self._lock:
+                closed = [p for p in self._segments() if self._number(p) != self._active_number]
+
+            groups: List[List[Path]] = []
+            current: List[Path] = []
+            size = 0
+            for path in closed:
+                path_size = path.stat().st_size
+                if current and size + path_size > COMPACT_TARGET_BYTES:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(path)
+                size += path_size
+            if current:
+                groups.append(current)
+
+            for group in groups:
+                if len(group) < 2:
+                    continue
+                # El nombre del fusionado registra el rango que cubre (ver _recover)
+                target = self._merged_path(self._range(group[0])[0], self._range(group[-1])[1])
+                tmp = target.with_name(target.name + COMPACT_SUFFIX)
+                with open(tmp, "w", encoding="utf-8") as out:
+                    for path in group:
+                        with open(path, encoding="utf-8") as src:
+                            for line in src:
+                                if line.endswith("\n"):
+                                    out.write(line)
+                    out.flush()
+                    os.fsync(out.fileno())
+                with self._lock:
+                    os.replace(tmp, target)
+                    for path in group:
+                        if path != target:
+                            path.unlink()
+                    self.stats["compactions"] += 1
+                logger.info(f"🗜️ Compactados {len(group)} segmentos en {target.name}")
+        except OSError as e:
+            logger.error(f"Error compactando el log de memoria: {e}")
+        finally:
+            self._compacting = False
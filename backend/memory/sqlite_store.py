@@ -0,0 +1,351 @@
+# backend/memory/sqlite_store.py
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("memory.sqlite_store")
+
+SQLITE_PATH = Path(os.getenv("MEMORY_SQLITE_PATH", str(Path(__file__).parent / "memory.db")))
+# Lote máximo del writer y ventana de espera para agrupar inserciones
+SQLITE_WRITE_BATCH = int(os.getenv("MEMORY_SQLITE_WRITE_BATCH", "256"))
+SQLITE_WRITE_WINDOW_MS = float(os.getenv("MEMORY_SQLITE_WRITE_WINDOW_MS", "5"))
+SQLITE_READ_WORKERS = int(os.getenv("MEMORY_SQLITE_READ_WORKERS", "4"))
+# Tamaño de página por defecto y máximo de las consultas paginadas
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    request_id TEXT,
+    score REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_request_id ON interactions(request_id);
+CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions(timestamp);
+CREATE INDEX IF NOT EXISTS idx_interactions_score ON interactions(score);
+
+CREATE TABLE IF NOT EXISTS learnings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    request_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_learnings_request_id ON learnings(request_id);
+CREATE INDEX IF NOT EXISTS idx_learnings_timestamp ON learnings(timestamp);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    request_id TEXT,
+    agent TEXT,
+    score REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_request_id ON events(request_id);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_score ON events(score);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+INSERT_SQL = {
+    "interaction": "INSERT INTO interactions (timestamp, request_id, score, data) VALUES (?, ?, ?, ?)",
+    "learning": "INSERT INTO learnings (timestamp, request_id, data) VALUES (?, ?, ?)",
+    "event": "INSERT INTO events (timestamp, request_id, agent, score, data) VALUES (?, ?, ?, ?, ?)",
+}
+TABLES = {"interaction": "interactions", "learning": "learnings", "event": "events"}
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+def init_db(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    conn.commit()
+    return conn
+
+
+def _as_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _as_score(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def record_row(record: Dict[str, Any]) -> Tuple[str, tuple]:
+    """Convierte un registro {"type": ..., ...} en (tipo, fila) para INSERT_SQL"""
+    record = dict(record)
+    kind = record.pop("type")
+    data = json.dumps(record, ensure_ascii=False)
+    timestamp = _as_text(record.get("timestamp"))
+    if kind == "interaction":
+        critic = record.get("critic") or {}
+        return kind, (timestamp, record.get("request_id"), _as_score(critic.get("score")), data)
+    if kind == "learning":
+        item = record.get("item") or {}
+        return kind, (timestamp, item.get("request_id"), data)
+    if kind == "event":
+        return kind, (timestamp, record.get("request_id"), record.get("agent"), _as_score(record.get("score")), data)
+    raise ValueError(f"Tipo de registro desconocido: {kind}")
+
+
+def insert_records(conn: sqlite3.Connection, records: List[Dict[str, Any]]):
+    """Inserta registros agrupados por tipo (sin commit)"""
+    grouped: Dict[str, List[tuple]] = {}
+    for record in records:
+        kind, row = record_row(record)
+        grouped.setdefault(kind, []).append(row)
+    for kind, rows in grouped.items():
+        conn.executemany(INSERT_SQL[kind], rows)
+
+
+class SQLiteMemoryStore:
+    """
+    Backend SQLite (WAL) de MemoryStore con la misma interfaz y consultas paginadas.
+    Las escrituras pasan por una tarea writer que agrupa inserciones en una transacción;
+    las lecturas se ejecutan en un pool de hilos con una conexión por hilo.
+    """
+
+    def __init__(self, path: Path = SQLITE_PATH, write_batch: int = SQLITE_WRITE_BATCH,
+                 write_window_ms: float = SQLITE_WRITE_WINDOW_MS, read_workers: int = SQLITE_READ_WORKERS):
+        self.path = Path(path)
+        self.write_batch = max(1, write_batch)
+        self.write_window = write_window_ms / 1000.0
+        self._writer_conn = init_db(self.path)
+        # Un único hilo para el writer: sqlite admite un escritor a la vez
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-sqlite-writer")
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="memory-sqlite-reader")
+        self._local = threading.local()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._stats = {"writes": 0, "batches": 0, "write_seconds": 0.0, "reads": 0}
+
+    # --- escritura ---
+
+    def _ensure_writer(self):
+        if self._writer_task is None or self._writer_task.done():
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.get_running_loop().create_task(self._writer())
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.write_window
+            while len(batch) < self.write_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    await self._flush(batch)
+                    return
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[List[Dict[str, Any]], asyncio.Future]]):
+        records = [r for recs, _ in batch for r in recs]
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._write_executor, self._write_sync, records)
+            error = None
+        except Exception as e:
+            logger.error(f"Error escribiendo {len(records)} registros en SQLite: {e}")
+            error = e
+        for _, future in batch:
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+    def _write_sync(self, records: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        with self._writer_conn:
+            insert_records(self._writer_conn, records)
+        self._stats["writes"] += len(records)
+        self._stats["batches"] += 1
+        self._stats["write_seconds"] += time.perf_counter() - start
+
+    async def append_records(self, records: List[Dict[str, Any]]):
+        """Encola registros para el writer y espera a que su lote se confirme"""
+        self._ensure_writer()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        await future
+
+    def interaction_record(self, request_id: str, user_message: str, reasoner_resp: str, critic_report: dict, improver_resp: str, rag_context: str = "") -> Dict[str, Any]:
+        return {
+            "type": "interaction",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "request_id": request_id,
+            "user_message": user_message,
+            "reasoner": reasoner_resp,
+            "critic": critic_report,
+            "improver": improver_resp,
+            "rag_context": rag_context
+        }
+
+    async def add_interaction(self, request_id: str, user_message: str, reasoner_resp: str, critic_report: dict, improver_resp: str, rag_context: str = ""):
+        record = self.interaction_record(request_id, user_message, reasoner_resp, critic_report, improver_resp, rag_context)
+        await self.append_records([record])
+        entry = dict(record)
+        entry.pop("type")
+        return entry
+
+    async def add_learning(self, item: dict):
+        await self.append_records([{
+            "type": "learning",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "item": item
+        }])
+
+    async def add_event(self, event: dict):
+        await self.append_records([{"type": "event", **event}])
+
+    # --- lectura ---
+
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    async def _read(self, sql: str, params: tuple) -> List[tuple]:
+        def run():
+            self._stats["reads"] += 1
+            return self._read_conn().execute(sql, params).fetchall()
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, run)
+
+    async def _page(self, kind: str, request_id: Optional[str] = None, since: Optional[str] = None,
+                    until: Optional[str] = None, min_score: Optional[float] = None, max_score: Optional[float] = None,
+                    agent: Optional[str] = None, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE,
+                    newest_first: bool = True) -> Dict[str, Any]:
+        """
+        Paginación por cursor (id): next_cursor se pasa tal cual en la siguiente llamada.
+        Devuelve {"items": [...], "next_cursor": int | None}.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if request_id is not None:
+            clauses.append("request_id = ?")
+            params.append(request_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if min_score is not None:
+            clauses.append("score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("score <= ?")
+            params.append(max_score)
+        if agent is not None:
+            clauses.append("agent = ?")
+            params.append(agent)
+        if cursor is not None:
+            clauses.append("id < ?" if newest_first else "id > ?")
+            params.append(cursor)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT id, data FROM {TABLES[kind]} {where} ORDER BY id {order} LIMIT ?"
+        rows = await self._read(sql, tuple(params) + (limit + 1,))
+
+        items = [{"id": row_id, **json.loads(data)} for row_id, data in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def get_interactions(self, request_id: Optional[str] = None, since: Optional[str] = None,
+                               until: Optional[str] = None, min_score: Optional[float] = None,
+                               max_score: Optional[float] = None, cursor: Optional[int] = None,
+                               limit: int = DEFAULT_PAGE_SIZE, newest_first: bool = True) -> Dict[str, Any]:
+        return await self._page("interaction", request_id=request_id, since=since, until=until, min_score=min_score,
+                                max_score=max_score, cursor=cursor, limit=limit, newest_first=newest_first)
+
+    async def get_learnings(self, request_id: Optional[str] = None, since: Optional[str] = None,
+                            until: Optional[str] = None, cursor: Optional[int] = None,
+                            limit: int = DEFAULT_PAGE_SIZE, newest_first: bool = True) -> Dict[str, Any]:
+        return await self._page("learning", request_id=request_id, since=since, until=until,
+                                cursor=cursor, limit=limit, newest_first=newest_first)
+
+    async def get_events(self, request_id: Optional[str] = None, agent: Optional[str] = None,
+                         min_score: Optional[float] = None, max_score: Optional[float] = None,
+                         cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE,
+                         newest_first: bool = True) -> Dict[str, Any]:
+        return await self._page("event", request_id=request_id, agent=agent, min_score=min_score,
+                                max_score=max_score, cursor=cursor, limit=limit, newest_first=newest_first)
+
+    async def iter_records(self, kind: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Recorre interacciones y aprendizajes en orden de inserción, página a página"""
+        for k in ([kind] if kind else ["learning", "interaction"]):
+            cursor = None
+            while True:
+                page = await self._page(k, cursor=cursor, limit=MAX_PAGE_SIZE, newest_first=False)
+                for item in page["items"]:
+                    item.pop("id")
+                    yield item
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+
+    async def get_state(self) -> Dict[str, AsyncIterator[Dict[str, Any]]]:
+        """
+        Mismas claves que el antiguo store.json, pero cada valor es un iterador asíncrono que
+        recorre el almacén al consumirse (no se materializa el historial; para dashboards, las consultas paginadas):
+            async for entry in (await store.get_state())["interactions"]: ...
+        """
+        return {
+            "learned": self.iter_records("learning"),
+            "interactions": self.iter_records("interaction"),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["write_seconds"] = round(stats["write_seconds"], 4)
+        stats["pending"] = self._queue.qsize() if self._queue else 0
+        return stats
+
+    async def close(self):
+        """Vacía la cola del writer y cierra conexiones"""
+        if self._writer_task and not self._writer_task.done():
+            await self._queue.put(None)
+            await self._writer_task
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        self._writer_conn.close()
@@ -1,33 +1,66 @@
 # backend/memory/store.py
+import os
 import asyncio
 import json
+import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, List, Optional
 
+try:
+    from .segment_log import SegmentedLog
+except ImportError:
+    from segment_log import SegmentedLog
+
+logger = logging.getLogger("memory.store")
+
+# store.json legado: solo se lee una vez para importarlo al log
 STORE_PATH = Path(__file__).parent / "store.json"
+LOG_DIR = Path(os.getenv("MEMORY_LOG_DIR", str(Path(__file__).parent / "log")))
+
+# Cada cuántos registros leídos se cede el event loop al recorrer el log
+STREAM_YIELD_EVERY = 500
+
 
 class MemoryStore:
-    def __init__(self, path: Path = STORE_PATH):
+    """
+    Memoria de interacciones y aprendizajes sobre un log append-only segmentado.
+    Cada registro es una línea JSON con un campo "type" ("interaction" o "learning").
+    """
+
+    def __init__(self, path: Path = STORE_PATH, log_dir: Path = LOG_DIR):
         self.path = path
+        self.log = SegmentedLog(log_dir)
         self.lock = asyncio.Lock()
+        self._migrated = False
 
-    async def _read(self) -> Dict[str, Any]:
+    async def _ensure_migrated(self):
+        """Importa store.json al log la primera vez (si el log está vacío)"""
+        if self._migrated:
+            return
         async with self.lock:
-            if not self.path.exists():
-                default = {"learned": [], "interactions": []}
-                self.path.write_text(json.dumps(default, indent=2))
-                return default
-            text = self.path.read_text()
-            return json.loads(text)
-
-    async def _write(self, data: Dict[str, Any]):
-        async with self.lock:
-            self.path.write_text(json.dumps(data, indent=2))
+            if self._migrated:
+                return
+            if self.path.exists() and self.log.is_empty():
+                data = json.loads(self.path.read_text())
+                records = [{"type": "learning", **item} for item in data.get("learned", [])]
+                records += [{"type": "interaction", **entry} for entry in data.get("interactions", [])]
+                records.sort(key=lambda r: r.get("timestamp", ""))
+                if records:
+                    self.log.append_many(records)
+                    self.log.sync()
+                    logger.info(f"📦 Importados {len(records)} registros de {self.path.name} al log")
+            self._migrated = True
 
-    async def add_interaction(self, request_id: str, user_message: str, reasoner_resp: str, critic_report: dict, improver_resp: str, rag_context: str = ""):
-        data = await self._read()
-        entry = {
+    async def append_records(self, records: List[Dict[str, Any]]):
+        """Añade varios registros ya construidos en una sola escritura"""
+        await self._ensure_migrated()
+        # En un hilo: un fsync o una rotación no bloquean el event loop
+        await asyncio.to_thread(self.log.append_many, records)
+
+    def interaction_record(self, request_id: str, user_message: str, reasoner_resp: str, critic_report: dict, improver_resp: str, rag_context: str = "") -> Dict[str, Any]:
+        return {
+            "type": "interaction",
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "request_id": request_id,
             "user_message": user_message,
@@ -36,17 +69,60 @@ class MemoryStore:
             "improver": improver_resp,
             "rag_context": rag_context
         }
-        data.setdefault("interactions", []).append(entry)
-        await self._write(data)
+
+    async def add_interaction(self, request_id: str, user_message: str, reasoner_resp: str, critic_report: dict, improver_resp: str, rag_context: str = ""):
+        record = self.interaction_record(request_id, user_message, reasoner_resp, critic_report, improver_resp, rag_context)
+        await self.append_records([record])
+        entry = dict(record)
+        entry.pop("type")
         return entry
 
     async def add_learning(self, item: dict):
-        data = await self._read()
-        data.setdefault("learned", []).append({
+        await self.append_records([{
+            "type": "learning",
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "item": item
-        })
-        await self._write(data)
+        }])
+
+    async def iter_records(self, kind: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Recorre el log en orden de escritura sin materializarlo; kind filtra por tipo"""
+        await self._ensure_migrated()
+        for count, record in enumerate(self.log.iter_records(), 1):
+            record_type = record.pop("type", None)
+            if kind is None or record_type == kind:
+                yield record
+            if count % STREAM_YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+    async def get_state(self) -> Dict[str, AsyncIterator[Dict[str, Any]]]:
+        """
+        Mismas claves que el antiguo store.json, pero cada valor es un iterador asíncrono que
+        recorre el almacén al consumirse (no se materializa el historial):
+            async for entry in (await store.get_state())["interactions"]: ...
+        """
+        return {
+            "learned": self.iter_records("learning"),
+            "interactions": self.iter_records("interaction"),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.log.stats)
+
+    async def close(self):
+        self.log.close()
+
+
+# Backend de memoria: "log" (segmentos JSONL) o "sqlite"
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "log")
+
 
-    async def get_state(self):
-        return await self._read()
+def create_memory_store(backend: str = MEMORY_BACKEND):
+    if backend == "sqlite":
+        try:
+            from .sqlite_store import SQLiteMemoryStore
+        except ImportError:
+            from sqlite_store import SQLiteMemoryStore
+        return SQLiteMemoryStore()
+    if backend != "log":
+        raise ValueError(f"MEMORY_BACKEND desconocido: {backend}")
+    return MemoryStore()
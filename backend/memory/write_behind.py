@@ -0,0 +1,131 @@
+# backend/memory/write_behind.py
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+try:
+    from ..metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger("memory.write_behind")
+
+# Se vacía al llegar a N registros o cuando el más antiguo lleva T ms esperando
+WRITE_BEHIND_BATCH = int(os.getenv("MEMORY_WRITE_BEHIND_BATCH", "64"))
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv("MEMORY_WRITE_BEHIND_INTERVAL_MS", "50"))
+# Capacidad de la cola: al llenarse, submit() espera (backpressure)
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("MEMORY_WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_RETRIES = int(os.getenv("MEMORY_WRITE_BEHIND_RETRIES", "3"))
+
+_CLOSE = object()
+
+
+class WriteBehindQueue:
+    """
+    Cola write-behind delante de un MemoryStore: las peticiones encolan registros y
+    una única tarea los escribe por lotes con store.append_records, en orden FIFO.
+    """
+
+    def __init__(self, store, max_batch: int = WRITE_BEHIND_BATCH, flush_interval_ms: float = WRITE_BEHIND_INTERVAL_MS,
+                 max_queue: int = WRITE_BEHIND_MAX_QUEUE, retries: int = WRITE_BEHIND_RETRIES):
+        self.store = store
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_queue = max_queue
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._latencies = deque(maxlen=256)
+        self._stats = {"enqueued": 0, "flushed": 0, "batches": 0, "dropped": 0,
+                       "backpressure_waits": 0, "max_depth": 0}
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, record: Dict[str, Any]):
+        """Encola un registro; solo espera si la cola está llena"""
+        if self._closing:
+            raise RuntimeError("WriteBehindQueue cerrada")
+        self._ensure_task()
+        if self._queue.full():
+            self._stats["backpressure_waits"] += 1
+        await self._queue.put(record)
+        self._stats["enqueued"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSE:
+                return
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            closing = False
+            while len(batch) < self.max_batch:
+                # Lo ya encolado se toma sin esperar; después, como mucho hasta el deadline
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if closing:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                await self.store.append_records(batch)
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"❌ Descartados {len(batch)} registros de memoria tras {attempt + 1} intentos: {e}")
+                    self._stats["dropped"] += len(batch)
+                    return
+                logger.warning(f"Reintentando escritura de memoria ({attempt + 1}/{self.retries}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        elapsed = time.perf_counter() - start
+        self._latencies.append(elapsed)
+        metrics.observe_stage("memory_write", elapsed)
+        self._stats["flushed"] += len(batch)
+        self._stats["batches"] += 1
+
+    async def close(self):
+        """Deja de aceptar registros, escribe todo lo pendiente en orden y cierra el store"""
+        self._closing = True
+        if self._task and not self._task.done():
+            await self._queue.put(_CLOSE)
+            await self._task
+        await self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            **self._stats,
+            "depth": self._queue.qsize() if self._queue else 0,
+            "capacity": self.max_queue,
+            "flush_latency_ms": {
+                "last": round(self._latencies[-1] * 1000, 2) if latencies else 0,
+                "avg": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+                "p95": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2) if latencies else 0,
+            },
+            "store": self.store.stats(),
+        }
@@ -0,0 +1,161 @@
+# backend/metrics.py
+import os
+import time
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger("metrics")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    PROMETHEUS_AVAILABLE = False
+
+# Buckets en segundos: del encode de una consulta (ms) a una llamada al LLM (decenas de s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGES = ("embed", "faiss_search", "reasoner", "critic", "improver", "llm", "memory_write")
+
+# Valor del gauge de estado de los cortocircuitos
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class _NoopMetric:
+    """Sustituto cuando prometheus_client no está instalado o las métricas están desactivadas"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+
+class Metrics:
+    """
+    Métricas Prometheus del pipeline. Los hijos con etiquetas fijas se resuelven una vez
+    al arrancar para que registrar en el camino caliente sea un observe()/inc() directo.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED and PROMETHEUS_AVAILABLE):
+        self.enabled = enabled
+        if not enabled:
+            noop = _NoopMetric()
+            self.stage_seconds = self.request_seconds = noop
+            self.cache_requests = self.relevance = self.llm_fallbacks = self.llm_cache_saved_seconds = noop
+            self.coalesced_requests = self.llm_provider_calls = noop
+            self.circuit_states = self.circuit_rejections = self.llm_streams = noop
+            self._stages = {stage: noop for stage in STAGES}
+            return
+
+        self.stage_seconds = Histogram(
+            "genesis_stage_duration_seconds", "Duración de cada etapa del pipeline",
+            ["stage"], buckets=LATENCY_BUCKETS)
+        self.request_seconds = Histogram(
+            "genesis_request_duration_seconds", "Duración total de la petición",
+            ["endpoint"], buckets=LATENCY_BUCKETS)
+        self.cache_requests = Counter(
+            "genesis_cache_requests_total", "Consultas a cachés por resultado", ["cache", "result"])
+        self.relevance = Counter(
+            "genesis_rag_relevance_total", "Resultados de relevancia del RAG", ["is_relevant", "relevance_level"])
+        self.llm_fallbacks = Counter(
+            "genesis_llm_fallback_total", "Llamadas a call_openai_chat resueltas con el proveedor gratuito", ["reason"])
+        self.llm_cache_saved_seconds = Counter(
+            "genesis_llm_cache_saved_seconds_total", "Latencia de LLM evitada por la caché semántica")
+        self.coalesced_requests = Counter(
+            "genesis_coalesced_requests_total", "Llamadas idénticas en vuelo resueltas con una sola ejecución",
+            ["flight"])
+        self.llm_provider_calls = Counter(
+            "genesis_llm_provider_calls_total", "Llamadas a proveedores de LLM por resultado (win, error, cancelled)",
+            ["provider", "result"])
+        self.circuit_states = Gauge(
+            "genesis_circuit_state", "Estado del cortocircuito por proveedor (0 cerrado, 1 semiabierto, 2 abierto)",
+            ["provider"])
+        self.circuit_rejections = Counter(
+            "genesis_circuit_rejected_total", "Llamadas rechazadas por un cortocircuito abierto", ["provider"])
+        self.llm_streams = Counter(
+            "genesis_llm_streams_total", "Streams del LLM por resultado (completed, cancelled, error, fallback)",
+            ["result"])
+        self._stages = {stage: self.stage_seconds.labels(stage) for stage in STAGES}
+
+    def observe_stage(self, stage: str, seconds: float):
+        child = self._stages.get(stage)
+        if child is None:
+            child = self._stages[stage] = self.stage_seconds.labels(stage)
+        child.observe(seconds)
+
+    def stage_timer(self, stage: str) -> "StageTimer":
+        return StageTimer(self, stage)
+
+    def observe_request(self, endpoint: str, seconds: float):
+        self.request_seconds.labels(endpoint).observe(seconds)
+
+    def cache(self, cache: str, hit: bool, count: int = 1):
+        if count:
+            self.cache_requests.labels(cache, "hit" if hit else "miss").inc(count)
+
+    def record_relevance(self, rag_context: Dict[str, Any]):
+        self.relevance.labels(
+            str(bool(rag_context.get("is_relevant", False))).lower(),
+            rag_context.get("relevance_level", "none")
+        ).inc()
+
+    def llm_fallback(self, reason: str):
+        self.llm_fallbacks.labels(reason).inc()
+
+    def llm_cache_saved(self, seconds: float):
+        self.llm_cache_saved_seconds.inc(seconds)
+
+    def coalesced(self, flight: str):
+        self.coalesced_requests.labels(flight).inc()
+
+    def llm_provider(self, provider: str, result: str):
+        self.llm_provider_calls.labels(provider, result).inc()
+
+    def circuit_state(self, provider: str, state: str):
+        self.circuit_states.labels(provider).set(CIRCUIT_STATES[state])
+
+    def circuit_rejected(self, provider: str):
+        self.circuit_rejections.labels(provider).inc()
+
+    def llm_stream(self, result: str):
+        self.llm_streams.labels(result).inc()
+
+    def render(self) -> bytes:
+        if not self.enabled:
+            return b"# metrics disabled\n"
+        return generate_latest()
+
+
+class StageTimer:
+    """Context manager: `with metrics.stage_timer("critic"): ...`"""
+
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: Metrics, stage: str):
+        self._metrics = metrics
+        self._stage = stage
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe_stage(self._stage, time.perf_counter() - self._start)
+        return False
+
+
+# Instancia global
+metrics = Metrics()
+if METRICS_ENABLED and not PROMETHEUS_AVAILABLE:
+    logger.warning("prometheus_client no está instalado: /metrics no exportará datos")
@@ -1,12 +1,14 @@
 import sys
 import os
 import logging
+import asyncio
 import uuid
 import json
+import time
 from datetime import datetime
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -18,8 +20,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'agents'))
 # Importar componentes MEJORADOS - NOMBRES CORREGIDOS
 try:
     from rag_agent import rag_agent  # Desde agents/rag_agent.py
-    from reasoner_agent import ReasonerAgent  # Desde agents/reasoner_agent.py  
-    from critic_agent import CriticAgent  # Desde agents/critic_agent.py
+    from reasoner_mejorado import ReasonerAgent  # Desde agents/reasoner_mejorado.py  
+    from critic import CriticAgent  # Desde agents/critic.py
+    from pipeline_context import PipelineContext  # Desde agents/pipeline_context.py
     logger.info("✅ Módulos principales cargados")
 except ImportError as e:
     logger.error(f"Error cargando módulos: {e}")
@@ -27,6 +30,17 @@ except ImportError as e:
     # Fallback para desarrollo
     rag_agent = None
 
+# Motor de etapas y lotes: sin dependencias pesadas, disponibles aunque fallen los agentes
+# (run_pipeline_batch usa BATCH_LLM_CONCURRENCY como valor por defecto al definirse)
+from pipeline_dag import PipelineDAG, Stage  # Desde agents/pipeline_dag.py
+from batch_pipeline import run_batch, BATCH_LLM_CONCURRENCY  # Desde agents/batch_pipeline.py
+try:
+    from .metrics import metrics, CONTENT_TYPE_LATEST
+    from .circuit_breaker import breakers_stats
+except ImportError:
+    from metrics import metrics, CONTENT_TYPE_LATEST
+    from circuit_breaker import breakers_stats
+
 app = FastAPI(title="Genesis AI Orchestrator - Mejorado")
 
 class ChatRequest(BaseModel):
@@ -38,12 +52,26 @@ class ChatResponse(BaseModel):
     critic_review: Dict[str, Any]
     request_id: str
     timestamp: str
+    stage_timings: Dict[str, Any] = {}
+
+try:
+    from .memory.store import create_memory_store
+    from .memory.write_behind import WriteBehindQueue
+except ImportError:
+    from memory.store import create_memory_store
+    from memory.write_behind import WriteBehindQueue
+
+# Persistencia write-behind: /chat encola la interacción y no espera al disco.
+# Se crea en el startup: importar el módulo (tests, replay en proceso) no abre el log
+memory_store = None
+persistence: Optional[WriteBehindQueue] = None
 
-class SimpleMemory:
-    async def add_interaction(self, **kwargs):
-        return {"timestamp": datetime.now().isoformat()}
+# Improver (LLM) opcional en /chat y su timeout; si vence se devuelve la respuesta del reasoner
+ORCHESTRATOR_IMPROVE = os.getenv("ORCHESTRATOR_IMPROVE", "0") == "1"
+IMPROVER_TIMEOUT = float(os.getenv("IMPROVER_TIMEOUT", "10"))
 
-memory_store = SimpleMemory()
+# Carga del modelo RAG en segundo plano al arrancar (0 = en la primera petición)
+RAG_PRELOAD = os.getenv("RAG_PRELOAD", "1") == "1"
 
 # Inicializar agentes MEJORADOS
 try:
@@ -55,18 +83,131 @@ except Exception as e:
     reasoner_agent = None
     critic_agent = None
 
+try:
+    from improver import ImproverAgent  # Desde agents/improver.py
+    improver_agent = ImproverAgent()
+except ImportError as e:
+    logger.error(f"Error cargando Improver: {e}")
+    improver_agent = None
+
+async def _preload_rag():
+    try:
+        await rag_agent.aload()
+    except Exception as e:
+        logger.error(f"Error cargando el modelo RAG: {e}")
+
+@app.on_event("startup")
+async def startup():
+    global memory_store, persistence
+    if persistence is None:
+        memory_store = create_memory_store()
+        persistence = WriteBehindQueue(memory_store)
+    if rag_agent and RAG_PRELOAD:
+        app.state.rag_preload = asyncio.create_task(_preload_rag())
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Vacía en orden las interacciones pendientes antes de salir
+    if persistence is not None:
+        await persistence.close()
+
 @app.get("/")
 async def root():
     return {"message": "Genesis AI Orchestrator - Mejorado con detección de relevancia"}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "agents_loaded": all([rag_agent, reasoner_agent, critic_agent]),
+        "rag": rag_agent.status() if rag_agent else {},
+        "persistence": persistence.stats() if persistence else {},
+        "circuit_breakers": breakers_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+# --- Etapas del pipeline (cada una declara entradas y salidas) ---
+
+async def _rag_stage(ctx):
+    # RAG una sola vez por petición (espera a la carga del modelo fuera del event loop)
+    await rag_agent.aload()
+    return await ctx.aretrieve(rag_agent)
+
+async def _relevance_metrics_stage(rag_context):
+    metrics.record_relevance(rag_context)
+
+async def _persist_rag_stage(request_id, user_message, rag_context):
+    # Resumen de la recuperación como evento del agente "rag" (el contexto completo va en la interacción)
+    await persistence.submit({
+        "type": "event",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "request_id": request_id,
+        "agent": "rag",
+        "score": rag_context.get("max_similarity"),
+        "user_message": user_message,
+        "results_count": rag_context.get("results_count"),
+        "relevance_level": rag_context.get("relevance_level"),
+    })
+    return True
+
+async def _reasoner_stage(user_message, rag_context):
+    return await reasoner_agent.reason(user_message, rag_context)
+
+async def _critic_stage(user_message, reasoner_result, rag_context):
+    return await critic_agent.critique(reasoner_result["final_response"], user_message, rag_context)
+
+async def _improve_stage(user_message, reasoner_result, critic_review, rag_context):
+    if not reasoner_result.get("should_respond", True):
+        return None
+    return await improver_agent.improve(reasoner_result["final_response"], critic_review, user_message, rag_context)
+
+async def _persist_stage(request_id, user_message, reasoner_result, critic_review, improved_response=None):
+    # Write-behind: solo espera si la cola está llena
+    await persistence.submit(persistence.store.interaction_record(
+        request_id=request_id,
+        user_message=user_message,
+        reasoner_resp=reasoner_result["final_response"],
+        critic_report=critic_review,
+        improver_resp=improved_response or "",
+        rag_context=reasoner_result["rag_context"]
+    ))
+    return True
+
+def build_pipeline(persist: bool, improve: bool) -> PipelineDAG:
+    """
+    rag -> reasoner -> critic -> improver -> persistencia de la interacción, que espera al
+    improver para guardar la respuesta mejorada (si falla o vence su timeout se guarda sin ella).
+    En cuanto hay contexto RAG, las métricas de relevancia y el evento del RAG corren en
+    paralelo con esa cadena.
+    """
+    stages = [
+        Stage("rag", _rag_stage, ["ctx"], ["rag_context"]),
+        Stage("relevance_metrics", _relevance_metrics_stage, ["rag_context"], optional=True),
+        Stage("reasoner", _reasoner_stage, ["user_message", "rag_context"], ["reasoner_result"]),
+        Stage("critic", _critic_stage, ["user_message", "reasoner_result", "rag_context"], ["critic_review"]),
+    ]
+    if improve:
+        # Si el LLM falla o tarda demasiado se mantiene la respuesta heurística del reasoner
+        stages.append(Stage("improver", _improve_stage,
+                            ["user_message", "reasoner_result", "critic_review", "rag_context"], ["improved_response"],
+                            timeout=IMPROVER_TIMEOUT, optional=True, defaults={"improved_response": None}))
+    if persist:
+        stages.append(Stage("persist_rag", _persist_rag_stage, ["request_id", "user_message", "rag_context"],
+                            ["rag_persisted"], optional=True, defaults={"rag_persisted": False}))
+        inputs = ["request_id", "user_message", "reasoner_result", "critic_review"]
+        if improve:
+            inputs.append("improved_response")
+        stages.append(Stage("persist", _persist_stage, inputs, ["persisted"],
+                            optional=True, defaults={"persisted": False}))
+    return PipelineDAG(stages, inputs=["ctx", "request_id", "user_message"])
+
+chat_pipeline = build_pipeline(persist=True, improve=ORCHESTRATOR_IMPROVE and improver_agent is not None)
+compat_pipeline = build_pipeline(persist=False, improve=ORCHESTRATOR_IMPROVE and improver_agent is not None)
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     if not rag_agent or not reasoner_agent:
@@ -74,35 +215,25 @@ async def chat_endpoint(request: ChatRequest):
     
     request_id = str(uuid.uuid4())
     logger.info(f"[{request_id}] Procesando: {request.message}")
+    start = time.perf_counter()
     
     try:
         user_message = request.message
         
-        # 1. Obtener respuesta del reasoner MEJORADO
-        reasoner_result = await reasoner_agent.reason(user_message)
+        with PipelineContext(user_message, request_id) as ctx:
+            values = await chat_pipeline.run({"ctx": ctx, "request_id": request_id, "user_message": user_message})
         
-        # 2. Obtener crítica MEJORADA con contexto RAG
-        critic_review = await critic_agent.critique(
-            reasoner_result["final_response"], 
-            user_message,
-            reasoner_result["rag_context"]  # Pasar contexto RAG para análisis de relevancia
-        )
-        
-        # 3. Guardar en memoria (opcional)
-        await memory_store.add_interaction(
-            request_id=request_id,
-            user_message=user_message,
-            response=reasoner_result["final_response"],
-            rag_context=reasoner_result["rag_context"],
-            critic_review=critic_review
-        )
+        reasoner_result = values["reasoner_result"]
+        logger.info(f"[{request_id}] Tiempos por etapa: {values['stage_timings']}")
+        metrics.observe_request("chat", time.perf_counter() - start)
         
         return ChatResponse(
-            final_response=reasoner_result["final_response"],
+            final_response=values.get("improved_response") or reasoner_result["final_response"],
             rag_context=reasoner_result["rag_context"],
-            critic_review=critic_review,
+            critic_review=values["critic_review"],
             request_id=request_id,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            stage_timings=values["stage_timings"]
         )
         
     except Exception as e:
@@ -115,25 +246,19 @@ async def run_pipeline(user_message: str, context=None) -> dict:
     logger.info(f"[{request_id}] Iniciando pipeline para: {user_message}")
     
     try:
-        # 1. RAG MEJORADO
-        rag_context = rag_agent.search(user_message)
-        logger.info(f"[{request_id}] RAG: {rag_context['results_count']} resultados, Relevante: {rag_context.get('is_relevant', 'N/A')}")
+        with PipelineContext(user_message, request_id) as ctx:
+            values = await compat_pipeline.run({"ctx": ctx, "request_id": request_id, "user_message": user_message})
         
-        # 2. Reasoner MEJORADO
-        reasoner_output = await reasoner_agent.reason(user_message)
-        
-        # 3. Critic MEJORADO
-        critic_review = await critic_agent.critique(
-            reasoner_output["final_response"], 
-            user_message,
-            rag_context
-        )
+        rag_context = values["rag_context"]
+        logger.info(f"[{request_id}] RAG: {rag_context['results_count']} resultados, Relevante: {rag_context.get('is_relevant', 'N/A')}")
         
         return {
             "request_id": request_id,
-            "final_response": reasoner_output["final_response"],
+            "final_response": values.get("improved_response") or values["reasoner_result"]["final_response"],
             "rag_context": rag_context,
-            "critic_review": critic_review,
+            "critic_review": values["critic_review"],
+            "embed_calls": ctx.embed_calls,
+            "stage_timings": values["stage_timings"],
             "timestamp": datetime.now().isoformat()
         }
         
@@ -147,6 +272,17 @@ async def run_pipeline(user_message: str, context=None) -> dict:
             "timestamp": datetime.now().isoformat()
         }
 
+async def run_pipeline_batch(messages: List[str], improve: bool = False,
+                             concurrency: int = BATCH_LLM_CONCURRENCY) -> List[dict]:
+    """
+    Versión en lote de run_pipeline: un solo encode + búsqueda FAISS para todos los mensajes,
+    critic en lote y, con improve=True, llamadas al LLM con concurrencia acotada.
+    Devuelve los resultados en el mismo orden que los mensajes.
+    """
+    improver = improver_agent if improve else None
+    await rag_agent.aload()
+    return await run_batch(messages, rag_agent, reasoner_agent, critic_agent, improver, concurrency)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
@@ -0,0 +1,226 @@
+# backend/provider_router.py
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .metrics import metrics
+    from .circuit_breaker import AdaptiveTimeout, CircuitBreaker
+except ImportError:
+    from metrics import metrics
+    from circuit_breaker import AdaptiveTimeout, CircuitBreaker
+
+logger = logging.getLogger("provider_router")
+
+# Petición de cobertura (hedge) al siguiente proveedor si el primario supera su percentil de latencia
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Retardo del hedge mientras no hay muestras suficientes, y mínimo una vez calculado (ms)
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "250"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Suavizado de la latencia media (EWMA) y ventana de latencias para el percentil
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+ProviderCall = Callable[[List[Dict[str, str]], float], Awaitable[str]]
+
+
+class ProviderError(Exception):
+    """Fallo de un proveedor (HTTP, timeout o respuesta vacía)"""
+
+
+class Provider:
+    """
+    Proveedor de LLM con estadísticas de latencia.
+    fallback=True: respuesta degradada (p. ej. Hugging Face gratuito); nunca se elige como
+    primario ni entra en el hedge: solo se usa si fallan (o tienen el circuito abierto) todos los
+    demás, y sus respuestas no se cachean.
+    Con breaker, un circuito abierto lo saca del reparto; con timeout_s, cada llamada se
+    limita con un timeout adaptativo (como máximo timeout_s).
+    """
+
+    def __init__(self, name: str, call: ProviderCall, fallback: bool = False,
+                 breaker: Optional[CircuitBreaker] = None, timeout_s: Optional[float] = None,
+                 alpha: float = LLM_EWMA_ALPHA, window: int = LLM_LATENCY_WINDOW):
+        self.name = name
+        self.call = call
+        self.fallback = fallback
+        self.breaker = breaker
+        self.timeout = AdaptiveTimeout(timeout_s, window) if timeout_s else None
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.latencies: deque = deque(maxlen=window)
+        self.stats = {"calls": 0, "wins": 0, "errors": 0, "cancelled": 0}
+
+    def _update(self, seconds: float):
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def observe(self, seconds: float):
+        self.latencies.append(seconds)
+        self._update(seconds)
+
+    def observe_censored(self, seconds: float):
+        """Llamada cancelada o fallida: solo se sabe que tardó al menos esto; solo sube la media"""
+        if self.ewma is None or seconds > self.ewma:
+            self._update(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            **self.stats,
+            "fallback": self.fallback,
+            "circuit": self.breaker.state if self.breaker else None,
+            "timeout_s": round(self.timeout.current(), 2) if self.timeout else None,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ProviderRouter:
+    """
+    Elige como primario el proveedor no degradado con menor latencia EWMA (los que aún no
+    tienen muestras van primero, para medirlos). Si el primario no responde antes de su
+    percentil LLM_HEDGE_PERCENTILE, lanza el siguiente en paralelo y se queda con la primera
+    respuesta correcta; la otra llamada se cancela. El hedge es solo entre proveedores no
+    degradados: un fallback responde al instante con texto de respaldo y ganaría siempre.
+    Si un proveedor falla se pasa al siguiente, y a los de fallback cuando no queda ninguno.
+    """
+
+    def __init__(self, providers: List[Provider], hedge_enabled: bool = LLM_HEDGE_ENABLED,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE):
+        self.providers = providers
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self._stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+
+    def order(self) -> List[Provider]:
+        # Los de circuito abierto no se intentan (ni como hedge)
+        primaries = [p for p in self.providers if not p.fallback and (p.breaker is None or p.breaker.available())]
+        primaries.sort(key=lambda p: p.ewma if p.ewma is not None else 0.0)
+        return primaries + [p for p in self.providers if p.fallback]
+
+    def hedge_delay(self, provider: Provider) -> float:
+        threshold = provider.percentile(self.hedge_percentile)
+        if threshold is None:
+            return LLM_HEDGE_DELAY_MS / 1000
+        return max(LLM_HEDGE_MIN_DELAY_MS / 1000, threshold)
+
+    async def _timed(self, provider: Provider, messages: List[Dict[str, str]], temperature: float) -> str:
+        provider.stats["calls"] += 1
+        timeout = provider.timeout.current() if provider.timeout else None
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(provider.call(messages, temperature), timeout)
+        except asyncio.CancelledError:
+            # Perdió la carrera: no dice nada de la salud del proveedor
+            provider.stats["cancelled"] += 1
+            provider.observe_censored(time.perf_counter() - start)
+            if provider.breaker:
+                provider.breaker.release()
+            metrics.llm_provider(provider.name, "cancelled")
+            raise
+        except Exception:
+            provider.stats["errors"] += 1
+            provider.observe_censored(time.perf_counter() - start)
+            if provider.breaker:
+                provider.breaker.record_failure()
+            metrics.llm_provider(provider.name, "error")
+            raise
+        elapsed = time.perf_counter() - start
+        provider.observe(elapsed)
+        if provider.timeout:
+            provider.timeout.observe(elapsed)
+        if provider.breaker:
+            provider.breaker.record_success(elapsed)
+        return result
+
+    async def call(self, messages: List[Dict[str, str]], temperature: float) -> Tuple[str, Provider, str]:
+        """
+        (contenido, proveedor ganador, cómo se obtuvo): "primary", "hedge", "failover" o
+        "circuit_open" (solo quedaban proveedores de fallback)
+        """
+        order = self.order()
+        if not order:
+            raise ProviderError("Sin proveedores configurados")
+        # Solo se puede lanzar un hedge hacia los primeros `hedgeable` (los no degradados)
+        hedgeable = sum(1 for p in order if not p.fallback)
+        self._stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        pending: Dict[asyncio.Future, Provider] = {}
+        launched = 0
+        failures = 0
+        hedged = not self.hedge_enabled
+        last_error: Optional[BaseException] = None
+
+        def launch(limit: int = len(order)) -> Optional[Provider]:
+            """Lanza el siguiente proveedor (entre los `limit` primeros) cuyo circuito admita la llamada"""
+            nonlocal launched
+            while launched < limit:
+                provider = order[launched]
+                launched += 1
+                if provider.breaker is None or provider.breaker.try_acquire():
+                    pending[asyncio.ensure_future(self._timed(provider, messages, temperature))] = provider
+                    return provider
+            return None
+
+        primary = launch()
+        if primary is None:
+            raise ProviderError("Todos los circuitos están abiertos")
+        hedge_at = loop.time() + self.hedge_delay(primary)
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - loop.time()) if not hedged and launched < hedgeable else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # El primario supera su percentil: hedge al siguiente proveedor no degradado
+                    hedged = True
+                    if launch(hedgeable) is not None:
+                        self._stats["hedges"] += 1
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        provider.stats["wins"] += 1
+                        metrics.llm_provider(provider.name, "win")
+                        if failures:
+                            outcome = "failover"
+                        elif provider is not primary:
+                            outcome = "hedge"
+                            self._stats["hedge_wins"] += 1
+                        else:
+                            outcome = "circuit_open" if provider.fallback else "primary"
+                        return task.result(), provider, outcome
+                    failures += 1
+                    last_error = task.exception()
+                    logger.warning(f"Proveedor {provider.name} falló: {last_error}")
+                if not pending and launched < len(order):
+                    next_provider = launch()
+                    if next_provider is not None:
+                        self._stats["failovers"] += 1
+                        hedge_at = loop.time() + self.hedge_delay(next_provider)
+            raise ProviderError(f"Todos los proveedores fallaron: {last_error}")
+        finally:
+            # El perdedor se cancela (cierra su conexión HTTP)
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        order = self.order()
+        return {
+            **self._stats,
+            "primary": order[0].name if order else None,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_delay_ms": round(self.hedge_delay(order[0]) * 1000, 1) if order and self.hedge_enabled else None,
+            "providers": {p.name: p.snapshot() for p in self.providers},
+        }
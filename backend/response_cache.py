@@ -0,0 +1,96 @@
+# backend/response_cache.py
+import os
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Límite de entradas y de bytes (JSON serializado); 0 entradas desactiva la caché
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalización Unicode (NFC) únicamente: el reasoner y el critic distinguen
+    mayúsculas, espacios y signos, y las respuestas citan el mensaje literal.
+    """
+    return unicodedata.normalize("NFC", message)
+
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas completas del pipeline (ChatResponse serializado).
+    La clave incluye la versión del índice RAG: si el índice cambia, la caché se vacía.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # clave -> (JSON, tamaño en bytes)
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, message: str, version: str) -> Optional[Dict[str, Any]]:
+        key = normalize_message(message)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            payload = entry[0]
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return json.loads(payload)
+
+    def put(self, message: str, version: str, response: Dict[str, Any]):
+        key = normalize_message(message)
+        payload = json.dumps(response, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (payload, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "version": self._version
+            }
+
+
+# Instancia global (None si está desactivada)
+response_cache = ResponseCache() if RESPONSE_CACHE_MAX_ENTRIES > 0 else None
@@ -0,0 +1,202 @@
+# backend/semantic_cache.py
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+logger = logging.getLogger("semantic_cache")
+
+# Entradas máximas (0 = desactivada), similitud coseno mínima para reutilizar y TTL en segundos
+LLM_SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("LLM_SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+LLM_SEMANTIC_CACHE_TTL = float(os.getenv("LLM_SEMANTIC_CACHE_TTL", "3600"))
+
+Encoder = Callable[[str], np.ndarray]
+
+
+def rag_encoder() -> Encoder:
+    """Encoder por defecto: el mismo all-MiniLM-L6-v2 del RAG agent (sin cargar un segundo modelo)"""
+    try:
+        from .agents.rag_agent import rag_agent
+    except ImportError:
+        from rag_agent import rag_agent
+    model = rag_agent.load().model
+    return lambda text: model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+
+def partition_key(messages: List[Dict[str, str]], temperature: float, cache_text: Optional[str] = None) -> str:
+    """
+    Temperatura + hash exacto de lo que no se compara por similitud: todos los mensajes salvo el
+    último o, con cache_text, también el último sin ese texto (contexto RAG, borrador, problemas...).
+    """
+    exact = [f"{m.get('role')}:{m.get('content')}" for m in messages[:-1]]
+    if cache_text is not None and messages:
+        last = messages[-1]
+        rest = (last.get("content") or "").replace(cache_text, "\x1f")
+        exact.append(f"{last.get('role')}:{rest}")
+    head = "\x1e".join(exact)
+    return f"{temperature:.2f}|{hashlib.sha1(head.encode('utf-8')).hexdigest()}"
+
+
+class _Partition:
+    """Embeddings normalizados de una partición; la matriz se reconstruye solo tras altas/bajas"""
+
+    def __init__(self):
+        self.entry_ids: List[int] = []
+        self.vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        return self._matrix
+
+    def add(self, entry_id: int, vector: np.ndarray):
+        self.entry_ids.append(entry_id)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, entry_id: int):
+        i = self.entry_ids.index(entry_id)
+        del self.entry_ids[i]
+        del self.vectors[i]
+        self._matrix = None
+
+
+class SemanticCache:
+    """
+    Caché de respuestas del LLM indexada por similitud de embeddings del prompt.
+    Devuelve la respuesta guardada si el texto comparado (cache_text, o si no el último mensaje)
+    tiene similitud coseno >= threshold con uno almacenado en la misma partición (temperatura +
+    hash exacto del resto del prompt).
+    Acotada en entradas (se expulsa la menos usada) y con TTL.
+    """
+
+    def __init__(self, encoder: Optional[Encoder] = None, max_entries: int = LLM_SEMANTIC_CACHE_MAX_ENTRIES,
+                 threshold: float = LLM_SEMANTIC_CACHE_THRESHOLD, ttl: float = LLM_SEMANTIC_CACHE_TTL):
+        self._encoder = encoder
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        # id -> (partición, respuesta, expiración, latencia de la llamada original)
+        self._entries: "OrderedDict[int, Tuple[str, str, float, float]]" = OrderedDict()
+        self._partitions: Dict[str, _Partition] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0,
+                       "encode_errors": 0, "latency_saved_s": 0.0}
+
+    def _encode(self, text: str) -> np.ndarray:
+        if self._encoder is None:
+            self._encoder = rag_encoder()
+        vector = np.asarray(self._encoder(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _lookup(self, partition: str, text: str) -> Tuple[Optional[str], float, np.ndarray]:
+        """Encode + búsqueda (en un hilo: el encode usa CPU). Devuelve (respuesta, latencia ahorrada, embedding)"""
+        vector = self._encode(text)
+        with self._lock:
+            part = self._partitions.get(partition)
+            if part is None:
+                self._stats["misses"] += 1
+                return None, 0.0, vector
+            similarities = part.matrix() @ vector
+            best = int(np.argmax(similarities))
+            entry_id = part.entry_ids[best]
+            _, response, expires_at, latency = self._entries[entry_id]
+            if expires_at and expires_at < time.monotonic():
+                self._remove(entry_id)
+                self._stats["expirations"] += 1
+            elif similarities[best] >= self.threshold:
+                self._entries.move_to_end(entry_id)
+                self._stats["hits"] += 1
+                self._stats["latency_saved_s"] += latency
+                return response, latency, vector
+            self._stats["misses"] += 1
+        return None, 0.0, vector
+
+    def _store(self, partition: str, vector: np.ndarray, response: str, latency: float):
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (partition, response, expires_at, latency)
+            self._partitions.setdefault(partition, _Partition()).add(entry_id, vector)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _remove(self, entry_id: int):
+        partition = self._entries.pop(entry_id)[0]
+        part = self._partitions[partition]
+        part.remove(entry_id)
+        if not part.entry_ids:
+            del self._partitions[partition]
+
+    async def get_or_call(self, messages: List[Dict[str, str]], temperature: float,
+                          call: Callable[[], Awaitable[Tuple[str, bool]]], cache_text: Optional[str] = None) -> str:
+        """
+        Respuesta cacheada o resultado de call(), que devuelve (contenido, cacheable).
+        Las respuestas de fallback (cacheable=False) no se guardan.
+        cache_text: texto a comparar por similitud (p. ej. solo la pregunta del usuario) cuando el
+        último mensaje lleva además contexto RAG u otros datos; el resto del mensaje pasa a la
+        partición exacta. El modelo trunca a 256 tokens y un contexto compartido dominaría el vector.
+        """
+        partition = partition_key(messages, temperature, cache_text)
+        if cache_text is not None:
+            text = cache_text
+        else:
+            text = messages[-1].get("content", "") if messages else ""
+        try:
+            cached, saved, vector = await asyncio.to_thread(self._lookup, partition, text)
+        except Exception as e:
+            # Sin encoder (modelo no disponible) la caché se salta
+            with self._lock:
+                self._stats["encode_errors"] += 1
+            logger.warning(f"Caché semántica no disponible: {e}")
+            return (await call())[0]
+
+        metrics.cache("llm_semantic", cached is not None)
+        if cached is not None:
+            metrics.llm_cache_saved(saved)
+            return cached
+
+        start = time.perf_counter()
+        content, cacheable = await call()
+        if cacheable and content:
+            self._store(partition, vector, content, time.perf_counter() - start)
+        return content
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._partitions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "latency_saved_s": round(self._stats["latency_saved_s"], 3),
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0,
+                "entries": len(self._entries),
+                "partitions": len(self._partitions),
+                "threshold": self.threshold,
+            }
+
+
+# Instancia global (None si está desactivada)
+semantic_cache = SemanticCache() if LLM_SEMANTIC_CACHE_MAX_ENTRIES > 0 else None
@@ -0,0 +1,72 @@
+# backend/single_flight.py
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+try:
+    from .metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+# Deduplicación de llamadas idénticas en vuelo (RAG y LLM); 0 = cada petición hace su llamada
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "1") == "1"
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Las llamadas concurrentes con la misma clave comparten una única tarea en curso y
+    reciben su resultado (o su excepción). El resultado es el mismo objeto para todos:
+    no debe modificarse.
+    La tarea se ejecuta aparte: cancelar a quien la inició no cancela a los demás; solo se
+    cancela cuando ya no queda nadie esperándola.
+    """
+
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await fn()
+
+        self._stats["calls"] += 1
+        flight = self._inflight.get(key)
+        if flight is None:
+            # La tarea hereda el contexto (PipelineContext) de la primera petición
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._release(key, flight))
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            metrics.coalesced(self.name)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _release(self, key: Hashable, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Evita "exception was never retrieved" si todos los que esperaban se cancelaron
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._inflight), "enabled": self.enabled}
@@ -0,0 +1,9 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# Mismos módulos importables que en main.py y los benchmarks (imports absolutos)
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, 'agents'))
+sys.path.append(os.path.dirname(__file__))
@@ -0,0 +1,32 @@
+"""RAGAgent sin modelo de embeddings para los tests de índice e ingesta"""
+import zlib
+
+import numpy as np
+
+import index_factory
+import index_snapshot
+from rag_agent import RAGAgent
+from rw_lock import ReadWriteLock
+
+DIM = 16
+
+
+class FakeRAGAgent(RAGAgent):
+    """RAGAgent sin modelo: embeddings deterministas por contenido sobre un índice Flat inicial"""
+
+    def __init__(self, index_type: str = "flat", base_docs: int = 10):
+        self.index_type = index_type
+        self.read_only = False
+        self.model_fingerprint = "fake-model"
+        self.knowledge_base = []
+        self._index_lock = ReadWriteLock()
+        self.index_generation = 0
+        docs = [{"id": f"base{i}", "content": f"base {i}", "category": "base", "tags": []} for i in range(base_docs)]
+        self.id_map = dict(enumerate(docs))
+        self.doc_registry = {d["id"]: {"hash": index_snapshot.content_hash(d), "ids": [i]} for i, d in self.id_map.items()}
+        self._next_id = base_docs
+        self.index_spec = index_factory.index_spec(index_type, base_docs, DIM)
+        self.index = index_factory.build_index(self.index_spec, self.embed_documents([d["content"] for d in docs]))
+
+    def embed_documents(self, texts):
+        return np.vstack([np.random.default_rng(zlib.crc32(t.encode())).standard_normal(DIM) for t in texts]).astype(np.float32)
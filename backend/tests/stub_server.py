@@ -0,0 +1,120 @@
+"""
+Servidor HTTP/1.1 local compatible con /v1/chat/completions para los tests (sin red).
+
+- Respuestas JSON con keep-alive y latencia inyectada (delay).
+- Con "stream": true responde SSE, un token cada token_delay, y deja de generar en cuanto
+  detecta que el cliente cerró la conexión. Con drop_after corta la conexión tras ese número
+  de tokens (sin [DONE]), como un proveedor que se cae a mitad de respuesta.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+
+class StubRequest:
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.stream = bool(payload.get("stream"))
+        self.sent = 0
+        self.completed = False
+        self.disconnected = False
+        # Se activa cuando el servidor termina con la petición (respondida o cliente desconectado)
+        self.done = asyncio.Event()
+
+
+class StubServer:
+    def __init__(self, content: str = "respuesta stub", delay: float = 0.0,
+                 tokens: int = 5, token_delay: float = 0.0, drop_after: Optional[int] = None):
+        self.content = content
+        self.delay = delay
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.drop_after = drop_after
+        self.requests: List[StubRequest] = []
+        # Conexiones TCP aceptadas en total y abiertas ahora
+        self.connections = 0
+        self.open_connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def __aenter__(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def wait_disconnected(self, timeout: float = 2.0):
+        """Espera a que el cliente cierre todas sus conexiones (p. ej. tras cerrar el pool)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.open_connections and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                length = 0
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    name, _, value = line.partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                payload = json.loads(await reader.readexactly(length)) if length else {}
+                request = StubRequest(payload)
+                self.requests.append(request)
+                try:
+                    if request.stream:
+                        await self._stream(reader, writer, request)
+                        return
+                    await self._respond(writer, request)
+                except ConnectionError:
+                    request.disconnected = True
+                    return
+                finally:
+                    request.done.set()
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, request: StubRequest):
+        await asyncio.sleep(self.delay)
+        body = json.dumps({"choices": [{"message": {"content": self.content}}]}).encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        await writer.drain()
+        request.completed = True
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: StubRequest):
+        # EOF del cliente = conexión cerrada (aclose o cancelación en el otro lado)
+        eof = asyncio.ensure_future(reader.read())
+        try:
+            await asyncio.sleep(self.delay)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            for i in range(self.tokens):
+                if eof.done():
+                    request.disconnected = True
+                    return
+                if i == self.drop_after:
+                    writer.transport.abort()
+                    return
+                chunk = {"choices": [{"delta": {"content": f"tok{i} "}}]}
+                writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await writer.drain()
+                request.sent += 1
+                await asyncio.sleep(self.token_delay)
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+            request.completed = True
+        finally:
+            eof.cancel()
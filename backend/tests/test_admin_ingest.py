@@ -0,0 +1,81 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+TOKEN = "secreto"
+
+
+class FakeRAG:
+    read_only = False
+
+    def __init__(self):
+        self.saved_locked = []
+
+    async def aload(self):
+        return self
+
+    def save_state(self):
+        self.saved_locked.append(main._ingest_lock.locked())
+
+    def index_stats(self):
+        return {"spec": "Flat"}
+
+
+class FakeIngestor:
+    runs = []
+
+    def __init__(self, rag_agent):
+        pass
+
+    def ingest_path(self, source, prune):
+        FakeIngestor.runs.append((source.name, main._ingest_lock.locked()))
+        return {"added": 1}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    (tmp_path / "docs").mkdir()
+    monkeypatch.setattr(main, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(main, "RAG_INGEST_ROOT", tmp_path)
+    monkeypatch.setattr(main, "rag_agent", FakeRAG())
+    monkeypatch.setattr(main, "KnowledgeIngestor", FakeIngestor)
+    FakeIngestor.runs = []
+    return TestClient(main.app)
+
+
+def _ingest(client, path="docs", token=TOKEN):
+    return client.post("/admin/ingest", json={"path": path}, headers={"X-Admin-Token": token})
+
+
+def test_ingest_and_save_hold_the_lock(client):
+    response = _ingest(client)
+    assert response.status_code == 200
+    assert FakeIngestor.runs == [("docs", True)]
+    assert main.rag_agent.saved_locked == [True]
+    assert not main._ingest_lock.locked()
+
+
+def test_concurrent_ingest_is_rejected(client):
+    main._ingest_lock.acquire()
+    try:
+        assert _ingest(client).status_code == 409
+    finally:
+        main._ingest_lock.release()
+    assert FakeIngestor.runs == []
+
+
+def test_lock_released_after_failure(client, monkeypatch):
+    def fail(self, source, prune):
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setattr(FakeIngestor, "ingest_path", fail)
+    with pytest.raises(RuntimeError):
+        _ingest(client)
+    assert not main._ingest_lock.locked()
+
+
+def test_requires_token_and_root(client):
+    assert _ingest(client, token="otro").status_code == 401
+    assert _ingest(client, path="../fuera").status_code == 403
+    assert _ingest(client, path="no_existe").status_code == 404
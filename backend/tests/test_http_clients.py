@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+
+import http_clients
+from http_clients import ClientPool
+from stub_server import StubServer
+
+
+def test_reuses_connection_across_requests():
+    async def scenario():
+        pool = ClientPool()
+        async with StubServer() as server:
+            client = pool.get("openai")
+            for _ in range(5):
+                r = await client.post(server.url, json={"messages": []})
+                assert r.json()["choices"][0]["message"]["content"] == "respuesta stub"
+            await pool.aclose()
+        return server, pool.stats()["providers"]["openai"]
+
+    server, stats = asyncio.run(scenario())
+    assert server.connections == 1
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    assert stats["reuse_ratio"] == 0.8
+
+
+def test_client_is_shared_per_provider():
+    async def scenario():
+        pool = ClientPool()
+        same = pool.get("openai") is pool.get("openai")
+        different = pool.get("openai") is not pool.get("huggingface")
+        await pool.aclose()
+        return same, different
+
+    assert asyncio.run(scenario()) == (True, True)
+
+
+def test_per_provider_timeouts(monkeypatch):
+    monkeypatch.setitem(http_clients.PROVIDER_TIMEOUTS, "fast", 0.1)
+    monkeypatch.setitem(http_clients.PROVIDER_TIMEOUTS, "slow", 2.0)
+
+    async def scenario():
+        pool = ClientPool()
+        async with StubServer(delay=0.3) as server:
+            with pytest.raises(httpx.TimeoutException):
+                await pool.get("fast").post(server.url, json={})
+            r = await pool.get("slow").post(server.url, json={})
+            await pool.aclose()
+        return r.status_code, pool.stats()["providers"]
+
+    status, providers = asyncio.run(scenario())
+    assert status == 200
+    assert providers["fast"]["timeout"] == 0.1
+    assert providers["slow"]["timeout"] == 2.0
+
+
+def test_aclose_closes_pooled_connections():
+    async def scenario():
+        pool = ClientPool()
+        async with StubServer() as server:
+            client = pool.get("openai")
+            await client.post(server.url, json={})
+            # Keep-alive: la conexión sigue abierta tras la respuesta
+            open_before = server.open_connections
+            await pool.aclose()
+            await server.wait_disconnected()
+            # Tras cerrar, get() crea un cliente nuevo (scripts fuera del ciclo de vida de la app)
+            reopened = pool.get("openai")
+            await reopened.post(server.url, json={})
+            await pool.aclose()
+        return open_before, server, client, reopened
+
+    open_before, server, client, reopened = asyncio.run(scenario())
+    assert open_before == 1
+    assert client.is_closed
+    assert reopened is not client and reopened.is_closed
+    assert server.connections == 2
+    assert server.open_connections == 0
+
+
+def test_startup_creates_configured_providers():
+    async def scenario():
+        pool = ClientPool()
+        await pool.startup()
+        clients = {p: pool.get(p) for p in http_clients.PROVIDER_TIMEOUTS}
+        await pool.aclose()
+        return clients
+
+    clients = asyncio.run(scenario())
+    assert set(clients) == set(http_clients.PROVIDER_TIMEOUTS)
+    assert all(c.is_closed for c in clients.values())
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import index_snapshot
+from fake_rag import FakeRAGAgent
+from ingest import KnowledgeIngestor, iter_documents
+
+
+@pytest.fixture(autouse=True)
+def no_snapshots(monkeypatch):
+    monkeypatch.setattr(index_snapshot, "RAG_SNAPSHOT_ENABLED", False)
+
+
+def _doc(doc_id, content):
+    return {"id": doc_id, "content": content, "category": "test", "tags": []}
+
+
+def _contents(agent, doc_id):
+    return [agent.id_map[i]["content"] for i in agent.doc_registry[doc_id]["ids"]]
+
+
+def test_repeated_id_keeps_last_version():
+    agent = FakeRAGAgent()
+    stats = KnowledgeIngestor(agent).ingest([_doc("a", "versión uno"), _doc("b", "otro"), _doc("a", "versión dos")])
+    assert _contents(agent, "a") == ["versión dos"]
+    # Ningún chunk de la primera versión sigue en el índice
+    assert [d["content"] for d in agent.id_map.values() if d.get("doc_id") == "a"] == ["versión dos"]
+    assert agent.index.ntotal == len(agent.id_map)
+    assert stats["added"] == 2 and stats["updated"] == 1
+    assert agent.doc_registry["a"]["hash"] == index_snapshot.content_hash(_doc("a", "versión dos"))
+
+
+def test_repeated_identical_doc_is_skipped():
+    agent = FakeRAGAgent()
+    stats = KnowledgeIngestor(agent).ingest([_doc("a", "igual"), _doc("a", "igual")])
+    assert stats["added"] == 1 and stats["skipped"] == 1
+    assert _contents(agent, "a") == ["igual"]
+
+
+def test_delete_after_add_in_same_run():
+    agent = FakeRAGAgent()
+    stats = KnowledgeIngestor(agent).ingest([_doc("a", "efímero"), {"id": "a", "deleted": True}])
+    assert stats["deleted"] == 1
+    assert "a" not in agent.doc_registry
+    assert all(d.get("doc_id") != "a" for d in agent.id_map.values())
+    assert agent.index.ntotal == len(agent.id_map)
+
+
+def test_markdown_and_jsonl_with_same_id(tmp_path):
+    (tmp_path / "guia.md").write_text("desde markdown", encoding="utf-8")
+    (tmp_path / "extra.jsonl").write_text(json.dumps(_doc("guia.md", "desde jsonl")) + "\n", encoding="utf-8")
+    agent = FakeRAGAgent()
+    KnowledgeIngestor(agent).ingest(iter_documents(tmp_path))
+    # rglob ordenado: extra.jsonl antes que guia.md
+    assert _contents(agent, "guia.md") == ["desde markdown"]
+    # Una segunda pasada con el duplicado aún en la fuente tampoco deja las dos versiones
+    KnowledgeIngestor(agent).ingest(iter_documents(tmp_path))
+    assert _contents(agent, "guia.md") == ["desde markdown"]
+    assert agent.index.ntotal == len(agent.id_map)
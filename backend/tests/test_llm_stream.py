@@ -0,0 +1,172 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import improver
+import llm
+import main
+from circuit_breaker import CircuitBreaker
+from http_clients import ClientPool
+from improver import ImproverAgent
+from stub_server import StubServer
+
+MESSAGES = [{"role": "user", "content": "Explica Docker"}]
+TOKENS = 50
+CRITIC_REPORT = {"score": 0.4, "issues": ["Respuesta corta"]}
+
+
+@pytest.fixture(autouse=True)
+def openai_stub(monkeypatch):
+    # Pool y cortocircuito propios: los globales quedan ligados a otro event loop / a otros tests
+    monkeypatch.setattr(llm, "OPENAI_KEY", "test-key")
+    monkeypatch.setattr(llm, "http_pool", ClientPool())
+    monkeypatch.setattr(llm, "get_breaker", CircuitBreaker)
+    monkeypatch.setattr(llm, "stream_stats", dict.fromkeys(llm.stream_stats, 0))
+
+
+def _run(monkeypatch, scenario, **server_options):
+    async def main():
+        async with StubServer(**{"tokens": TOKENS, "token_delay": 0.01, **server_options}) as server:
+            monkeypatch.setattr(llm, "OPENAI_CHAT_URL", server.url)
+            try:
+                result = await scenario()
+                # Antes de cerrar el pool: la desconexión tiene que venir del propio stream
+                for request in server.requests:
+                    await asyncio.wait_for(request.done.wait(), 2.0)
+            finally:
+                await llm.http_pool.aclose()
+        return result, server.requests
+    return asyncio.run(main())
+
+
+def test_stream_full(monkeypatch):
+    async def scenario():
+        return [delta async for delta in llm.stream_openai_chat(MESSAGES)]
+
+    deltas, requests = _run(monkeypatch, scenario)
+    assert deltas == [f"tok{i} " for i in range(TOKENS)]
+    assert requests[0].stream and requests[0].completed
+    assert llm.stream_stats["completed"] == 1
+    assert llm.stream_stats["deltas"] == TOKENS
+
+
+def test_aclose_disconnects_provider(monkeypatch):
+    async def scenario():
+        stream = llm.stream_openai_chat(MESSAGES)
+        deltas = [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+        return deltas
+
+    deltas, requests = _run(monkeypatch, scenario)
+    assert len(deltas) == 3
+    assert requests[0].disconnected and not requests[0].completed
+    assert requests[0].sent < 10
+    assert llm.stream_stats["cancelled"] == 1
+
+
+def test_cancel_disconnects_provider(monkeypatch):
+    async def scenario():
+        received = []
+        three = asyncio.Event()
+
+        async def consume():
+            async for delta in llm.stream_openai_chat(MESSAGES):
+                received.append(delta)
+                if len(received) == 3:
+                    three.set()
+
+        task = asyncio.ensure_future(consume())
+        await three.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return received
+
+    received, requests = _run(monkeypatch, scenario)
+    assert len(received) < TOKENS
+    assert requests[0].disconnected and not requests[0].completed
+    assert requests[0].sent < 10
+    assert llm.stream_stats["cancelled"] == 1
+
+
+def test_improve_on_delta_returns_joined_text(monkeypatch):
+    async def scenario():
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        final = await ImproverAgent().improve("borrador", CRITIC_REPORT, "Explica Docker", on_delta=on_delta)
+        return final, deltas
+
+    (final, deltas), requests = _run(monkeypatch, scenario)
+    assert len(deltas) == TOKENS
+    assert final == "".join(deltas)
+    assert requests[0].stream and requests[0].completed
+
+
+def test_dropped_connection_raises(monkeypatch):
+    async def scenario():
+        deltas = []
+        with pytest.raises(llm.StreamInterruptedError):
+            async for delta in llm.stream_openai_chat(MESSAGES):
+                deltas.append(delta)
+        return deltas
+
+    deltas, requests = _run(monkeypatch, scenario, drop_after=3)
+    assert len(deltas) == 3
+    assert not requests[0].completed
+    assert llm.stream_stats["error"] == 1
+    assert llm.stream_stats["completed"] == 0
+
+
+def test_improve_on_delta_falls_back_when_stream_drops(monkeypatch):
+    async def scenario():
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        final = await ImproverAgent().improve("borrador", CRITIC_REPORT, "Explica Docker", on_delta=on_delta)
+        return final, deltas
+
+    (final, deltas), _ = _run(monkeypatch, scenario, drop_after=3)
+    assert len(deltas) == 3
+    # El texto parcial no se da como respuesta final
+    assert final == "borrador"
+
+
+class FakeRAG:
+    async def aload(self):
+        return self
+
+    async def asearch(self, query):
+        return {"results": [], "results_count": 0, "is_relevant": False, "relevance_level": "none"}
+
+
+class FakeReasoner:
+    async def reason(self, user_message, rag_context):
+        return {"final_response": "borrador", "should_respond": True}
+
+
+class FakeCritic:
+    async def critique(self, response, user_message, rag_context):
+        return CRITIC_REPORT
+
+
+async def dropping_stream(messages, temperature=0.2):
+    yield "parcial "
+    raise llm.StreamInterruptedError("Stream del LLM interrumpido")
+
+
+def test_chat_stream_reports_interrupted_stream(monkeypatch):
+    monkeypatch.setattr(main, "rag_agent", FakeRAG())
+    monkeypatch.setattr(main, "reasoner_agent", FakeReasoner())
+    monkeypatch.setattr(main, "critic_agent", FakeCritic())
+    monkeypatch.setattr(main, "improver_agent", ImproverAgent())
+    monkeypatch.setattr(improver, "stream_openai_chat", dropping_stream)
+    response = TestClient(main.app).post("/chat/stream?format=ndjson&improve=true", json={"message": "Explica Docker"})
+    events = [json.loads(line)["event"] for line in response.text.splitlines()]
+    assert events == ["rag", "reasoner", "token", "error"]
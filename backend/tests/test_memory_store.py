@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from memory.store import MemoryStore
+from memory.sqlite_store import SQLiteMemoryStore
+
+
+async def _collect(iterator):
+    return [r async for r in iterator]
+
+
+def test_get_state_streams_log(tmp_path):
+    legacy = tmp_path / "store.json"
+    legacy.write_text(json.dumps({
+        "learned": [{"timestamp": "2024-01-01T00:00:00Z", "item": {"tip": "a"}}],
+        "interactions": [{"timestamp": "2024-01-02T00:00:00Z", "request_id": "old", "user_message": "hola"}],
+    }))
+
+    async def scenario():
+        store = MemoryStore(path=legacy, log_dir=tmp_path / "log")
+        await store.add_interaction("r1", "qué es docker", "resp", {"score": 0.8}, "mejorada")
+        state = await store.get_state()
+        # Iteradores, no listas: el historial no se carga entero en memoria
+        assert not isinstance(state["interactions"], list)
+        interactions = await _collect(state["interactions"])
+        learned = await _collect(state["learned"])
+        await store.close()
+        return interactions, learned
+
+    interactions, learned = asyncio.run(scenario())
+    assert [r["request_id"] for r in interactions] == ["old", "r1"]
+    assert interactions[1]["improver"] == "mejorada"
+    assert learned == [{"timestamp": "2024-01-01T00:00:00Z", "item": {"tip": "a"}}]
+
+
+def test_sqlite_get_state_streams_pages(tmp_path):
+    async def scenario():
+        store = SQLiteMemoryStore(path=tmp_path / "memory.db")
+        for n in range(3):
+            await store.add_interaction(f"r{n}", "pregunta", "resp", {"score": 0.5}, "")
+        state = await store.get_state()
+        assert not isinstance(state["interactions"], list)
+        interactions = await _collect(state["interactions"])
+        learned = await _collect(state["learned"])
+        await store.close()
+        return interactions, learned
+
+    interactions, learned = asyncio.run(scenario())
+    assert [r["request_id"] for r in interactions] == ["r0", "r1", "r2"]
+    assert learned == []
+
+
+def _interaction(n, score):
+    return {"type": "interaction", "timestamp": f"2024-01-{n + 1:02d}T00:00:00Z", "request_id": f"r{n % 3}",
+            "user_message": f"pregunta {n}", "critic": {"score": score}}
+
+
+def test_sqlite_interaction_filters(tmp_path):
+    async def scenario():
+        store = SQLiteMemoryStore(path=tmp_path / "memory.db")
+        await store.append_records([_interaction(n, n / 10) for n in range(9)])
+        results = {
+            "request_id": await store.get_interactions(request_id="r1"),
+            "range": await store.get_interactions(since="2024-01-03T00:00:00Z", until="2024-01-06T00:00:00Z"),
+            "score": await store.get_interactions(min_score=0.3, max_score=0.5),
+            "combined": await store.get_interactions(request_id="r0", min_score=0.3),
+        }
+        await store.close()
+        return results
+
+    results = asyncio.run(scenario())
+    messages = {name: [r["user_message"] for r in page["items"]] for name, page in results.items()}
+    # Por defecto, lo más reciente primero
+    assert messages["request_id"] == ["pregunta 7", "pregunta 4", "pregunta 1"]
+    assert messages["range"] == ["pregunta 4", "pregunta 3", "pregunta 2"]  # until es exclusivo
+    assert messages["score"] == ["pregunta 5", "pregunta 4", "pregunta 3"]
+    assert messages["combined"] == ["pregunta 6", "pregunta 3"]
+    assert all(page["next_cursor"] is None for page in results.values())
+
+
+def test_sqlite_event_filters(tmp_path):
+    async def scenario():
+        store = SQLiteMemoryStore(path=tmp_path / "memory.db")
+        await store.add_event({"agent": "rag", "request_id": "a", "score": 0.9})
+        await store.add_event({"agent": "critic", "request_id": "a", "score": 0.4})
+        await store.add_event({"agent": "rag", "request_id": "b", "score": 0.2})
+        await store.add_event({"agent": "rag", "request_id": "b"})
+        results = (
+            await store.get_events(agent="rag"),
+            await store.get_events(agent="rag", min_score=0.5),
+            await store.get_events(request_id="a", max_score=0.5),
+        )
+        await store.close()
+        return results
+
+    by_agent, high, low = asyncio.run(scenario())
+    assert [(e["request_id"], e.get("score")) for e in by_agent["items"]] == [("b", None), ("b", 0.2), ("a", 0.9)]
+    assert [e["score"] for e in high["items"]] == [0.9]
+    assert [e["agent"] for e in low["items"]] == ["critic"]
+
+
+def _collect_pages(store, **kwargs):
+    async def run():
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = await store.get_interactions(cursor=cursor, **kwargs)
+            ids.extend(item["id"] for item in page["items"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids, pages
+    return run()
+
+
+def test_sqlite_cursor_paging_both_directions(tmp_path):
+    async def scenario():
+        store = SQLiteMemoryStore(path=tmp_path / "memory.db")
+        await store.append_records([_interaction(n, 0.5) for n in range(7)])
+        newest = await _collect_pages(store, limit=3)
+        oldest = await _collect_pages(store, limit=3, newest_first=False)
+        filtered = await _collect_pages(store, limit=2, request_id="r0", newest_first=False)
+        exact = await _collect_pages(store, limit=7)
+        await store.close()
+        return newest, oldest, filtered, exact
+
+    (newest, newest_pages), (oldest, oldest_pages), (filtered, _), (exact, exact_pages) = asyncio.run(scenario())
+    assert newest == sorted(newest, reverse=True) and len(set(newest)) == 7
+    assert oldest == list(reversed(newest))
+    assert newest_pages == oldest_pages == 3
+    # El cursor respeta los filtros: r0 son las interacciones 0, 3 y 6
+    assert filtered == [oldest[0], oldest[3], oldest[6]]
+    # Una página exacta no deja un cursor hacia una página vacía
+    assert exact_pages == 1 and len(exact) == 7
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import orchestrator_final as orchestrator
+from memory.store import MemoryStore
+
+
+class FakeStore:
+    interaction_record = MemoryStore.interaction_record
+
+
+class FakeQueue:
+    def __init__(self):
+        self.records = []
+        self.store = FakeStore()
+
+    async def submit(self, record):
+        self.records.append(record)
+
+
+class FakeRAG:
+    async def aload(self):
+        return self
+
+
+class FakeContext:
+    async def aretrieve(self, rag_agent):
+        return {"results": [], "results_count": 0, "is_relevant": False, "relevance_level": "none"}
+
+
+class FakeReasoner:
+    async def reason(self, user_message, rag_context):
+        await asyncio.sleep(0.02)
+        return {"final_response": "borrador", "rag_context": rag_context, "should_respond": True}
+
+
+class FakeCritic:
+    async def critique(self, response, user_message, rag_context):
+        return {"score": 0.4, "issues": ["Respuesta corta"]}
+
+
+class SlowImprover:
+    async def improve(self, response, critic_review, user_message, rag_context):
+        await asyncio.sleep(0.05)
+        return "respuesta mejorada"
+
+
+class FailingImprover:
+    async def improve(self, response, critic_review, user_message, rag_context):
+        raise RuntimeError("LLM caído")
+
+
+def _run(monkeypatch, improver):
+    queue = FakeQueue()
+    monkeypatch.setattr(orchestrator, "persistence", queue)
+    monkeypatch.setattr(orchestrator, "rag_agent", FakeRAG())
+    monkeypatch.setattr(orchestrator, "reasoner_agent", FakeReasoner())
+    monkeypatch.setattr(orchestrator, "critic_agent", FakeCritic())
+    monkeypatch.setattr(orchestrator, "improver_agent", improver)
+    pipeline = orchestrator.build_pipeline(persist=True, improve=True)
+    values = asyncio.run(pipeline.run({"ctx": FakeContext(), "request_id": "r1", "user_message": "Explica Docker"}))
+    interactions = [r for r in queue.records if r["type"] == "interaction"]
+    events = [r for r in queue.records if r["type"] == "event"]
+    return values, interactions, events
+
+
+def test_persist_stores_improved_response(monkeypatch):
+    values, records, _ = _run(monkeypatch, SlowImprover())
+    assert values["persisted"] is True
+    assert [r["improver"] for r in records] == ["respuesta mejorada"]
+    timings = values["stage_timings"]
+    assert timings["persist"]["start_ms"] >= timings["improver"]["start_ms"] + timings["improver"]["duration_ms"]
+
+
+def test_persist_runs_when_improver_fails(monkeypatch):
+    values, records, _ = _run(monkeypatch, FailingImprover())
+    assert values["improved_response"] is None
+    assert values["stage_timings"]["improver"]["status"] == "error"
+    assert [(r["reasoner"], r["improver"]) for r in records] == [("borrador", "")]
+
+
+def test_rag_side_stages_run_alongside_reasoner(monkeypatch):
+    values, _, events = _run(monkeypatch, SlowImprover())
+    assert values["rag_persisted"] is True
+    assert [(e["agent"], e["request_id"]) for e in events] == [("rag", "r1")]
+    timings = values["stage_timings"]
+    reasoner_end = timings["reasoner"]["start_ms"] + timings["reasoner"]["duration_ms"]
+    # Dependen solo de rag_context: empiezan con el reasoner y terminan antes que él
+    for stage in ("persist_rag", "relevance_metrics"):
+        assert timings[stage]["status"] == "ok"
+        assert timings[stage]["start_ms"] < reasoner_end
+        assert timings[stage]["start_ms"] + timings[stage]["duration_ms"] < reasoner_end
+
+
+def test_imports_without_agents():
+    # Si falla la importación de los agentes el módulo sigue cargando con rag_agent = None
+    code = ("import sys; sys.modules['reasoner_mejorado'] = None; "
+            "import orchestrator_final as o; assert o.rag_agent is None and o.run_pipeline_batch")
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True,
+                            env={**os.environ, "RAG_PRELOAD": "0"})
+    assert result.returncode == 0, result.stderr
+
+
+def test_import_does_not_open_memory_log(tmp_path):
+    log_dir = tmp_path / "log"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", "import orchestrator_final"], cwd=backend, capture_output=True,
+                            text=True, env={**os.environ, "RAG_PRELOAD": "0", "MEMORY_LOG_DIR": str(log_dir)})
+    assert result.returncode == 0, result.stderr
+    assert not log_dir.exists()
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from pipeline_dag import PipelineDAG, Stage, StageError
+
+
+def _sleep_stage(delay, value, log=None, name=None):
+    async def fn(**inputs):
+        if log is not None:
+            log.append((name, "start", time.perf_counter()))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append((name, "cancelled", time.perf_counter()))
+            raise
+        return value
+    return fn
+
+
+def test_independent_stages_start_together():
+    log = []
+    dag = PipelineDAG([
+        Stage("a", _sleep_stage(0.1, 1, log, "a"), ["x"], ["a"]),
+        Stage("b", _sleep_stage(0.1, 2, log, "b"), ["x"], ["b"]),
+        Stage("join", _sleep_stage(0, 3, log, "join"), ["a", "b"], ["join"]),
+    ], inputs=["x"])
+
+    start = time.perf_counter()
+    values = asyncio.run(dag.run({"x": 0}))
+    elapsed = time.perf_counter() - start
+
+    assert (values["a"], values["b"], values["join"]) == (1, 2, 3)
+    starts = {name: t for name, event, t in log if event == "start"}
+    assert abs(starts["a"] - starts["b"]) < 0.05
+    # En paralelo: ~0.1 s, no 0.2 s
+    assert elapsed < 0.18
+    timings = values["stage_timings"]
+    assert timings["join"]["start_ms"] >= timings["a"]["start_ms"] + timings["a"]["duration_ms"]
+
+
+def test_optional_stage_timeout_uses_defaults():
+    dag = PipelineDAG([
+        Stage("slow", _sleep_stage(1.0, "tarde"), ["x"], ["slow"], timeout=0.05,
+              optional=True, defaults={"slow": "por defecto"}),
+        Stage("after", lambda slow: asyncio.sleep(0, result=f"usa {slow}"), ["slow"], ["after"]),
+    ], inputs=["x"])
+
+    values = asyncio.run(dag.run({"x": 0}))
+    assert values["slow"] == "por defecto"
+    assert values["after"] == "usa por defecto"
+    assert values["stage_timings"]["slow"]["status"] == "timeout"
+    assert values["stage_timings"]["after"]["status"] == "ok"
+
+
+def test_required_failure_cancels_siblings():
+    log = []
+
+    async def fail(x):
+        await asyncio.sleep(0.02)
+        raise RuntimeError("caído")
+
+    dag = PipelineDAG([
+        Stage("fails", fail, ["x"], ["fails"]),
+        Stage("sibling", _sleep_stage(1.0, 1, log, "sibling"), ["x"], ["sibling"]),
+        Stage("downstream", _sleep_stage(0, 2), ["fails", "sibling"], ["downstream"]),
+    ], inputs=["x"])
+
+    async def scenario():
+        with pytest.raises(StageError) as info:
+            await dag.run({"x": 0})
+        return info.value
+
+    start = time.perf_counter()
+    error = asyncio.run(scenario())
+    assert time.perf_counter() - start < 0.5
+    assert error.stage == "fails" and isinstance(error.cause, RuntimeError)
+    assert [event for name, event, _ in log] == ["start", "cancelled"]
+
+
+def test_required_timeout_raises():
+    dag = PipelineDAG([Stage("slow", _sleep_stage(1.0, 1), ["x"], ["slow"], timeout=0.05)], inputs=["x"])
+    with pytest.raises(StageError) as info:
+        asyncio.run(dag.run({"x": 0}))
+    assert isinstance(info.value.cause, asyncio.TimeoutError)
+
+
+def test_rejects_cycles_and_missing_inputs():
+    noop = _sleep_stage(0, None)
+    with pytest.raises(ValueError):
+        PipelineDAG([Stage("a", noop, ["b"], ["a"]), Stage("b", noop, ["a"], ["b"])])
+    with pytest.raises(ValueError):
+        PipelineDAG([Stage("a", noop, ["missing"], ["a"])])
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+import provider_router
+from circuit_breaker import CircuitBreaker
+from provider_router import Provider, ProviderError, ProviderRouter
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+class Stub:
+    """Proveedor local con latencia inyectada; registra inicio, fin y cancelación de cada llamada"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.started = []
+        self.cancelled = 0
+        self.completed = 0
+
+    async def __call__(self, messages, temperature):
+        self.started.append(time.perf_counter())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ProviderError(f"{self.name}: fallo inyectado")
+        self.completed += 1
+        return self.name
+
+
+@pytest.fixture(autouse=True)
+def hedge_delay(monkeypatch):
+    # Sin muestras suficientes el hedge salta a LLM_HEDGE_DELAY_MS
+    monkeypatch.setattr(provider_router, "LLM_HEDGE_DELAY_MS", 50)
+
+
+def _call(router):
+    async def scenario():
+        start = time.perf_counter()
+        content, provider, outcome = await router.call(MESSAGES, 0.2)
+        # Deja que el perdedor procese su cancelación
+        await asyncio.sleep(0)
+        return start, content, provider.name, outcome
+    return asyncio.run(scenario())
+
+
+def _open_breaker(name):
+    breaker = CircuitBreaker(name, min_calls=1, open_seconds=60)
+    breaker.record_failure()
+    assert not breaker.available()
+    return breaker
+
+
+def test_hedge_fires_at_threshold_and_cancels_loser():
+    primary, secondary = Stub("primary", delay=1.0), Stub("secondary", delay=0.01)
+    router = ProviderRouter([Provider("primary", primary), Provider("secondary", secondary)], hedge_enabled=True)
+    start, content, winner, outcome = _call(router)
+    assert (content, winner, outcome) == ("secondary", "secondary", "hedge")
+    assert 0.045 <= secondary.started[0] - start < 0.5
+    assert primary.cancelled == 1 and primary.completed == 0
+    stats = router.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert stats["providers"]["primary"]["cancelled"] == 1
+
+
+def test_no_hedge_before_threshold():
+    primary, secondary = Stub("primary", delay=0.01), Stub("secondary")
+    router = ProviderRouter([Provider("primary", primary), Provider("secondary", secondary)], hedge_enabled=True)
+    _, _, winner, outcome = _call(router)
+    assert (winner, outcome) == ("primary", "primary")
+    assert secondary.started == []
+
+
+def test_failover_to_next_provider():
+    primary, secondary = Stub("primary", fail=True), Stub("secondary", delay=0.01)
+    fallback = Stub("huggingface")
+    router = ProviderRouter([Provider("primary", primary), Provider("secondary", secondary),
+                             Provider("huggingface", fallback, fallback=True)], hedge_enabled=True)
+    _, content, winner, outcome = _call(router)
+    assert (content, winner, outcome) == ("secondary", "secondary", "failover")
+    assert fallback.started == []
+    assert router.stats()["failovers"] == 1
+
+
+def test_fallback_never_hedges():
+    primary, fallback = Stub("primary", delay=0.2), Stub("huggingface")
+    router = ProviderRouter([Provider("primary", primary), Provider("huggingface", fallback, fallback=True)],
+                            hedge_enabled=True)
+    _, content, winner, outcome = _call(router)
+    # El primario supera el umbral del hedge pero el fallback (respuesta enlatada) no entra en la carrera
+    assert (content, winner, outcome) == ("primary", "primary", "primary")
+    assert fallback.started == []
+    assert router.stats()["hedges"] == 0
+
+
+def test_fallback_after_all_primaries_fail():
+    primary, secondary, fallback = Stub("primary", fail=True), Stub("secondary", fail=True), Stub("huggingface")
+    router = ProviderRouter([Provider("primary", primary), Provider("secondary", secondary),
+                             Provider("huggingface", fallback, fallback=True)], hedge_enabled=True)
+    _, content, winner, outcome = _call(router)
+    assert (content, winner, outcome) == ("huggingface", "huggingface", "failover")
+    assert len(primary.started) == len(secondary.started) == 1
+
+
+def test_fallback_when_circuits_open():
+    primary, fallback = Stub("primary"), Stub("huggingface")
+    router = ProviderRouter([Provider("primary", primary, breaker=_open_breaker("test_router_primary")),
+                             Provider("huggingface", fallback, fallback=True)], hedge_enabled=True)
+    _, content, winner, outcome = _call(router)
+    assert (content, winner, outcome) == ("huggingface", "huggingface", "circuit_open")
+    assert primary.started == []
+
+
+def test_all_providers_fail():
+    router = ProviderRouter([Provider("primary", Stub("primary", fail=True)),
+                             Provider("huggingface", Stub("huggingface", fail=True), fallback=True)])
+    with pytest.raises(ProviderError):
+        _call(router)
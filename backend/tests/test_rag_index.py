@@ -0,0 +1,58 @@
+import pytest
+
+import index_factory
+import index_snapshot
+from fake_rag import FakeRAGAgent
+from ingest import KnowledgeIngestor
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(index_snapshot, "RAG_SNAPSHOT_DIR", tmp_path)
+    monkeypatch.setattr(index_snapshot, "RAG_SNAPSHOT_ENABLED", True)
+    return tmp_path
+
+
+def _docs(n):
+    return [{"id": f"doc{i}", "content": f"documento {i}", "category": "test", "tags": []} for i in range(n)]
+
+
+def test_ingest_switches_flat_to_ivf(snapshot_dir):
+    agent = FakeRAGAgent("ivf_flat")
+    assert agent.index_spec == "Flat"
+
+    KnowledgeIngestor(agent, batch_size=32).ingest(_docs(300))
+
+    n = len(agent.id_map)
+    assert agent.index_spec == f"IVF{n // index_factory.MIN_POINTS_PER_CENTROID},Flat"
+    assert index_factory.describe(agent.index)[0] == "ivf"
+    assert agent.index.ntotal == n
+    # Los vectores reconstruidos conservan sus ids: cada documento se encuentra a sí mismo
+    vector_id = agent.doc_registry["doc7"]["ids"][0]
+    query = agent.embed_documents(["documento 7"])
+    _, ids = agent.index.search(query, 1, params=index_factory.search_params(agent.index, nprobe=n))
+    assert ids[0][0] == vector_id
+
+    live = index_snapshot.load_live_state(snapshot_dir, "fake-model", "ivf_flat")
+    assert live["meta"]["spec"] == agent.index_spec
+    assert live["index"].ntotal == n
+
+
+def test_small_ingest_keeps_flat(snapshot_dir):
+    agent = FakeRAGAgent("ivf_flat")
+    generation = agent.index_generation
+    KnowledgeIngestor(agent).ingest(_docs(20))
+    assert agent.index_spec == "Flat"
+    assert agent.index_generation == generation + 1
+    assert not (snapshot_dir / index_snapshot.LIVE_DIR).exists()
+
+
+def test_rebuild_after_deletes_uses_live_ids():
+    agent = FakeRAGAgent("ivf_flat", base_docs=200)
+    assert agent.index_spec.startswith("IVF")
+    ingestor = KnowledgeIngestor(agent)
+    for i in range(60):
+        ingestor.delete(f"base{i}")
+    assert agent.rebuild_index_if_needed(save=False)
+    assert agent.index_spec == "Flat"
+    assert agent.index.ntotal == len(agent.id_map) == 140
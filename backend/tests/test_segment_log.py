@@ -0,0 +1,99 @@
+import json
+import time
+
+from memory.segment_log import SegmentedLog
+
+
+def _records(start, end):
+    return [{"type": "interaction", "n": n, "pad": "x" * 40} for n in range(start, end)]
+
+
+def _numbers(log):
+    return [r["n"] for r in log.iter_records()]
+
+
+def _write_segment(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def _wait_compaction(log, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while (log._compacting or not log.stats["compactions"]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_rotation_keeps_order(tmp_path):
+    log = SegmentedLog(tmp_path, segment_max_bytes=200, compact_min_segments=1000)
+    for record in _records(0, 20):
+        log.append(record)
+    assert log.stats["rotations"] >= 5
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) == log.stats["rotations"] + 1
+    assert _numbers(log) == list(range(20))
+    log.close()
+
+    # Al reabrir se sigue escribiendo en el último segmento
+    log = SegmentedLog(tmp_path, segment_max_bytes=200, compact_min_segments=1000)
+    log.append(_records(20, 21)[0])
+    assert _numbers(log) == list(range(21))
+    log.close()
+
+
+def test_compaction_preserves_order(tmp_path):
+    log = SegmentedLog(tmp_path, segment_max_bytes=200, compact_min_segments=3)
+    for record in _records(0, 12):
+        log.append(record)
+    _wait_compaction(log)
+    assert log.stats["compactions"] >= 1
+    names = sorted(p.name for p in tmp_path.glob("segment-*.jsonl"))
+    assert any(name.count("-") == 2 for name in names)  # segment-<primero>-<último>.jsonl
+    for record in _records(12, 16):
+        log.append(record)
+    assert _numbers(log) == list(range(16))
+    log.close()
+
+    log = SegmentedLog(tmp_path, segment_max_bytes=200, compact_min_segments=1000)
+    assert _numbers(log) == list(range(16))
+    log.close()
+
+
+def test_interrupted_compaction_does_not_duplicate(tmp_path):
+    # Se murió tras renombrar el fusionado y antes de borrar los originales
+    _write_segment(tmp_path / "segment-00000001.jsonl", _records(0, 2))
+    _write_segment(tmp_path / "segment-00000002.jsonl", _records(2, 4))
+    _write_segment(tmp_path / "segment-00000001-00000002.jsonl", _records(0, 4))
+    _write_segment(tmp_path / "segment-00000003.jsonl", _records(4, 5))
+    (tmp_path / "segment-00000001-00000003.jsonl.compact").write_text("{\"n\": 99}\n")
+
+    log = SegmentedLog(tmp_path, compact_min_segments=1000)
+    assert _numbers(log) == list(range(5))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["segment-00000001-00000002.jsonl",
+                                                         "segment-00000003.jsonl"]
+    log.append(_records(5, 6)[0])
+    assert _numbers(log) == list(range(6))
+    log.close()
+
+
+def test_active_after_merged_segment(tmp_path):
+    _write_segment(tmp_path / "segment-00000001-00000004.jsonl", _records(0, 4))
+    log = SegmentedLog(tmp_path, compact_min_segments=1000)
+    log.append(_records(4, 5)[0])
+    assert (tmp_path / "segment-00000005.jsonl").exists()
+    assert _numbers(log) == list(range(5))
+    log.close()
+
+
+def test_torn_final_line(tmp_path):
+    log = SegmentedLog(tmp_path, compact_min_segments=1000)
+    for record in _records(0, 3):
+        log.append(record)
+    log.close()
+    segment = tmp_path / "segment-00000001.jsonl"
+    with open(segment, "a", encoding="utf-8") as f:
+        f.write('{"type": "interaction", "n": 3, "pa')
+
+    log = SegmentedLog(tmp_path, compact_min_segments=1000)
+    assert _numbers(log) == [0, 1, 2]
+    # Lo siguiente no se pega a la línea incompleta
+    log.append(_records(4, 5)[0])
+    assert _numbers(log) == [0, 1, 2, 4]
+    log.close()
@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+# Embeddings fijos: las dos formas de "crear" son casi idénticas, "borrar" no
+VECTORS = {
+    "Cómo crear un contenedor Docker": [1.0, 0.0, 0.0],
+    "como crear un contenedor docker": [0.99, 0.05, 0.0],
+    "Cómo borrar un contenedor Docker": [0.0, 1.0, 0.0],
+}
+
+
+def _messages(question: str, context: str = "Docker: contenedores, imágenes, docker run"):
+    return [
+        {"role": "system", "content": "Eres Improver: mejora la respuesta"},
+        {"role": "user", "content": f"Pregunta original: {question}\n\nContexto recuperado:\n- {context}\n\n"
+                                    f"Respuesta inicial: borrador\n\nProblemas identificados: ['Respuesta corta']"},
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.encoded = []
+        self.calls = 0
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return np.asarray(VECTORS.get(text, [0.0, 0.0, 1.0]), dtype=np.float32)
+
+    def call(self, answer):
+        async def call():
+            self.calls += 1
+            return answer, True
+        return call
+
+
+def _ask(cache, recorder, question, context="Docker: contenedores, imágenes, docker run"):
+    return asyncio.run(cache.get_or_call(_messages(question, context), 0.15,
+                                         recorder.call(f"respuesta a {question}"), cache_text=question))
+
+
+def test_cache_text_embeds_only_the_question():
+    recorder = Recorder()
+    cache = SemanticCache(encoder=recorder.encode, threshold=0.95)
+    _ask(cache, recorder, "Cómo crear un contenedor Docker")
+    assert recorder.encoded == ["Cómo crear un contenedor Docker"]
+
+
+def test_same_context_different_question_misses():
+    recorder = Recorder()
+    cache = SemanticCache(encoder=recorder.encode, threshold=0.95)
+    _ask(cache, recorder, "Cómo crear un contenedor Docker")
+    answer = _ask(cache, recorder, "Cómo borrar un contenedor Docker")
+    assert answer == "respuesta a Cómo borrar un contenedor Docker"
+    assert recorder.calls == 2
+
+
+def test_similar_question_same_prompt_hits():
+    recorder = Recorder()
+    cache = SemanticCache(encoder=recorder.encode, threshold=0.95)
+    _ask(cache, recorder, "Cómo crear un contenedor Docker")
+    answer = _ask(cache, recorder, "como crear un contenedor docker")
+    assert answer == "respuesta a Cómo crear un contenedor Docker"
+    assert recorder.calls == 1
+
+
+def test_different_context_misses():
+    recorder = Recorder()
+    cache = SemanticCache(encoder=recorder.encode, threshold=0.95)
+    _ask(cache, recorder, "Cómo crear un contenedor Docker")
+    _ask(cache, recorder, "Cómo crear un contenedor Docker", context="Kubernetes: pods y deployments")
+    assert recorder.calls == 2
+    assert cache.stats()["partitions"] == 2
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from memory.write_behind import WriteBehindQueue
+
+
+class RecordingStore:
+    def __init__(self, fail_times=0, gate=None):
+        self.batches = []
+        self.attempts = 0
+        self.fail_times = fail_times
+        self.gate = gate
+        self.closed = False
+
+    async def append_records(self, records):
+        self.attempts += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.attempts <= self.fail_times:
+            raise OSError("disco lleno")
+        self.batches.append(list(records))
+
+    def stats(self):
+        return {}
+
+    async def close(self):
+        self.closed = True
+
+
+def _records(n):
+    return [{"type": "interaction", "request_id": f"r{i}"} for i in range(n)]
+
+
+def test_close_drains_in_fifo_order():
+    async def scenario():
+        store = RecordingStore()
+        queue = WriteBehindQueue(store, max_batch=4, flush_interval_ms=1000)
+        for record in _records(10):
+            await queue.submit(record)
+        await queue.close()
+        return store, queue.stats()
+
+    store, stats = asyncio.run(scenario())
+    assert [r["request_id"] for batch in store.batches for r in batch] == [f"r{i}" for i in range(10)]
+    assert all(len(batch) <= 4 for batch in store.batches)
+    assert store.closed
+    assert stats["flushed"] == 10 and stats["depth"] == 0
+
+
+def test_submit_waits_when_queue_is_full():
+    async def scenario():
+        gate = asyncio.Event()
+        store = RecordingStore(gate=gate)
+        queue = WriteBehindQueue(store, max_batch=1, max_queue=2)
+        records = _records(4)
+        await queue.submit(records[0])
+        await asyncio.sleep(0.01)  # el writer toma r0 y se queda escribiéndolo
+        await queue.submit(records[1])
+        await queue.submit(records[2])
+        blocked = asyncio.ensure_future(queue.submit(records[3]))
+        await asyncio.sleep(0.05)
+        waiting = not blocked.done()
+        gate.set()
+        await asyncio.wait_for(blocked, 1.0)
+        await queue.close()
+        return waiting, store, queue.stats()
+
+    waiting, store, stats = asyncio.run(scenario())
+    assert waiting
+    assert stats["backpressure_waits"] == 1
+    assert [batch[0]["request_id"] for batch in store.batches] == ["r0", "r1", "r2", "r3"]
+
+
+def test_retries_then_drops():
+    async def scenario():
+        store = RecordingStore(fail_times=10)
+        queue = WriteBehindQueue(store, max_batch=8, flush_interval_ms=1, retries=2)
+        for record in _records(3):
+            await queue.submit(record)
+        await queue.close()
+        return store, queue.stats()
+
+    store, stats = asyncio.run(scenario())
+    assert store.attempts == 3
+    assert stats["dropped"] == 3 and stats["flushed"] == 0
+
+
+def test_retry_succeeds_after_transient_failure():
+    async def scenario():
+        store = RecordingStore(fail_times=1)
+        queue = WriteBehindQueue(store, max_batch=8, flush_interval_ms=1, retries=2)
+        await queue.submit(_records(1)[0])
+        await queue.close()
+        return store, queue.stats()
+
+    store, stats = asyncio.run(scenario())
+    assert store.attempts == 2
+    assert stats["flushed"] == 1 and stats["dropped"] == 0
+
+
+def test_submit_after_close_raises():
+    async def scenario():
+        queue = WriteBehindQueue(RecordingStore())
+        await queue.close()
+        with pytest.raises(RuntimeError):
+            await queue.submit(_records(1)[0])
+
+    asyncio.run(scenario())